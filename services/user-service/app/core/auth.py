@@ -0,0 +1,222 @@
+"""
+认证模块
+无状态校验 JWT：进程内 LRU 缓存已解码的声明，Redis 记录已吊销的令牌
+认证请求的热路径不访问数据库
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.security import ACCESS_TOKEN, decode_token
+from app.schemas.user import TokenPayload
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidToken(Exception):
+    """令牌无效、过期或已吊销"""
+
+
+class TokenVerifier:
+    """
+    令牌校验器
+    签名校验结果按令牌缓存在进程内 LRU 中，命中时只需比较过期时间；
+    吊销记录以 jti 为键存入 Redis（过期时间与令牌一致）；
+    禁用用户时按用户写入吊销时间（毫秒精度），此前签发的令牌全部失效，重新激活时删除；
+    每次校验用一次 MGET 同时读取两种记录，不访问数据库
+    """
+
+    def __init__(self, prefix: str = "auth:revoked"):
+        self.prefix = prefix
+        self.redis = None
+        self._claims: "OrderedDict[str, TokenPayload]" = OrderedDict()
+        # 本进程吊销的令牌：jti -> 过期时间，Redis 不可用时同样生效
+        self._revoked: Dict[str, int] = {}
+        # 本进程禁用的用户：用户 ID -> (吊销时间, 记录过期时间)
+        self._revoked_users: Dict[int, Tuple[float, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def bind(self, redis_client) -> None:
+        """绑定 Redis 客户端，传入 None 时只使用进程内吊销记录"""
+        self.redis = redis_client
+
+    def revoked_key(self, jti: str) -> str:
+        return f"{self.prefix}:{jti}"
+
+    def user_revoked_key(self, user_id: int) -> str:
+        return f"{self.prefix}:user:{user_id}"
+
+    @staticmethod
+    def _issued_before(payload: TokenPayload, revoked_at) -> bool:
+        # iat 与吊销时间均精确到毫秒；旧令牌的 iat 为整秒，同一秒内签发的仍视为已吊销
+        return revoked_at is not None and (payload.iat or 0) <= float(revoked_at)
+
+    def decode(self, token: str) -> TokenPayload:
+        """解码令牌，已校验过签名的令牌直接从缓存返回"""
+        payload = self._claims.get(token)
+        if payload is not None:
+            self._claims.move_to_end(token)
+            self.hits += 1
+            return payload
+
+        self.misses += 1
+        from jose import JWTError  # 仅缓存未命中时需要
+
+        try:
+            payload = TokenPayload.model_validate(decode_token(token))
+        except (JWTError, ValidationError) as e:
+            raise InvalidToken("令牌无效") from e
+
+        if payload.sub is None or payload.jti is None or payload.exp is None:
+            raise InvalidToken("令牌缺少必要声明")
+
+        self._claims[token] = payload
+        if len(self._claims) > settings.JWT_CLAIMS_CACHE_SIZE:
+            self._claims.popitem(last=False)
+        return payload
+
+    async def is_revoked(self, payload: TokenPayload) -> bool:
+        """检查令牌是否已吊销"""
+        if payload.jti in self._revoked:
+            return True
+        local = self._revoked_users.get(payload.sub)
+        if local is not None and self._issued_before(payload, local[0]):
+            return True
+        if self.redis is None:
+            return False
+
+        try:
+            token_revoked, user_revoked_at = await self.redis.mget(
+                [self.revoked_key(payload.jti), self.user_revoked_key(payload.sub)]
+            )
+            return token_revoked is not None or self._issued_before(payload, user_revoked_at)
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"读取令牌吊销记录失败: {e}")
+            return not settings.JWT_REVOCATION_FAIL_OPEN
+
+    async def verify(self, token: str, token_type: str = ACCESS_TOKEN) -> TokenPayload:
+        """校验令牌类型、过期时间和吊销状态"""
+        payload = self.decode(token)
+
+        if payload.type != token_type:
+            raise InvalidToken("令牌类型错误")
+        if payload.exp <= time.time():
+            self._claims.pop(token, None)
+            raise InvalidToken("令牌已过期")
+        if await self.is_revoked(payload):
+            raise InvalidToken("令牌已吊销")
+        return payload
+
+    async def revoke(self, payload: TokenPayload) -> None:
+        """吊销令牌，记录保留到令牌自然过期为止"""
+        now = int(time.time())
+        ttl = payload.exp - now
+        if ttl <= 0:
+            return
+
+        # 顺带清理已过期的本地记录
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        self._revoked[payload.jti] = payload.exp
+
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self.revoked_key(payload.jti), 1, ex=ttl)
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"写入令牌吊销记录失败: {e}")
+
+    async def revoke_users(self, user_ids: Iterable[int]) -> None:
+        """吊销用户此前签发的全部令牌（禁用用户时调用），记录保留到最长的令牌有效期结束"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        # 在禁用提交之后取时间，之后签发的令牌 iat 一定更大
+        revoked_at = round(time.time(), 3)
+        now = int(revoked_at)
+        ttl = settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+        self._revoked_users = {
+            user_id: entry for user_id, entry in self._revoked_users.items() if entry[1] > now
+        }
+        for user_id in user_ids:
+            self._revoked_users[user_id] = (revoked_at, now + ttl)
+
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user_id in user_ids:
+                    pipe.set(self.user_revoked_key(user_id), revoked_at, ex=ttl)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"写入用户令牌吊销记录失败: {e}")
+
+    async def restore_users(self, user_ids: Iterable[int]) -> None:
+        """删除用户吊销记录（重新激活用户时调用）"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            self._revoked_users.pop(user_id, None)
+
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(*[self.user_revoked_key(user_id) for user_id in user_ids])
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"删除用户令牌吊销记录失败: {e}")
+
+    def stats(self) -> dict:
+        """校验缓存统计"""
+        lookups = self.hits + self.misses
+        return {
+            "cached_tokens": len(self._claims),
+            "revoked_users": len(self._revoked_users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 全局令牌校验器（在应用启动时绑定 Redis 客户端）
+token_verifier = TokenVerifier()
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> TokenPayload:
+    """
+    当前用户依赖
+    只校验令牌本身，返回令牌中的用户声明，不查询数据库
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="未提供认证令牌",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        return await token_verifier.verify(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
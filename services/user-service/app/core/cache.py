@@ -0,0 +1,417 @@
+"""
+用户缓存模块
+两级读穿透缓存，缓存序列化后的 UserResponse：
+进程内 LRU（有大小上限和 TTL）在前，Redis 在后，热点读取无需网络往返
+失效消息通过 Redis pub/sub 广播，所有容器的所有 worker 同时删除本地副本
+Redis 不可用时自动回退到数据库
+读穿透回填使用 SET NX，失效时写入短期占位值（tombstone），与更新并发的回填不会写回旧数据
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.database import replica_set
+from app.core.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_LOCAL_HIT = CACHE_LOOKUPS.labels("local", "hit")
+_LOCAL_MISS = CACHE_LOOKUPS.labels("local", "miss")
+_REDIS_HIT = CACHE_LOOKUPS.labels("redis", "hit")
+_REDIS_MISS = CACHE_LOOKUPS.labels("redis", "miss")
+
+# 订阅断开后的重连间隔（秒），指数退避
+_RESUBSCRIBE_MIN_DELAY = 0.5
+_RESUBSCRIBE_MAX_DELAY = 30.0
+# 等待失效消息的轮询超时（秒）
+_POLL_TIMEOUT = 1.0
+# 失效占位值，读取时视为未命中
+TOMBSTONE = ""
+
+
+class LocalCache:
+    """
+    进程内 LRU + TTL 缓存
+    generation 在每次删除 / 清空时递增：从 Redis 读取期间发生过失效的结果不写入本地，
+    避免失效消息先于读取结果到达时把旧数据留在本地
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.USER_LOCAL_CACHE_ENABLED and settings.USER_LOCAL_CACHE_SIZE > 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, payload: str, ttl: float, generation: Optional[int] = None) -> None:
+        if not self.enabled or (generation is not None and generation != self.generation):
+            return
+        self._entries[key] = (time.monotonic() + ttl, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.USER_LOCAL_CACHE_SIZE:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, keys: Iterable[str]) -> None:
+        self.generation += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class UserCache:
+    """
+    用户读穿透缓存
+    同一份数据同时以 ID 和用户名为键存储，写操作后按键精确失效
+    """
+
+    def __init__(self, prefix: str = "user"):
+        self.prefix = prefix
+        self.redis = None
+        self.local = LocalCache()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.stale_fills = 0  # 因读取期间发生失效而放弃的回填
+        self._delayed: Set[asyncio.Task] = set()
+        # 失效消息订阅
+        self._listener: Optional[asyncio.Task] = None
+        self.subscribed = False
+        self.invalidations_published = 0
+        self.invalidations_received = 0
+        self.subscription_failures = 0
+
+    def bind(self, redis_client) -> None:
+        """绑定 Redis 客户端，传入 None 表示禁用缓存"""
+        self.redis = redis_client
+        self.local.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.USER_CACHE_ENABLED and self.redis is not None
+
+    @property
+    def generation(self) -> int:
+        """本进程的失效代数，读数据库前取得，回填时传给 set() / set_many()"""
+        return self.local.generation
+
+    def id_key(self, user_id: int) -> str:
+        return f"{self.prefix}:id:{user_id}"
+
+    def username_key(self, username: str) -> str:
+        return f"{self.prefix}:name:{username}"
+
+    def _ttl(self) -> int:
+        """带随机抖动的过期时间，避免大量键同时失效"""
+        jitter = settings.USER_CACHE_TTL * settings.USER_CACHE_TTL_JITTER
+        return max(1, int(settings.USER_CACHE_TTL + random.uniform(-jitter, jitter)))
+
+    def _local_ttl(self) -> float:
+        """本地缓存过期时间，收不到失效消息时使用短 TTL 限制数据陈旧时间"""
+        if self.subscribed:
+            return settings.USER_LOCAL_CACHE_TTL
+        return settings.USER_LOCAL_CACHE_DEGRADED_TTL
+
+    def _get_local(self, key: str) -> Optional[str]:
+        if not self.local.enabled:
+            return None
+        payload = self.local.get(key)
+        (_LOCAL_MISS if payload is None else _LOCAL_HIT).inc()
+        return payload
+
+    async def _get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        payload = self._get_local(key)
+        if payload is not None:
+            self.hits += 1
+            return payload
+
+        generation = self.local.generation
+        try:
+            payload = await self.redis.get(key)
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"读取用户缓存失败，回退到数据库: {e}")
+            return None
+
+        if not payload:  # 未缓存或刚失效
+            self.misses += 1
+            self.redis_misses += 1
+            _REDIS_MISS.inc()
+            return None
+
+        self.hits += 1
+        self.redis_hits += 1
+        _REDIS_HIT.inc()
+        self.local.set(key, payload, self._local_ttl(), generation)
+        return payload
+
+    async def get_by_id(self, user_id: int) -> Optional[str]:
+        """按 ID 读取缓存的用户 JSON"""
+        return await self._get(self.id_key(user_id))
+
+    async def get_by_username(self, username: str) -> Optional[str]:
+        """按用户名读取缓存的用户 JSON"""
+        return await self._get(self.username_key(username))
+
+    async def get_many_by_id(self, user_ids: List[int]) -> Dict[int, str]:
+        """按 ID 批量读取缓存，本地未命中的部分合并为一次 MGET，只返回命中的部分"""
+        if not self.enabled or not user_ids:
+            return {}
+
+        found = {}
+        for user_id in user_ids:
+            payload = self._get_local(self.id_key(user_id))
+            if payload is not None:
+                found[user_id] = payload
+        remote_ids = [user_id for user_id in user_ids if user_id not in found]
+        self.hits += len(found)
+
+        if remote_ids:
+            generation = self.local.generation
+            try:
+                payloads = await self.redis.mget([self.id_key(user_id) for user_id in remote_ids])
+            except (RedisError, OSError) as e:
+                self.errors += 1
+                logger.warning(f"批量读取用户缓存失败，回退到数据库: {e}")
+                return found
+
+            ttl = self._local_ttl()
+            remote_hits = 0
+            for user_id, payload in zip(remote_ids, payloads):
+                if payload:
+                    found[user_id] = payload
+                    remote_hits += 1
+                    self.local.set(self.id_key(user_id), payload, ttl, generation)
+
+            self.hits += remote_hits
+            self.misses += len(remote_ids) - remote_hits
+            self.redis_hits += remote_hits
+            self.redis_misses += len(remote_ids) - remote_hits
+            _REDIS_HIT.inc(remote_hits)
+            _REDIS_MISS.inc(len(remote_ids) - remote_hits)
+        return found
+
+    async def set(
+        self, user_id: int, username: str, payload: str, generation: Optional[int] = None
+    ) -> None:
+        """回填缓存（ID 和用户名两个键）"""
+        await self.set_many([(user_id, username, payload)], generation)
+
+    async def set_many(
+        self, entries: Iterable[Tuple[int, str, str]], generation: Optional[int] = None
+    ) -> None:
+        """
+        批量回填缓存，entries 为 (ID, 用户名, JSON) 三元组
+        generation 为读数据库前取得的失效代数，期间本进程发生过失效时放弃回填；
+        Redis 使用 SET NX，不覆盖已有值和失效占位值，只有写入成功的键才写入本地
+        """
+        if not self.enabled:
+            return
+        if generation is None:
+            generation = self.local.generation
+        elif generation != self.local.generation:
+            self.stale_fills += 1
+            return
+
+        items = []
+        for user_id, username, payload in entries:
+            items.append((self.id_key(user_id), payload))
+            items.append((self.username_key(username), payload))
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, payload in items:
+                    pipe.set(key, payload, ex=self._ttl(), nx=True)
+                stored = await pipe.execute()
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"写入用户缓存失败: {e}")
+            # Redis 不可用时订阅同样中断，本地使用短 TTL，只受失效代数保护
+            stored = [True] * len(items)
+
+        ttl = self._local_ttl()
+        for (key, payload), ok in zip(items, stored):
+            if ok:
+                self.local.set(key, payload, ttl, generation)
+
+    async def _delete(self, keys: List[str]) -> None:
+        """
+        失效本地和 Redis 中的缓存键，并广播给其他 worker
+        Redis 中写入短期占位值而不是直接删除，每批一个 pipeline 和一条 PUBLISH
+        """
+        self.local.delete(keys)
+        try:
+            for start in range(0, len(keys), 1000):
+                chunk = keys[start:start + 1000]
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key in chunk:
+                        pipe.set(key, TOMBSTONE, ex=settings.USER_CACHE_TOMBSTONE_TTL)
+                    await pipe.execute()
+                if settings.USER_LOCAL_CACHE_ENABLED:
+                    await self.redis.publish(settings.USER_CACHE_INVALIDATION_CHANNEL, json.dumps(chunk))
+                    self.invalidations_published += 1
+        except (RedisError, OSError) as e:
+            self.errors += 1
+            logger.warning(f"用户缓存失效失败: {e}")
+
+    async def _delete_later(self, keys: List[str]) -> None:
+        await asyncio.sleep(settings.DATABASE_REPLICA_MAX_LAG)
+        if self.redis is not None:
+            await self._delete(keys)
+
+    async def _invalidate_keys(self, keys: List[str]) -> None:
+        """
+        失效缓存键
+        启用只读副本时延迟再删一次：失效后、副本追上前的读请求可能把旧数据重新写入缓存
+        """
+        if self.redis is None or not keys:
+            return
+
+        await self._delete(keys)
+
+        if replica_set.enabled:
+            task = asyncio.create_task(self._delete_later(keys))
+            self._delayed.add(task)
+            task.add_done_callback(self._delayed.discard)
+
+    async def invalidate(self, user_id: int, username: str) -> None:
+        """使指定用户的缓存失效"""
+        await self._invalidate_keys([self.id_key(user_id), self.username_key(username)])
+
+    async def invalidate_many(self, users: Iterable[Tuple[int, str]]) -> None:
+        """批量失效，users 为 (ID, 用户名) 二元组"""
+        keys = []
+        for user_id, username in users:
+            keys.append(self.id_key(user_id))
+            keys.append(self.username_key(username))
+        await self._invalidate_keys(keys)
+
+    def _on_invalidation(self, data: str) -> None:
+        """收到失效消息（包括本进程发出的），删除本地副本"""
+        try:
+            keys = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning(f"忽略无法解析的缓存失效消息: {data!r}")
+            return
+        self.invalidations_received += 1
+        self.local.delete(keys)
+
+    async def _listen(self) -> None:
+        """订阅失效频道，断开后清空本地缓存并按指数退避重连"""
+        delay = _RESUBSCRIBE_MIN_DELAY
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.USER_CACHE_INVALIDATION_CHANNEL)
+                # 未订阅期间可能错过失效消息，本地缓存全部作废
+                self.local.clear()
+                self.subscribed = True
+                delay = _RESUBSCRIBE_MIN_DELAY
+                logger.info("用户缓存失效订阅已建立")
+                # 按超时轮询而不是 listen()：连接池设置了 socket_timeout，空闲时 listen() 会超时断开
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=_POLL_TIMEOUT
+                    )
+                    if message is not None and message.get("type") == "message":
+                        self._on_invalidation(message["data"])
+            except Exception as e:
+                self.subscription_failures += 1
+                logger.warning(f"用户缓存失效订阅断开，本地缓存降级为短 TTL: {e}")
+            finally:
+                if self.subscribed:
+                    self.subscribed = False
+                    self.local.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RESUBSCRIBE_MAX_DELAY)
+
+    def start(self) -> None:
+        """启动失效消息订阅（需先绑定 Redis）"""
+        if self.enabled and settings.USER_LOCAL_CACHE_ENABLED and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """停止失效消息订阅"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        """缓存命中统计（总体与各级）"""
+        lookups = self.hits + self.misses
+        local_lookups = self.local.hits + self.local.misses
+        redis_lookups = self.redis_hits + self.redis_misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale_fills": self.stale_fills,
+            "local": {
+                "enabled": self.local.enabled,
+                "size": len(self.local),
+                "max_size": settings.USER_LOCAL_CACHE_SIZE,
+                "ttl": self._local_ttl(),
+                "hits": self.local.hits,
+                "misses": self.local.misses,
+                "hit_ratio": round(self.local.hits / local_lookups, 4) if local_lookups else 0.0,
+                "evictions": self.local.evictions,
+            },
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "hit_ratio": round(self.redis_hits / redis_lookups, 4) if redis_lookups else 0.0,
+            },
+            "invalidation": {
+                "subscribed": self.subscribed,
+                "published": self.invalidations_published,
+                "received": self.invalidations_received,
+                "subscription_failures": self.subscription_failures,
+            },
+        }
+
+
+# 全局用户缓存实例（在应用启动时绑定 Redis 客户端）
+user_cache = UserCache()
@@ -0,0 +1,95 @@
+"""
+熔断器模块
+依赖连续失败达到阈值后熔断（open），熔断期间直接拒绝调用，不再等待超时；
+冷却时间过后进入半开（half_open），只放行一个试探调用，成功则恢复，失败则继续熔断
+Redis 客户端与服务间 HTTP 客户端共用
+"""
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝调用"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    调用方在调用前检查 allow()，之后按结果调用 record_success() / record_failure()；
+    只有表示依赖不可用的错误（连接失败、超时）才应记为失败
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0  # 连续失败次数
+        self.opened_at = 0.0
+        # 半开状态下试探调用的开始时间，None 表示尚未放行
+        self._trial_started: Optional[float] = None
+        self.opens = 0
+        self.short_circuited = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def allow(self) -> bool:
+        """是否放行本次调用"""
+        if self.state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.recovery_timeout:
+                self.short_circuited += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_started = None
+
+        # 半开：同一时刻只放行一个试探调用；试探调用被取消而未记录结果时，冷却时间后再放行
+        if self._trial_started is not None and now - self._trial_started < self.recovery_timeout:
+            self.short_circuited += 1
+            return False
+        self._trial_started = now
+        return True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name} 熔断恢复")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        """进入熔断状态（已熔断时重新开始冷却计时）"""
+        if self.state != self.OPEN:
+            self.opens += 1
+            logger.warning(f"{self.name} 连续失败 {self.failures} 次，熔断 {self.recovery_timeout}s")
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self._trial_started = None
+
+    def stats(self) -> dict:
+        """熔断器状态"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "opens": self.opens,
+            "short_circuited": self.short_circuited,
+        }
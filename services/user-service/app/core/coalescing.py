@@ -0,0 +1,93 @@
+"""
+请求合并模块
+同一 worker 内对同一键的并发加载只触发一次实际查询，其余请求共享结果
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class _OwnerCancelled(Exception):
+    """负责加载的请求被取消（如客户端断开），等待方改为自行加载"""
+
+
+class Coalescer:
+    """
+    按键合并并发加载
+    第一个请求某个键的协程负责加载，其他协程等待同一个 Future；
+    fetch 使用负责方自己的数据库会话，因此负责方被取消时不把取消传给等待方，而由等待方用自己的 fetch 重新加载
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.loads = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _consume_exception(future: asyncio.Future) -> None:
+        # 无人等待时也标记异常已读取，避免 "exception was never retrieved" 警告
+        if not future.cancelled():
+            future.exception()
+
+    async def load_many(
+        self,
+        keys: List[Hashable],
+        fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, object]]],
+    ) -> Dict[Hashable, Optional[object]]:
+        """
+        加载一组键
+        fetch 接收需要实际加载的键列表，返回 键 -> 值 的字典，缺失的键视为 None
+        """
+        loop = asyncio.get_running_loop()
+        waiting: Dict[Hashable, asyncio.Future] = {}
+        owned: List[Hashable] = []
+
+        for key in keys:
+            future = self._inflight.get(key)
+            if future is None:
+                future = loop.create_future()
+                future.add_done_callback(self._consume_exception)
+                self._inflight[key] = future
+                owned.append(key)
+            else:
+                self.coalesced += 1
+            waiting[key] = future
+
+        if owned:
+            self.loads += 1
+            try:
+                found = await fetch(owned)
+            except BaseException as e:
+                for key in owned:
+                    future = self._inflight.pop(key)
+                    if future.done():
+                        continue
+                    if isinstance(e, asyncio.CancelledError):
+                        future.set_exception(_OwnerCancelled())
+                    else:
+                        future.set_exception(e)
+                raise
+            else:
+                for key in owned:
+                    future = self._inflight.pop(key)
+                    if not future.done():
+                        future.set_result(found.get(key))
+
+        results: Dict[Hashable, Optional[object]] = {}
+        reload: List[Hashable] = []
+        for key, future in waiting.items():
+            try:
+                # shield 防止等待方被取消时连带取消共享的 Future
+                results[key] = await asyncio.shield(future)
+            except _OwnerCancelled:
+                reload.append(key)
+        if reload:
+            results.update(await self.load_many(reload, fetch))
+        return {key: results[key] for key in waiting}
+
+    def stats(self) -> dict:
+        """合并统计"""
+        return {
+            "inflight": len(self._inflight),
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+        }
@@ -3,7 +3,7 @@
 从环境变量加载应用配置
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 
@@ -21,6 +21,27 @@ class Settings(BaseSettings):
 
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./test.db"
+    DATABASE_AUTO_MIGRATE: bool = True  # 结构版本落后时启动即迁移；生产环境由 python -m app.migrate 执行
+
+    # SQLite 性能参数（边缘部署与本地压测）
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL 模式下读写互不阻塞
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # WAL 下 NORMAL 不会损坏数据，只可能丢失最后几个事务
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536  # 每个连接的页缓存
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB 内存映射读取
+    SQLITE_READ_POOL_SIZE: int = 4  # 只读连接数，写连接固定为 1
+    SQLITE_POOL_TIMEOUT: float = 30  # 等待连接的秒数
+
+    # SQL 查询统计
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    SQL_SLOW_QUERY_MS: float = 200  # 超过该耗时的语句记录警告日志
+    SQL_NPLUS1_THRESHOLD: int = 10  # 同一请求内同一语句执行次数达到该值视为 N+1
+
+    # 只读副本配置
+    DATABASE_REPLICA_URLS: str = ""  # 逗号分隔的异步驱动 URL，为空时读写都走主库
+    DATABASE_REPLICA_MAX_LAG: float = 5.0  # 秒，超过即摘除；写后同样时长内读主库
+    DATABASE_REPLICA_CHECK_INTERVAL: float = 5.0  # 秒
+    DATABASE_REPLICA_CHECK_TIMEOUT: float = 2.0  # 秒
 
     # PostgreSQL 配置
     POSTGRES_DB: str = "microservices"
@@ -29,6 +50,16 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
 
+    # 连接池配置（每个 worker 独立一个连接池）
+    # 每个 worker 最多 POOL_SIZE + MAX_OVERFLOW 个连接，
+    # gunicorn worker 数 × 该值（含只读副本）需小于数据库 max_connections
+    POSTGRES_POOL_SIZE: int = 20
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_TIMEOUT: float = 30  # 等待空闲连接的秒数，超时抛出异常
+    POSTGRES_POOL_RECYCLE: int = 300  # 连接最长存活秒数
+    POSTGRES_POOL_PRE_PING: bool = True  # 取出连接前检测是否可用
+    POSTGRES_POOL_USE_LIFO: bool = True  # 优先复用最近归还的连接，空闲连接可按 recycle 自然回收
+
     # MySQL 配置
     MYSQL_DATABASE: str = "microservices"
     MYSQL_USER: str = "user"
@@ -36,6 +67,20 @@ class Settings(BaseSettings):
     MYSQL_ROOT_PASSWORD: str = "root"
     MYSQL_HOST: str = "localhost"
     MYSQL_PORT: int = 3306
+    MYSQL_POOL_SIZE: int = 20
+    MYSQL_MAX_OVERFLOW: int = 10
+    MYSQL_POOL_TIMEOUT: float = 30
+    MYSQL_POOL_RECYCLE: int = 3600  # 需小于服务端 wait_timeout
+    MYSQL_POOL_PRE_PING: bool = True
+    MYSQL_POOL_USE_LIFO: bool = True
+
+    # Prometheus 指标（多 worker 时需设置环境变量 PROMETHEUS_MULTIPROC_DIR）
+    METRICS_ENABLED: bool = True
+
+    # 健康探测配置（后台探测数据库和 Redis，健康检查端点只读取结果）
+    HEALTH_CHECK_INTERVAL: float = 5.0  # 秒
+    HEALTH_CHECK_TIMEOUT: float = 2.0  # 单次探测超时秒数
+    HEALTH_CHECK_STALE_AFTER: float = 15.0  # 结果超过该秒数未更新视为过旧
 
     # Redis 配置
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -44,6 +89,53 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: Optional[str] = None
     REDIS_DB: int = 0
 
+    # Redis 连接池与熔断（每个 worker 一个连接池，所有组件共用）
+    REDIS_POOL_MAX_CONNECTIONS: int = 50  # 连接上限，含缓存失效订阅长期占用的 1 个
+    REDIS_POOL_TIMEOUT: float = 1.0  # 连接全部占用时等待空闲连接的秒数
+    REDIS_SOCKET_TIMEOUT: float = 0.5  # 单条命令的读写超时，Redis 变慢时快速失败
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 0.5
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # 空闲超过该秒数的连接使用前先 PING
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败次数达到该值后熔断
+    REDIS_BREAKER_RECOVERY_TIMEOUT: float = 5.0  # 熔断后放行试探请求的间隔秒数
+    REDIS_RECONNECT_INTERVAL: float = 2.0  # 熔断期间后台 PING 的间隔秒数
+
+    # 服务间 HTTP 调用配置，每个上游服务一个共享连接池
+    UPSTREAM_SERVICES: Dict[str, str] = {}  # 服务名 -> 基础 URL，如 {"order": "http://order-service:8000"}
+    HTTP_CLIENT_POOL_SIZE: int = 100  # 每个上游服务的连接上限
+    HTTP_CLIENT_POOL_SIZE_PER_HOST: int = 50  # 每个主机（IP:端口）的连接上限
+    HTTP_CLIENT_KEEPALIVE_TIMEOUT: float = 30.0  # 秒，空闲连接保活时间
+    HTTP_CLIENT_DNS_CACHE_TTL: int = 300  # 秒
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 1.0  # 秒，含等待连接池空闲连接
+    HTTP_CLIENT_READ_TIMEOUT: float = 3.0  # 秒，两次读取之间的间隔上限
+    HTTP_CLIENT_TOTAL_TIMEOUT: float = 5.0  # 秒，单次调用（不含重试）
+    HTTP_CLIENT_RETRIES: int = 2  # 连接失败、超时及 502/503/504 的重试次数（仅幂等方法）
+    HTTP_CLIENT_RETRY_BACKOFF: float = 0.1  # 秒，重试退避基数，按指数增长并加入随机抖动
+    HTTP_CLIENT_RETRY_BACKOFF_MAX: float = 2.0
+    HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD: int = 5
+    HTTP_CLIENT_BREAKER_RECOVERY_TIMEOUT: float = 10.0
+
+    # 用户缓存配置
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL: int = 300  # 秒
+    USER_CACHE_TTL_JITTER: float = 0.1  # TTL 随机抖动比例
+    # 失效时写入短期占位值，期间读穿透回填（SET NX）不会把失效前读到的旧数据写回
+    USER_CACHE_TOMBSTONE_TTL: int = 5  # 秒
+    # 进程内一级缓存（位于 Redis 之前），失效消息通过 Redis pub/sub 广播到所有 worker
+    USER_LOCAL_CACHE_ENABLED: bool = True
+    USER_LOCAL_CACHE_SIZE: int = 10000  # 每个 worker 缓存的键数量上限
+    USER_LOCAL_CACHE_TTL: float = 60  # 秒，订阅正常时
+    USER_LOCAL_CACHE_DEGRADED_TTL: float = 1  # 秒，订阅断开（收不到失效消息）时
+    USER_CACHE_INVALIDATION_CHANNEL: str = "user:invalidate"
+
+    # 用户变更事件（Redis Stream），发件箱表保证 Redis 不可用时不丢失
+    USER_EVENTS_ENABLED: bool = True
+    USER_EVENTS_STREAM: str = "user:events"
+    USER_EVENTS_STREAM_MAXLEN: int = 100000  # Stream 近似保留条数
+    USER_EVENTS_BUFFER_SIZE: int = 10000  # 进程内待发送事件上限，超出后由发件箱补发
+    USER_EVENTS_BATCH_SIZE: int = 500  # 每个 pipeline 的 XADD 数量上限
+    USER_EVENTS_OUTBOX_INTERVAL: float = 5.0  # 秒，扫描发件箱补发的间隔
+    USER_EVENTS_OUTBOX_RETRY_AFTER: float = 30.0  # 秒，超过该时间仍未投递的事件才补发
+
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"  # json or plain
@@ -53,12 +145,44 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    JWT_CLAIMS_CACHE_SIZE: int = 10000  # 进程内缓存的已解码令牌数量
+    JWT_REVOCATION_FAIL_OPEN: bool = True  # Redis 不可用时是否放行（仅校验签名和过期时间）
+
+    # 密码哈希配置
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt 线程数
+    PASSWORD_HASH_MAX_PENDING: int = 32  # 排队上限，超过返回 503
+    # 批量创建使用独立线程池，不占用注册、登录的线程；排队按密码个数计算
+    PASSWORD_HASH_BATCH_WORKERS: int = 2
+    PASSWORD_HASH_BATCH_MAX_PENDING: int = 1000  # 批量哈希排队的密码数上限，超过返回 503
 
     # CORS 配置
     ALLOWED_ORIGINS: str = "*"
 
     # 限流配置
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 100
+    # 按路由覆盖限额，键为 "方法 路径前缀"（方法可用 *），值为每分钟次数，0 表示不限
+    RATE_LIMIT_ROUTES: Dict[str, int] = {
+        "POST /api/users/login": 10,
+        "POST /api/users/refresh": 30,
+    }
+    RATE_LIMIT_EXEMPT_PATHS: str = "/health,/metrics"  # 逗号分隔的路径前缀
+    RATE_LIMIT_TRUST_PROXY: bool = False  # 位于 nginx 之后时按 X-Real-IP 识别客户端
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 10000  # 进程内令牌桶数量上限
+
+    # 分页配置
+    USER_PAGE_SIZE_DEFAULT: int = 50
+    USER_PAGE_SIZE_MAX: int = 200  # 单页上限，超过直接 422
+
+    # 搜索配置
+    USER_SEARCH_MAX_RESULTS: int = 1000  # 排序结果最多可翻页到的条数
+
+    # 批量操作配置
+    USER_BATCH_MAX_SIZE: int = 500
+    USER_BULK_MAX_IDS: int = 10000  # 批量激活/禁用时 ID 列表上限
+
+    # 导出配置
+    USER_EXPORT_CHUNK_SIZE: int = 1000  # 每次从数据库游标读取的行数
 
     # API 文档
     ENABLE_DOCS: bool = True
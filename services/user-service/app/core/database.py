@@ -3,11 +3,21 @@
 支持 SQLite、PostgreSQL 和 MySQL
 自动根据 DATABASE_URL 选择正确的数据库驱动
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import MetaData
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy import Delete, Insert, MetaData, Update, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+from fastapi import Request
 from app.core.config import settings
+from app.core.pool_metrics import InstrumentedQueuePool, instrument_engine
+from app.core.query_stats import query_stats
+from typing import Dict, List, Optional
+import asyncio
+import itertools
 import logging
+import math
+import time
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -44,7 +54,7 @@ def create_engine():
     # 自动检测数据库类型并选择正确的驱动
     if database_url.startswith("sqlite"):
         db_type = "sqlite"
-        final_url = driver_mapping["sqlite"]["async"]
+        final_url = sqlite_async_url(database_url)
     elif database_url.startswith("postgresql") or settings.POSTGRES_HOST != "localhost":
         db_type = "postgresql"
         final_url = driver_mapping["postgresql"]["async"]
@@ -60,49 +70,376 @@ def create_engine():
 
     # SQLite 特殊配置
     if db_type == "sqlite":
-        connect_args = {"check_same_thread": False}
-        return create_async_engine(
-            final_url,
-            echo=settings.ENVIRONMENT == "development",  # 开发环境显示 SQL
-            connect_args=connect_args,
-        )
+        return create_sqlite_engine(final_url)
     else:
         # PostgreSQL 或 MySQL 配置
-        pool_size = settings.POSTGRES_POOL_SIZE if db_type == "postgresql" else 20
-        max_overflow = settings.POSTGRES_MAX_OVERFLOW if db_type == "postgresql" else 10
-
         return create_async_engine(
             final_url,
             echo=settings.ENVIRONMENT == "development",
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-            pool_pre_ping=True,  # 预检测连接是否可用
+            **pool_options(db_type),
         )
 
 
+def sqlite_async_url(database_url: str) -> str:
+    """将配置的 SQLite URL 转换为 aiosqlite 驱动，保留数据库路径"""
+    return make_url(database_url).set(drivername="sqlite+aiosqlite").render_as_string(
+        hide_password=False
+    )
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool):
+    """连接建立时应用的 SQLite 性能参数"""
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            # 读连接池只执行查询，误写会直接报错而不是抢占写锁
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return apply
+
+
+def create_sqlite_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    """
+    创建 SQLite 引擎
+    SQLite 同一时刻只允许一个写事务：写引擎只保留一个连接，写请求在进程内排队，
+    而不是在文件锁上忙等；读引擎使用多个只读连接，WAL 模式下读写互不阻塞
+    内存数据库的每个连接都是独立的库，只能共用同一个连接
+    """
+    echo = settings.ENVIRONMENT == "development"  # 开发环境显示 SQL
+    connect_args = {"check_same_thread": False}
+
+    if _is_sqlite_memory(url):
+        return create_async_engine(url, echo=echo, connect_args=connect_args, poolclass=StaticPool)
+
+    sqlite_engine = create_async_engine(
+        url,
+        echo=echo,
+        connect_args=connect_args,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE if read_only else 1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_POOL_TIMEOUT,
+    )
+    event.listen(sqlite_engine.sync_engine, "connect", _sqlite_pragmas(read_only))
+    return sqlite_engine
+
+
+def pool_options(db_type: str) -> dict:
+    """PostgreSQL / MySQL 连接池参数"""
+    if db_type == "postgresql":
+        options = {
+            "pool_size": settings.POSTGRES_POOL_SIZE,
+            "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+            "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
+            "pool_recycle": settings.POSTGRES_POOL_RECYCLE,
+            "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,  # 预检测连接是否可用
+            "pool_use_lifo": settings.POSTGRES_POOL_USE_LIFO,
+        }
+    else:
+        options = {
+            "pool_size": settings.MYSQL_POOL_SIZE,
+            "max_overflow": settings.MYSQL_MAX_OVERFLOW,
+            "pool_timeout": settings.MYSQL_POOL_TIMEOUT,
+            "pool_recycle": settings.MYSQL_POOL_RECYCLE,
+            "pool_pre_ping": settings.MYSQL_POOL_PRE_PING,
+            "pool_use_lifo": settings.MYSQL_POOL_USE_LIFO,
+        }
+    return {"poolclass": InstrumentedQueuePool, **options}
+
+
 # 创建异步引擎
 engine = create_engine()
+instrument_engine("primary", engine)
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    query_stats.instrument(engine)
+
+# SQLite 文件数据库的只读连接池（其他数据库为 None，读请求使用只读副本或主库）
+read_engine: Optional[AsyncEngine] = None
+if engine.dialect.name == "sqlite" and not _is_sqlite_memory(str(engine.url)):
+    read_engine = create_sqlite_engine(str(engine.url), read_only=True)
+    instrument_engine("sqlite-reader", read_engine)
+    if settings.SQL_INSTRUMENTATION_ENABLED:
+        query_stats.instrument(read_engine)
+
+
+# ============================================
+# 只读副本
+# DATABASE_REPLICA_URLS 为空时所有读写都走主库
+# ============================================
+
+# 各数据库查询复制延迟（秒）的语句，SQLite 没有复制
+_REPLICA_LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+    "mysql": "SHOW REPLICA STATUS",
+}
+
+
+def create_replica_engine(url: str) -> AsyncEngine:
+    """创建只读副本引擎，连接池参数与同类型主库一致"""
+    if url.startswith("sqlite"):
+        return create_async_engine(url, connect_args={"check_same_thread": False})
+    return create_async_engine(
+        url, **pool_options("postgresql" if url.startswith("postgresql") else "mysql")
+    )
+
+
+class ReplicaSet:
+    """
+    只读副本集合
+    在健康的副本之间轮询；连接失败或复制延迟超过 DATABASE_REPLICA_MAX_LAG 的副本
+    暂时摘除，由后台检查恢复；没有可用副本时读请求回到主库
+    """
+
+    def __init__(self, engines: List[AsyncEngine]):
+        self.engines = engines
+        self._ejected: Dict[AsyncEngine, str] = {}
+        self._lag: Dict[AsyncEngine, float] = {}
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self.ejections = 0
+
+        for replica in engines:
+            self._watch(replica)
+
+    def _watch(self, replica: AsyncEngine) -> None:
+        """连接断开类错误发生时立即摘除副本，不必等待下一轮检查"""
+        @event.listens_for(replica.sync_engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.eject(replica, f"连接断开: {context.original_exception}")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """轮询选择一个健康的副本"""
+        healthy = [replica for replica in self.engines if replica not in self._ejected]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def eject(self, replica: AsyncEngine, reason: str) -> None:
+        """摘除副本"""
+        if replica not in self._ejected:
+            self.ejections += 1
+            logger.warning(f"只读副本 {replica.url.host or replica.url.database} 已摘除: {reason}")
+        self._ejected[replica] = reason
+
+    def restore(self, replica: AsyncEngine) -> None:
+        """恢复副本"""
+        if self._ejected.pop(replica, None) is not None:
+            logger.info(f"只读副本 {replica.url.host or replica.url.database} 已恢复")
+
+    async def _replication_lag(self, replica: AsyncEngine) -> float:
+        async with replica.connect() as conn:
+            lag_query = _REPLICA_LAG_QUERIES.get(replica.dialect.name)
+            if lag_query is None:
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+
+            row = (await conn.execute(text(lag_query))).mappings().first()
+            if row is None:
+                return 0.0
+            if replica.dialect.name == "mysql":
+                lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+                # NULL 表示复制线程未运行
+                return math.inf if lag is None else float(lag)
+            return float(next(iter(row.values())) or 0)
+
+    async def check(self) -> None:
+        """检查所有副本的连通性和复制延迟"""
+        for replica in self.engines:
+            try:
+                lag = await asyncio.wait_for(
+                    self._replication_lag(replica), settings.DATABASE_REPLICA_CHECK_TIMEOUT
+                )
+            except Exception as e:
+                self.eject(replica, f"健康检查失败: {e}")
+                continue
+
+            self._lag[replica] = lag
+            if lag > settings.DATABASE_REPLICA_MAX_LAG:
+                self.eject(replica, f"复制延迟 {lag:.1f}s")
+            else:
+                self.restore(replica)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DATABASE_REPLICA_CHECK_INTERVAL)
+
+    def start(self) -> None:
+        """启动后台健康检查"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台检查并释放副本连接池"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.engines:
+            await replica.dispose()
+
+    def stats(self) -> list:
+        """各副本状态"""
+        return [
+            {
+                "host": replica.url.host or replica.url.database,
+                "status": "ejected" if replica in self._ejected else "ok",
+                "reason": self._ejected.get(replica),
+                "lag_seconds": self._lag.get(replica),
+            }
+            for replica in self.engines
+        ]
+
+
+replica_set = ReplicaSet([
+    create_replica_engine(url.strip())
+    for url in settings.DATABASE_REPLICA_URLS.split(",")
+    if url.strip()
+])
+for index, replica in enumerate(replica_set.engines):
+    instrument_engine(f"replica-{index}", replica)
+    if settings.SQL_INSTRUMENTATION_ENABLED:
+        query_stats.instrument(replica)
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+    session.info["replica"] 指定了副本时，读语句发往副本；
+    一旦发生写操作（flush 或 INSERT/UPDATE/DELETE），本会话之后的读写都固定在主库
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["wrote"] = True
+            return engine.sync_engine
+
+        replica = self.info.get("replica")
+        if replica is not None and not self.info.get("wrote"):
+            return replica.sync_engine
+        return engine.sync_engine
+
 
 # 创建异步会话工厂
 AsyncSessionLocal = sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
 )
 
+# 读写后固定主库的 Cookie，值为固定截止的 Unix 时间戳
+PRIMARY_PIN_COOKIE = "db_pin"
+
 
-async def get_db() -> AsyncSession:
+def _pinned_to_primary(request: Request) -> bool:
+    """最近写过数据的客户端在副本追上之前读主库"""
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _record_write(request: Request, session: AsyncSession) -> None:
+    if session.info.get("wrote"):
+        request.state.db_written = True
+
+
+async def get_db(request: Request) -> AsyncSession:
     """
-    获取数据库会话
+    获取数据库会话（主库）
     依赖注入使用，自动关闭会话
     """
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
+            _record_write(request, session)
+            await session.close()
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    获取只读路由会话
+    读语句发往轮询选出的副本（SQLite 为只读连接池）；客户端刚写过数据、
+    没有可用副本、或同一会话中已经写过时使用主库
+    """
+    async with AsyncSessionLocal() as session:
+        replica = None
+        if replica_set.enabled and not _pinned_to_primary(request):
+            replica = replica_set.choose()
+        # SQLite 的只读连接池与写连接读同一个文件，没有复制延迟，无需固定主库
+        session.info["replica"] = replica or read_engine
+        try:
+            yield session
+        finally:
+            _record_write(request, session)
             await session.close()
 
 
+class ReadAfterWriteMiddleware:
+    """
+    读写一致性中间件
+    请求中发生写操作时下发 db_pin Cookie，后续 DATABASE_REPLICA_MAX_LAG 秒内
+    该客户端的读请求固定在主库，避免读到复制尚未追上的旧数据
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_set.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            # request.state 即 scope["state"]，依赖的清理代码在响应发送前执行
+            if message["type"] == "http.response.start" and scope.get("state", {}).get("db_written"):
+                max_age = math.ceil(settings.DATABASE_REPLICA_MAX_LAG)
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={time.time() + max_age:.3f}; "
+                    f"Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+
+async def dispose_engines():
+    """
+    关闭所有连接池
+    aiosqlite 的每个连接都占用一个后台线程，未关闭的连接会阻止进程退出
+    """
+    await replica_set.stop()
+    if read_engine is not None:
+        await read_engine.dispose()
+    await engine.dispose()
+
+
 async def create_tables():
     """
     创建数据库表（用于初始化）
@@ -0,0 +1,367 @@
+"""
+用户变更事件模块
+事件与用户变更在同一事务中写入发件箱表；提交后放入进程内缓冲区即返回，请求路径不等待 Redis。
+后台任务把缓冲区中的事件成批 pipeline XADD 到 Redis Stream，成功后删除发件箱记录；
+缓冲区已满、Redis 不可用或进程退出时，事件留在发件箱中，由补发任务定期投递（至少一次，消费方按 event_id 去重）
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.metrics import USER_EVENTS
+from app.models.event import UserEventOutbox
+
+logger = logging.getLogger(__name__)
+
+USER_CREATED = "user.created"
+USER_UPDATED = "user.updated"
+USER_ACTIVATED = "user.activated"
+USER_DEACTIVATED = "user.deactivated"
+
+_PUBLISHED = USER_EVENTS.labels("published")
+_DEFERRED = USER_EVENTS.labels("deferred")
+_FAILED = USER_EVENTS.labels("failed")
+_RELAYED = USER_EVENTS.labels("relayed")
+
+# 消费者读取或确认失败后的重试间隔（秒）
+_CONSUMER_RETRY_DELAY = 1.0
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _fields(record: UserEventOutbox) -> Dict[str, str]:
+    """发件箱记录转换为 Stream 条目"""
+    return {
+        "event_id": str(record.id),
+        "type": record.event_type,
+        "user_id": str(record.user_id),
+        "data": record.data,
+        "occurred_at": record.created_at.isoformat(),
+    }
+
+
+class UserEventPublisher:
+    """
+    用户事件发布器
+    record() 在业务事务中写入发件箱，事务提交后调用 emit() 交给后台发送
+    """
+
+    def __init__(self):
+        self.redis = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._relay: Optional[asyncio.Task] = None
+        self._closing = False
+        self.published = 0
+        self.deferred = 0
+        self.failed = 0
+        self.relayed = 0
+        self.batches = 0
+
+    def bind(self, redis_client) -> None:
+        """绑定 Redis 客户端，传入 None 表示只写发件箱"""
+        self.redis = redis_client
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None
+
+    def record(
+        self, db: AsyncSession, event_type: str, changes: Iterable[Tuple[int, dict]]
+    ) -> List[UserEventOutbox]:
+        """在当前事务中为每个 (user_id, data) 写入发件箱记录，随业务数据一起提交"""
+        if not settings.USER_EVENTS_ENABLED:
+            return []
+        records = [
+            UserEventOutbox(
+                event_type=event_type,
+                user_id=user_id,
+                data=json.dumps(data, ensure_ascii=False, default=_json_default),
+            )
+            for user_id, data in changes
+        ]
+        db.add_all(records)
+        return records
+
+    def emit(self, records: Sequence[UserEventOutbox]) -> None:
+        """事务提交后调用，放入缓冲区即返回；缓冲区已满时留给发件箱补发"""
+        if not records or self._queue is None:
+            return
+        for record in records:
+            try:
+                self._queue.put_nowait((record.id, _fields(record)))
+            except asyncio.QueueFull:
+                self.deferred += 1
+                _DEFERRED.inc()
+
+    async def _xadd(self, entries: List[Dict[str, str]]) -> None:
+        """一个 pipeline 发送一批事件"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for fields in entries:
+                pipe.xadd(
+                    settings.USER_EVENTS_STREAM,
+                    fields,
+                    maxlen=settings.USER_EVENTS_STREAM_MAXLEN,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+    async def _flush(self, batch: List[Tuple[int, Dict[str, str]]]) -> None:
+        try:
+            await self._xadd([fields for _, fields in batch])
+        except (RedisError, OSError) as e:
+            # 发件箱记录仍在，超过重试时间后由补发任务投递
+            self.failed += len(batch)
+            _FAILED.inc(len(batch))
+            logger.warning(f"用户事件发送失败，{len(batch)} 条留待发件箱补发: {e}")
+            return
+
+        self.published += len(batch)
+        self.batches += 1
+        _PUBLISHED.inc(len(batch))
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    delete(UserEventOutbox).where(UserEventOutbox.id.in_([id for id, _ in batch]))
+                )
+        except SQLAlchemyError as e:
+            # 记录未删除会被再次投递，消费方按 event_id 去重
+            logger.warning(f"删除已发送的发件箱记录失败: {e}")
+
+    async def _run_flusher(self) -> None:
+        while True:
+            # 等待第一条事件，再取走缓冲区中已有的事件组成一批；发送期间到达的事件自然攒成下一批
+            batch = [await self._queue.get()]
+            while len(batch) < settings.USER_EVENTS_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                if self.redis is not None:
+                    await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def relay(self) -> int:
+        """投递发件箱中超时未发送的事件，返回投递数量"""
+        if self.redis is None:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.USER_EVENTS_OUTBOX_RETRY_AFTER)
+        # 读取、发送、删除分开进行，等待 Redis 期间不占用数据库连接和事务；
+        # 多个 worker 同时补发可能重复投递，消费方按 event_id 去重
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(UserEventOutbox)
+                .where(UserEventOutbox.created_at < cutoff)
+                .order_by(UserEventOutbox.id)
+                .limit(settings.USER_EVENTS_BATCH_SIZE)
+            )
+            rows = result.all()
+        if not rows:
+            return 0
+
+        await self._xadd([_fields(row) for row in rows])
+        async with engine.begin() as conn:
+            await conn.execute(
+                delete(UserEventOutbox).where(UserEventOutbox.id.in_([row.id for row in rows]))
+            )
+        self.relayed += len(rows)
+        _RELAYED.inc(len(rows))
+        return len(rows)
+
+    async def _run_relay(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(settings.USER_EVENTS_OUTBOX_INTERVAL)
+            try:
+                # 积压较多时连续补发，直到不足一批
+                while await self.relay() >= settings.USER_EVENTS_BATCH_SIZE:
+                    pass
+            except (RedisError, OSError, SQLAlchemyError) as e:
+                logger.warning(f"发件箱补发失败: {e}")
+
+    def start(self) -> None:
+        """启动后台发送与补发任务"""
+        if not settings.USER_EVENTS_ENABLED or self._flusher is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=settings.USER_EVENTS_BUFFER_SIZE)
+        self._flusher = asyncio.create_task(self._run_flusher())
+        self._relay = asyncio.create_task(self._run_relay())
+
+    async def stop(self) -> None:
+        """发送完缓冲区中剩余的事件后停止，发送失败的留在发件箱"""
+        if self._flusher is None:
+            return
+        self._closing = True
+        # 发送任务空闲时再取消，避免在数据库提交过程中被取消
+        if not self._flusher.done():
+            await self._queue.join()
+        for task in (self._relay, self._flusher):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        self._relay = None
+        self._queue = None
+
+    def stats(self) -> dict:
+        """事件发送统计"""
+        return {
+            "enabled": settings.USER_EVENTS_ENABLED,
+            "running": self.running,
+            "stream": settings.USER_EVENTS_STREAM,
+            "buffered": self._queue.qsize() if self._queue is not None else 0,
+            "buffer_size": settings.USER_EVENTS_BUFFER_SIZE,
+            "published": self.published,
+            "batches": self.batches,
+            "deferred": self.deferred,
+            "failed": self.failed,
+            "relayed": self.relayed,
+        }
+
+
+# 全局用户事件发布器（在应用启动时绑定 Redis 并启动）
+user_events = UserEventPublisher()
+
+
+class UserEvent(NamedTuple):
+    stream_id: str
+    event_id: int
+    type: str
+    user_id: int
+    data: dict
+    occurred_at: str
+
+
+class EventConsumer:
+    """
+    用户事件消费组辅助类，供订阅用户事件的服务使用
+    每次 XREADGROUP 读取一批，处理完成后一次 XACK；
+    消费者崩溃后未确认的事件超过 claim_idle 后由组内其他消费者接管（XAUTOCLAIM）
+
+    XREADGROUP 的阻塞时间必须小于客户端的 socket_timeout，否则没有新事件时命令会超时；
+    默认 block_ms 为共享客户端 REDIS_SOCKET_TIMEOUT 的一半，需要更长的阻塞时间时
+    应使用 socket_timeout 大于 block_ms 的专用客户端
+
+    用法:
+        consumer = EventConsumer(redis_manager.client, group="order-service", consumer=hostname)
+        await consumer.run(handle_events)  # handle_events(List[UserEvent]) 为协程
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        group: str,
+        consumer: str,
+        stream: Optional[str] = None,
+        count: int = 100,
+        block_ms: Optional[int] = None,
+        claim_idle: float = 60.0,
+    ):
+        self.redis = redis_client
+        self.group = group
+        self.consumer = consumer
+        self.stream = stream or settings.USER_EVENTS_STREAM
+        self.count = count
+        if block_ms is None:
+            block_ms = int(settings.REDIS_SOCKET_TIMEOUT * 1000 / 2)
+        self.block_ms = block_ms
+        self.claim_idle = claim_idle
+        self._last_claim = 0.0
+
+    async def ensure_group(self) -> None:
+        """创建消费组（Stream 不存在时一并创建），已存在时忽略"""
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _parse(entries) -> List[UserEvent]:
+        events = []
+        for stream_id, fields in entries:
+            if not fields:  # 已被裁剪的条目
+                continue
+            events.append(UserEvent(
+                stream_id=stream_id,
+                event_id=int(fields["event_id"]),
+                type=fields["type"],
+                user_id=int(fields["user_id"]),
+                data=json.loads(fields["data"]),
+                occurred_at=fields["occurred_at"],
+            ))
+        return events
+
+    async def claim(self) -> List[UserEvent]:
+        """接管组内空闲超过 claim_idle 的未确认事件"""
+        self._last_claim = time.monotonic()
+        _, entries, *_ = await self.redis.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=int(self.claim_idle * 1000), start_id="0-0", count=self.count,
+        )
+        return self._parse(entries)
+
+    async def read(self) -> List[UserEvent]:
+        """读取一批事件：定期先接管超时事件，否则读取新事件（最多阻塞 block_ms）"""
+        if time.monotonic() - self._last_claim >= self.claim_idle / 2:
+            events = await self.claim()
+            if events:
+                return events
+
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.count, block=self.block_ms
+        )
+        if not response:
+            return []
+        return self._parse(response[0][1])
+
+    async def ack(self, events: Sequence[UserEvent]) -> int:
+        """确认一批事件"""
+        if not events:
+            return 0
+        return await self.redis.xack(self.stream, self.group, *[e.stream_id for e in events])
+
+    async def run(self, handler) -> None:
+        """
+        持续消费：处理成功后确认；处理失败不确认，超时后重新投递
+        Redis 读取或确认失败时等待后重试，消费循环不会因 Redis 故障退出
+        """
+        group_ready = False
+        while True:
+            try:
+                if not group_ready:
+                    await self.ensure_group()
+                    group_ready = True
+                events = await self.read()
+            except (RedisError, OSError) as e:
+                logger.warning(f"读取用户事件失败，稍后重试: {e}")
+                await asyncio.sleep(_CONSUMER_RETRY_DELAY)
+                continue
+            if not events:
+                continue
+            try:
+                await handler(events)
+            except Exception as e:
+                logger.error(f"用户事件处理失败，{len(events)} 条等待重新投递: {e}")
+                continue
+            try:
+                await self.ack(events)
+            except (RedisError, OSError) as e:
+                # 未确认的事件超时后重新投递，消费方按 event_id 去重
+                logger.warning(f"确认用户事件失败，{len(events)} 条将重新投递: {e}")
@@ -0,0 +1,128 @@
+"""
+健康探测模块
+后台任务按固定间隔探测数据库和 Redis，健康检查端点只读取最近一次的结果，
+探针请求再频繁也不会占用连接池；结果过旧时标记为 stale
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """
+    数据库与 Redis 健康探测
+    后台任务运行时，端点只读取快照；未启动后台任务时（如测试、脚本），
+    快照缺失或超过一个探测间隔才由请求触发一次探测，并发请求共享同一次探测
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.redis = None
+        self._snapshot: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.probes = 0
+
+    def bind(self, redis_client) -> None:
+        """绑定 Redis 客户端，传入 None 时 Redis 状态为 unavailable"""
+        self.redis = redis_client
+
+    async def _select_one(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _check_database(self) -> dict:
+        start = time.perf_counter()
+        try:
+            # 超时同时覆盖取连接（连接池耗尽、建连挂起）和执行查询
+            await asyncio.wait_for(self._select_one(), settings.HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            return {"status": "error", "error": str(e) or type(e).__name__}
+        return {"status": "ok", "response_time": f"{(time.perf_counter() - start) * 1000:.2f}ms"}
+
+    async def _check_redis(self) -> dict:
+        if self.redis is None:
+            return {"status": "unavailable"}
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.redis.ping(), settings.HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            return {"status": "error", "error": str(e) or type(e).__name__}
+        return {"status": "ok", "response_time": f"{(time.perf_counter() - start) * 1000:.2f}ms"}
+
+    async def probe(self) -> dict:
+        """探测一次并更新快照"""
+        database, redis_status = await asyncio.gather(self._check_database(), self._check_redis())
+        self.probes += 1
+        self._snapshot = {"database": database, "redis": redis_status}
+        self._checked_at = time.time()
+        if database["status"] != "ok":
+            logger.warning(f"数据库健康检查失败: {database['error']}")
+        return self._snapshot
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"健康探测异常: {e}")
+
+    def start(self) -> None:
+        """启动后台探测（启动前应先调用一次 probe()，保证端点有快照可读）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台探测"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def age(self) -> float:
+        return time.time() - self._checked_at
+
+    async def snapshot(self) -> dict:
+        """最近一次探测结果，附带探测时间、距今秒数和是否过旧"""
+        if self._task is None and (self._snapshot is None or self.age > settings.HEALTH_CHECK_INTERVAL):
+            async with self._lock:
+                # 等待锁期间其他请求可能已完成探测
+                if self._snapshot is None or self.age > settings.HEALTH_CHECK_INTERVAL:
+                    await self.probe()
+
+        if self._snapshot is None:
+            # 后台任务已启动但首次探测尚未完成
+            return {
+                "database": {"status": "unknown"},
+                "redis": {"status": "unknown"},
+                "checked_at": None,
+                "age_seconds": None,
+                "stale": True,
+            }
+
+        age = self.age
+        return {
+            **self._snapshot,
+            "checked_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._checked_at)),
+            "age_seconds": round(age, 3),
+            "stale": age > settings.HEALTH_CHECK_STALE_AFTER,
+        }
+
+
+# 全局健康探测（探测主库，副本由 replica_set 单独检查）
+health_prober = HealthProber(engine)
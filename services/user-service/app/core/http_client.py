@@ -0,0 +1,239 @@
+"""
+服务间 HTTP 客户端模块
+每个上游服务一个共享的 aiohttp ClientSession（在应用启动时创建），连接保活复用、DNS 结果缓存、
+连接数有上限；每次调用有严格超时，幂等请求在连接失败、超时和 502/503/504 时按带抖动的指数退避重试，
+上游持续失败时熔断，熔断期间直接失败而不再等待超时
+
+用法:
+    response = await http_clients.get("order").request("GET", "/api/orders", params={"user_id": 1})
+    orders = response.json()
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.config import settings
+from app.core.metrics import (
+    UPSTREAM_CONNECTIONS, UPSTREAM_REQUEST_DURATION, UPSTREAM_REQUESTS, UPSTREAM_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# 可安全重试的方法；其他方法需调用方显式传入 retry=True（如带幂等键的 POST）
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# 视为上游不可用的状态码：重试并计入熔断
+_UNAVAILABLE_STATUSES = {502, 503, 504}
+# 视为上游不可用的异常：连接失败、连接断开、超时
+_UNAVAILABLE_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+
+class UpstreamError(Exception):
+    """上游服务调用失败（连接失败、超时等，重试后仍未成功）"""
+
+    def __init__(self, upstream: str, message: str):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+class UpstreamUnavailable(UpstreamError, CircuitOpenError):
+    """上游服务熔断中"""
+
+
+class UpstreamResponse:
+    """已读取完毕的上游响应，连接在返回前已归还连接池"""
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class Upstream:
+    """单个上游服务的连接池、熔断器与调用统计"""
+
+    def __init__(self, name: str, base_url: str):
+        self.name = name
+        self.base_url = base_url
+        self.breaker = CircuitBreaker(
+            f"上游服务 {name}",
+            settings.HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD,
+            settings.HTTP_CLIENT_BREAKER_RECOVERY_TIMEOUT,
+        )
+        self.connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_CLIENT_POOL_SIZE,
+            limit_per_host=settings.HTTP_CLIENT_POOL_SIZE_PER_HOST,
+            keepalive_timeout=settings.HTTP_CLIENT_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=settings.HTTP_CLIENT_DNS_CACHE_TTL,
+        )
+        self.session = aiohttp.ClientSession(
+            base_url=base_url,
+            connector=self.connector,
+            timeout=aiohttp.ClientTimeout(
+                total=settings.HTTP_CLIENT_TOTAL_TIMEOUT,
+                connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+                sock_read=settings.HTTP_CLIENT_READ_TIMEOUT,
+            ),
+            headers={"User-Agent": settings.SERVICE_NAME or "user-service"},
+        )
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self._retry_counter = UPSTREAM_RETRIES.labels(name)
+        self._in_use_gauge = UPSTREAM_CONNECTIONS.labels(name, "in_use")
+        self._idle_gauge = UPSTREAM_CONNECTIONS.labels(name, "idle")
+
+    def _pool_usage(self) -> tuple:
+        """使用中与空闲保活的连接数"""
+        acquired = getattr(self.connector, "_acquired", None)
+        conns = getattr(self.connector, "_conns", None)
+        in_use = len(acquired) if acquired is not None else 0
+        idle = sum(len(c) for c in conns.values()) if conns is not None else 0
+        return in_use, idle
+
+    def _observe(self, method: str, status: str, elapsed: float) -> None:
+        UPSTREAM_REQUESTS.labels(self.name, method, status).inc()
+        UPSTREAM_REQUEST_DURATION.labels(self.name, method).observe(elapsed)
+        in_use, idle = self._pool_usage()
+        self._in_use_gauge.set(in_use)
+        self._idle_gauge.set(idle)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """带完全抖动的指数退避，避免大量客户端同时重试"""
+        ceiling = min(settings.HTTP_CLIENT_RETRY_BACKOFF_MAX, settings.HTTP_CLIENT_RETRY_BACKOFF * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    async def _attempt(self, method: str, path: str, **kwargs) -> UpstreamResponse:
+        """发送一次请求，读取完整响应体后归还连接"""
+        if not self.breaker.allow():
+            self._observe(method, "circuit_open", 0.0)
+            raise UpstreamUnavailable(self.name, "熔断中")
+
+        start = time.perf_counter()
+        try:
+            async with self.session.request(method, path, **kwargs) as response:
+                body = await response.read()
+        except _UNAVAILABLE_ERRORS:
+            self.breaker.record_failure()
+            self._observe(method, "error", time.perf_counter() - start)
+            raise
+        except aiohttp.ClientError:
+            self.breaker.record_success()
+            self._observe(method, "error", time.perf_counter() - start)
+            raise
+
+        if response.status in _UNAVAILABLE_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self._observe(method, f"{response.status // 100}xx", time.perf_counter() - start)
+        return UpstreamResponse(response.status, response.headers, body)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        retry: Optional[bool] = None,
+        retries: Optional[int] = None,
+        **kwargs,
+    ) -> UpstreamResponse:
+        """
+        调用上游服务，参数与 aiohttp.ClientSession.request 相同（path 相对于基础 URL）
+        4xx / 5xx 响应照常返回；重试后仍连接失败或超时时抛出 UpstreamError，熔断中抛出 UpstreamUnavailable
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in _IDEMPOTENT_METHODS
+        max_retries = (settings.HTTP_CLIENT_RETRIES if retries is None else retries) if retry else 0
+        self.requests += 1
+
+        attempt = 0
+        while True:
+            try:
+                response = await self._attempt(method, path, **kwargs)
+            except UpstreamUnavailable:
+                self.errors += 1
+                raise
+            except _UNAVAILABLE_ERRORS as e:
+                if attempt >= max_retries:
+                    self.errors += 1
+                    raise UpstreamError(self.name, f"{method} {path} 失败: {e!r}") from e
+            except aiohttp.ClientError as e:
+                self.errors += 1
+                raise UpstreamError(self.name, f"{method} {path} 失败: {e!r}") from e
+            else:
+                if response.status not in _UNAVAILABLE_STATUSES or attempt >= max_retries:
+                    return response
+
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+            self.retries += 1
+            self._retry_counter.inc()
+
+    async def close(self) -> None:
+        await self.session.close()
+
+    def stats(self) -> dict:
+        """连接池、熔断器与调用统计"""
+        in_use, idle = self._pool_usage()
+        return {
+            "base_url": self.base_url,
+            "breaker": self.breaker.stats(),
+            "pool": {
+                "limit": settings.HTTP_CLIENT_POOL_SIZE,
+                "limit_per_host": settings.HTTP_CLIENT_POOL_SIZE_PER_HOST,
+                "in_use": in_use,
+                "idle": idle,
+            },
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+        }
+
+
+class HttpClients:
+    """所有上游服务的客户端，在应用启动时创建，关闭时统一释放连接"""
+
+    def __init__(self):
+        self.upstreams: Dict[str, Upstream] = {}
+
+    def start(self, services: Optional[Dict[str, str]] = None) -> None:
+        """按 UPSTREAM_SERVICES 创建各上游服务的连接池（需在事件循环中调用）"""
+        for name, base_url in (settings.UPSTREAM_SERVICES if services is None else services).items():
+            if name not in self.upstreams:
+                self.upstreams[name] = Upstream(name, base_url)
+
+    def get(self, name: str) -> Upstream:
+        try:
+            return self.upstreams[name]
+        except KeyError:
+            raise KeyError(f"未配置上游服务: {name}") from None
+
+    async def close(self) -> None:
+        for upstream in self.upstreams.values():
+            await upstream.close()
+        self.upstreams.clear()
+
+    def stats(self) -> dict:
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
+
+
+# 全局上游服务客户端（在应用启动时创建连接池）
+http_clients = HttpClients()
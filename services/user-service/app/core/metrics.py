@@ -0,0 +1,195 @@
+"""
+Prometheus 指标模块
+记录每个路由的请求数、状态码类别、耗时分布和处理中的请求数，
+以及 SQL 语句、Redis 命令、bcrypt 计算和上游服务调用的耗时
+
+gunicorn 多 worker 运行时需设置环境变量 PROMETHEUS_MULTIPROC_DIR：
+各 worker 将指标写入该目录下的 mmap 文件，/metrics 汇总所有 worker 的数据；
+目录的清空和退出 worker 的清理见 gunicorn.conf.py
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.core.config import settings
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    # 迁移命令等在 gunicorn 之前运行的进程同样会写入指标文件
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# 未匹配任何路由的请求（如 404）统一使用该标签，避免路径作为标签值造成基数爆炸
+UNMATCHED_ROUTE = "<unmatched>"
+# 同理，非标准的请求方法统一记为 OTHER
+_HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP 请求数",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP 请求耗时（秒）",
+    ["method", "route"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "处理中的 HTTP 请求数",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL 语句耗时（秒）",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Redis 命令耗时（秒）",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt 计算耗时（秒，不含线程池排队）",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+CACHE_LOOKUPS = Counter(
+    "user_cache_lookups_total",
+    "用户缓存查找次数（按缓存层级与是否命中）",
+    ["tier", "result"],
+)
+
+USER_EVENTS = Counter(
+    "user_events_total",
+    "用户变更事件数量（published 实时投递，deferred 缓冲区满，failed 投递失败，relayed 发件箱补发）",
+    ["outcome"],
+)
+
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total",
+    "上游服务调用次数（status 为状态码类别，或 error / circuit_open）",
+    ["upstream", "method", "status"],
+)
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "上游服务单次调用耗时（秒，不含重试等待）",
+    ["upstream", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total",
+    "上游服务调用重试次数",
+    ["upstream"],
+)
+UPSTREAM_CONNECTIONS = Gauge(
+    "upstream_connections",
+    "上游服务连接池中的连接数（in_use 使用中，idle 空闲保活）",
+    ["upstream", "state"],
+    multiprocess_mode="livesum",
+)
+
+_DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def observe_db_query(statement: str, duration: float) -> None:
+    """按语句类型记录 SQL 耗时"""
+    operation = statement.lstrip()[:6].upper()
+    DB_QUERY_DURATION.labels(operation if operation in _DB_OPERATIONS else "OTHER").observe(duration)
+
+
+def render_metrics() -> bytes:
+    """生成 Prometheus 文本格式的指标，多进程模式下汇总所有 worker"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class InstrumentedPipeline(Pipeline):
+    """记录整个管道执行耗时的 Redis 管道"""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.labels("PIPELINE").observe(time.perf_counter() - start)
+
+
+class InstrumentedRedis(Redis):
+    """
+    记录命令耗时的 Redis 客户端
+    所有命令（含 Lua 脚本的 EVALSHA）都经过 execute_command，按命令名记录耗时
+    """
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.labels(str(args[0]).upper()).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件（纯 ASGI 实现）
+    路由标签使用路由模板（如 /api/users/{user_id}），路由匹配后才能从 scope 中取得
+    labels() 每次都要校验标签并加锁，标签子项按标签组合缓存，标签组合数量有限
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_progress = {}
+        self._children = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in _HTTP_METHODS else "OTHER"
+        status_code = 500
+        in_progress = self._in_progress.get(method)
+        if in_progress is None:
+            in_progress = self._in_progress[method] = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            route = scope.get("route")
+            route_path = route.path if route is not None else UNMATCHED_ROUTE
+            key = (method, route_path, status_code // 100)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    REQUESTS.labels(method, route_path, f"{status_code // 100}xx"),
+                    REQUEST_DURATION.labels(method, route_path),
+                )
+            children[0].inc()
+            children[1].observe(duration)
@@ -0,0 +1,203 @@
+"""
+数据库迁移模块
+schema_version 表记录已执行的迁移版本，迁移由单独的命令执行一次（python -m app.migrate），
+服务启动时只读取版本号：结构已是最新时不执行任何 DDL，多个 worker 同时启动也不会竞争建表
+"""
+import logging
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text, func, inspect, select, text,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.models.user import create_search_index
+
+logger = logging.getLogger(__name__)
+
+# 版本表不属于业务模型，单独的 MetaData 避免被 create_all / drop_all 处理
+_version_metadata = MetaData()
+
+schema_version_table = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+# 迁移锁，多个实例同时执行迁移命令时串行执行
+_LOCK_KEY = 0x75736572  # PostgreSQL advisory lock 键
+_LOCK_NAME = "user_service_migrate"  # MySQL GET_LOCK 名称
+_LOCK_TIMEOUT = 60
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable  # 接收同步连接
+
+
+class SchemaOutdated(RuntimeError):
+    """数据库结构版本低于代码要求"""
+
+
+# ============================================
+# 迁移中的表结构
+# 按迁移发布时的结构固定定义，不引用当前模型：模型后续变化不会改变已发布迁移执行的 DDL，
+# 空库与旧库按同样的迁移序列建立出相同的结构
+# ============================================
+
+def _users_table(metadata: MetaData, *indexes) -> Table:
+    """初始版本的用户表"""
+    return Table(
+        "users",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("username", String(50), unique=True, index=True, nullable=False),
+        Column("email", String(255), unique=True, index=True, nullable=False),
+        Column("hashed_password", String(255), nullable=False),
+        Column("full_name", String(100), nullable=True),
+        Column("is_active", Boolean, default=True),
+        Column("is_superuser", Boolean, default=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+        *indexes,
+    )
+
+
+_v1_users = _users_table(MetaData())
+
+# 迁移 2 后用户表的全部索引（初始版本已有的由 checkfirst 跳过）
+_v2_users = _users_table(
+    MetaData(),
+    Index("ix_users_created_at_id", "created_at", "id"),
+    Index("ix_users_is_active_created_at_id", "is_active", "created_at", "id"),
+    Index(
+        "ix_users_superuser_created_at_id",
+        "created_at",
+        "id",
+        postgresql_where=text("is_superuser IS true"),
+        sqlite_where=text("is_superuser IS 1"),
+    ),
+)
+
+_v3_user_event_outbox = Table(
+    "user_event_outbox",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("event_type", String(50), nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("data", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+
+def _initial_schema(connection) -> None:
+    # 表已存在时跳过，兼容引入版本表之前由 create_all 建立的数据库
+    _v1_users.create(connection, checkfirst=True)
+
+
+def _user_list_indexes(connection) -> None:
+    # 用户列表索引和搜索索引，旧库中已存在的跳过
+    for index in sorted(_v2_users.indexes, key=lambda index: index.name):
+        index.create(connection, checkfirst=True)
+    create_search_index(connection)
+
+
+def _user_event_outbox(connection) -> None:
+    _v3_user_event_outbox.create(connection, checkfirst=True)
+
+
+# 按版本号排列；已发布的迁移不能修改，结构变更需追加新的迁移
+MIGRATIONS: List[Migration] = [
+    Migration(1, "初始表结构", _initial_schema),
+    Migration(2, "用户列表索引与搜索索引", _user_list_indexes),
+    Migration(3, "用户事件发件箱", _user_event_outbox),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _read_version(connection) -> Optional[int]:
+    """已执行的最高版本，没有版本表时为 None"""
+    if not inspect(connection).has_table(schema_version_table.name):
+        return None
+    return connection.execute(select(func.max(schema_version_table.c.version))).scalar()
+
+
+def _lock(connection) -> None:
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        # 事务级锁，提交或回滚时自动释放
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    elif dialect == "mysql":
+        connection.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"), {"name": _LOCK_NAME, "timeout": _LOCK_TIMEOUT}
+        )
+    elif dialect == "sqlite":
+        # 读取版本之前取得写锁（等待时间受 busy_timeout 限制），多个 worker 同时自动迁移时依次执行，
+        # 后执行的读到已记录的版本，不会因过期的 WAL 快照或重复的版本记录而启动失败
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _unlock(connection) -> None:
+    if connection.dialect.name == "mysql":
+        connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": _LOCK_NAME})
+
+
+def _migrate(connection) -> List[Migration]:
+    """执行待执行的迁移（同步连接），返回本次记录的迁移"""
+    _lock(connection)
+    try:
+        current = _read_version(connection)
+        schema_version_table.create(connection, checkfirst=True)
+
+        # 空库、旧库与已有版本的库都按顺序执行待执行的迁移
+        pending = [m for m in MIGRATIONS if m.version > (current or 0)]
+        for migration in pending:
+            logger.info(f"执行迁移 {migration.version}: {migration.description}")
+            migration.upgrade(connection)
+
+        if pending:
+            connection.execute(
+                schema_version_table.insert(),
+                [{"version": m.version, "description": m.description} for m in pending],
+            )
+        return pending
+    finally:
+        _unlock(connection)
+
+
+async def current_version(engine: AsyncEngine) -> Optional[int]:
+    """数据库当前的结构版本"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_read_version)
+
+
+async def migrate(engine: AsyncEngine) -> List[Migration]:
+    """在一个事务中执行所有待执行的迁移"""
+    async with engine.begin() as conn:
+        return await conn.run_sync(_migrate)
+
+
+async def check_schema(engine: AsyncEngine) -> int:
+    """
+    启动时检查结构版本
+    已是最新时只执行一次查询；版本落后时按 DATABASE_AUTO_MIGRATE 自动迁移或拒绝启动
+    """
+    version = await current_version(engine)
+    if version is not None and version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            logger.warning(f"数据库结构版本 {version} 高于代码版本 {SCHEMA_VERSION}，可能正在回滚部署")
+        return version
+
+    if not settings.DATABASE_AUTO_MIGRATE:
+        raise SchemaOutdated(
+            f"数据库结构版本 {version or 0} 低于 {SCHEMA_VERSION}，请先执行 python -m app.migrate"
+        )
+
+    logger.info(f"数据库结构版本 {version or 0} 低于 {SCHEMA_VERSION}，自动执行迁移")
+    await migrate(engine)
+    return SCHEMA_VERSION
@@ -0,0 +1,29 @@
+"""
+分页工具模块
+提供基于游标（keyset）的分页支持，游标对客户端不透明
+"""
+import base64
+import json
+
+
+def encode_cursor(position: dict) -> str:
+    """将排序键位置编码为不透明游标"""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    解析游标
+    游标格式错误时抛出 ValueError
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+    if not isinstance(position, dict):
+        raise ValueError("无效的分页游标")
+
+    return position
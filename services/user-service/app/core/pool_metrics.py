@@ -0,0 +1,132 @@
+"""
+连接池监控模块
+通过 SQLAlchemy 连接池事件统计连接使用情况，为连接池容量规划提供数据：
+每个 worker 的连接上限为 pool_size + max_overflow，
+总连接数 = gunicorn worker 数 × 该上限，需小于数据库的 max_connections
+"""
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    记录获取连接耗时的连接池
+    SQLAlchemy 没有"开始等待连接"的事件，只能在 connect() 外层计时，
+    耗时包含排队等待、新建连接和 pre-ping
+    """
+
+    metrics: Optional["PoolMetrics"] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start, timed_out)
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，统计对象随之转移
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class PoolMetrics:
+    """单个引擎的连接池统计"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[AsyncEngine] = None
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """注册连接池事件（注册在引擎上，连接池重建后依然有效）"""
+        self.engine = engine
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.metrics = self
+
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.in_use = max(0, self.in_use - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def observe_wait(self, seconds: float, timed_out: bool = False) -> None:
+        """记录一次获取连接的耗时"""
+        self.wait_count += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        if timed_out:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        """连接池当前状态与累计统计"""
+        pool = self.engine.pool if self.engine is not None else None
+        data = {
+            "pool": type(pool).__name__ if pool is not None else None,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "idle": pool.checkedin(),
+                # overflow() 在未使用溢出连接时为负数
+                "overflow_in_use": max(0, pool.overflow()),
+            })
+        return data
+
+
+# 引擎名称 -> 统计对象
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(name: str, engine: AsyncEngine) -> PoolMetrics:
+    """为引擎注册连接池统计"""
+    metrics = PoolMetrics(name)
+    metrics.attach(engine)
+    pool_metrics[name] = metrics
+    return metrics
+
+
+def pool_stats() -> dict:
+    """所有引擎的连接池统计"""
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
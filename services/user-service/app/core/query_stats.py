@@ -0,0 +1,167 @@
+"""
+SQL 查询统计模块
+基于引擎的 before/after_cursor_execute 事件统计每个请求的语句数量和数据库耗时，
+记录慢查询，并在同一请求内同一语句重复执行过多时提示 N+1 查询
+每条语句只增加两次计时和一次字典计数，可在生产环境常开
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.metrics import observe_db_query
+
+logger = logging.getLogger(__name__)
+
+# 慢查询日志中 SQL 的最大长度
+_STATEMENT_LOG_LIMIT = 500
+
+
+class RequestQueryStats:
+    """单个请求的查询统计"""
+
+    __slots__ = ("route", "count", "duration", "statements")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        # 语句均为参数化 SQL，同一查询的文本相同（且来自编译缓存，哈希值已缓存）
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """重复次数达到阈值的语句"""
+        return [
+            (statement, times)
+            for statement, times in self.statements.most_common()
+            if times >= threshold
+        ]
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+class QueryStats:
+    """全局查询统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.duration = 0.0
+        self.slow_queries = 0
+        self.nplus1_requests = 0
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """在引擎上注册计时事件"""
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+
+        self.statements += 1
+        self.duration += duration
+        observe_db_query(statement, duration)
+
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, duration)
+
+        if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+            self.slow_queries += 1
+            logger.warning(
+                f"慢查询 {duration * 1000:.1f}ms "
+                f"[{stats.route if stats else '-'}]: {statement[:_STATEMENT_LOG_LIMIT]}"
+            )
+
+    def begin(self, route: str) -> RequestQueryStats:
+        """开始统计一个请求"""
+        stats = RequestQueryStats(route)
+        _current.set(stats)
+        return stats
+
+    def finish(self, stats: RequestQueryStats) -> None:
+        """请求结束，检查 N+1 查询"""
+        self.requests += 1
+        repeated = stats.repeated(settings.SQL_NPLUS1_THRESHOLD)
+        if repeated:
+            self.nplus1_requests += 1
+            for statement, times in repeated:
+                logger.warning(
+                    f"疑似 N+1 查询 [{stats.route}]: 同一语句执行 {times} 次: "
+                    f"{statement[:_STATEMENT_LOG_LIMIT]}"
+                )
+
+    def stats(self) -> dict:
+        """累计统计"""
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "avg_statements_per_request": round(self.statements / self.requests, 2) if self.requests else 0.0,
+            "total_db_time_ms": round(self.duration * 1000, 2),
+            "slow_queries": self.slow_queries,
+            "nplus1_requests": self.nplus1_requests,
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 执行上下文在 before/after 之间是同一个对象
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    """当前请求的查询统计（不在请求中时为 None）"""
+    return _current.get()
+
+
+# 全局查询统计
+query_stats = QueryStats()
+
+
+class QueryStatsMiddleware:
+    """
+    查询统计中间件（纯 ASGI 实现）
+    响应头中以 Server-Timing 返回本请求的数据库耗时和语句数量
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_INSTRUMENTATION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = query_stats.begin(f"{scope['method']} {scope['path']}")
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # 路由匹配后 scope 中才有 endpoint，用于日志中标明处理函数
+                endpoint = scope.get("endpoint")
+                if endpoint is not None:
+                    stats.route = f"{scope['method']} {scope['path']} ({endpoint.__name__})"
+                timing = f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"'
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.finish(stats)
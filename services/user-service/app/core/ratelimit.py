@@ -0,0 +1,272 @@
+"""
+限流模块
+令牌桶限流：Redis Lua 脚本原子地维护全局令牌桶，所有 worker 和实例共享配额
+进程内维护同参数的本地令牌桶作为前置过滤，明显超限的请求无需访问 Redis
+"""
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.auth import InvalidToken, token_verifier
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+
+# KEYS[1]: 令牌桶键  ARGV: 容量, 每毫秒补充的令牌数, 本次消耗
+# 使用 Redis 服务器时间，避免各实例时钟偏差
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    """限流判定结果"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # 令牌桶补满所需秒数
+    retry_after: int  # 被拒绝时距离下一个令牌的秒数
+
+
+def _result(allowed: bool, limit: int, tokens: float) -> RateLimitResult:
+    rate = limit / WINDOW_SECONDS
+    return RateLimitResult(
+        allowed=allowed,
+        limit=limit,
+        remaining=max(0, int(tokens)),
+        reset=math.ceil((limit - tokens) / rate),
+        retry_after=0 if allowed else max(1, math.ceil((1 - tokens) / rate)),
+    )
+
+
+class RateLimiter:
+    """
+    分布式令牌桶限流器
+    本地令牌桶与 Redis 令牌桶参数相同，本地桶只统计本进程的请求，
+    因此本地桶耗尽时全局桶必然也已耗尽，可以直接拒绝；
+    Redis 拒绝后在本地记录封禁截止时间，期间的请求同样不再访问 Redis
+    """
+
+    def __init__(self, prefix: str = "ratelimit"):
+        self.prefix = prefix
+        self.redis = None
+        self._script = None
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._blocked: "OrderedDict[str, float]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.prefiltered = 0
+        self.errors = 0
+
+    def bind(self, redis_client) -> None:
+        """绑定 Redis 客户端，传入 None 时只按进程内令牌桶限流"""
+        self.redis = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client else None
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def _remember(self, store: OrderedDict, name: str, value) -> None:
+        """写入有界字典，超出上限时淘汰最久未使用的键（淘汰只会让本地判定更宽松）"""
+        store[name] = value
+        store.move_to_end(name)
+        if len(store) > settings.RATE_LIMIT_LOCAL_MAX_KEYS:
+            store.popitem(last=False)
+
+    def _take_local(self, name: str, limit: int) -> RateLimitResult:
+        """消耗本地令牌桶"""
+        now = time.monotonic()
+        tokens, ts = self._buckets.get(name, (float(limit), now))
+        tokens = min(limit, tokens + (now - ts) * limit / WINDOW_SECONDS)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._remember(self._buckets, name, (tokens, now))
+        return _result(allowed, limit, tokens)
+
+    def _refund_local(self, name: str) -> None:
+        """退回一个本地令牌"""
+        state = self._buckets.get(name)
+        if state is not None:
+            self._buckets[name] = (state[0] + 1, state[1])
+
+    async def _take_redis(self, name: str, limit: int) -> RateLimitResult:
+        """执行 Lua 脚本，原子地消耗全局令牌桶"""
+        allowed, tokens = await self._script(
+            keys=[self.key(name)],
+            args=[limit, limit / (WINDOW_SECONDS * 1000), 1],
+        )
+        return _result(bool(int(allowed)), limit, float(tokens))
+
+    async def hit(self, name: str, limit: int) -> RateLimitResult:
+        """记录一次请求并返回是否放行"""
+        blocked_until = self._blocked.get(name)
+        if blocked_until is not None:
+            wait = blocked_until - time.monotonic()
+            if wait > 0:
+                self.prefiltered += 1
+                self.rejected += 1
+                return _result(False, limit, 1 - wait * limit / WINDOW_SECONDS)
+            del self._blocked[name]
+
+        result = self._take_local(name, limit)
+        if not result.allowed:
+            self.prefiltered += 1
+        elif self._script is not None:
+            try:
+                result = await self._take_redis(name, limit)
+            except (RedisError, OSError) as e:
+                # Redis 不可用时退化为单进程限流
+                self.errors += 1
+                logger.warning(f"限流脚本执行失败，使用进程内限流: {e}")
+            else:
+                if not result.allowed:
+                    # 全局桶未扣减，本地桶同样退回，保持本地令牌数不少于全局
+                    self._refund_local(name)
+                    self._remember(self._blocked, name, time.monotonic() + result.retry_after)
+
+        if result.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return result
+
+    def stats(self) -> dict:
+        """限流统计"""
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "prefiltered": self.prefiltered,
+            "errors": self.errors,
+            "local_keys": len(self._buckets),
+        }
+
+
+# 全局限流器（在应用启动时绑定 Redis 客户端）
+rate_limiter = RateLimiter()
+
+
+def _route_limit(method: str, path: str) -> Tuple[str, int]:
+    """
+    查找路由对应的限额
+    RATE_LIMIT_ROUTES 的键为 "方法 路径前缀"，取最长匹配，未匹配时使用全局限额
+    """
+    matched, limit = "default", settings.RATE_LIMIT_PER_MINUTE
+    matched_length = -1
+    for rule, rule_limit in settings.RATE_LIMIT_ROUTES.items():
+        rule_method, _, prefix = rule.partition(" ")
+        if rule_method in (method, "*") and path.startswith(prefix) and len(prefix) > matched_length:
+            matched, limit, matched_length = rule, rule_limit, len(prefix)
+    return matched, limit
+
+
+def _client_identity(scope) -> str:
+    """已认证请求按用户限流，其余按客户端 IP 限流"""
+    headers = dict(scope["headers"])
+
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            # 只解码（带进程内缓存），吊销检查留给业务依赖
+            return f"user:{token_verifier.decode(token).sub}"
+        except InvalidToken:
+            pass
+
+    if settings.RATE_LIMIT_TRUST_PROXY and b"x-real-ip" in headers:
+        return f"ip:{headers[b'x-real-ip'].decode('latin-1')}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _headers(result: RateLimitResult) -> list:
+    headers = [
+        (b"ratelimit-limit", str(result.limit).encode()),
+        (b"ratelimit-remaining", str(result.remaining).encode()),
+        (b"ratelimit-reset", str(result.reset).encode()),
+        (b"ratelimit-policy", f"{result.limit};w={WINDOW_SECONDS}".encode()),
+    ]
+    if not result.allowed:
+        headers.append((b"retry-after", str(result.retry_after).encode()))
+    return headers
+
+
+class RateLimitMiddleware:
+    """
+    限流中间件（纯 ASGI 实现，不缓冲响应体）
+    放行的响应附带 RateLimit-* 头，超限时直接返回 429
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        exempt = [prefix for prefix in settings.RATE_LIMIT_EXEMPT_PATHS.split(",") if prefix]
+        if any(path.startswith(prefix) for prefix in exempt):
+            await self.app(scope, receive, send)
+            return
+
+        rule, limit = _route_limit(scope["method"], path)
+        if limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{rule.replace(' ', ':')}:{_client_identity(scope)}"
+        result = await rate_limiter.hit(name, limit)
+        headers = _headers(result)
+
+        if not result.allowed:
+            body = json.dumps({"detail": "请求过于频繁，请稍后重试"}, ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
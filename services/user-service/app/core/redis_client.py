@@ -0,0 +1,179 @@
+"""
+Redis 客户端管理模块
+所有组件共用一个有上限的连接池，命令读写均有超时；
+连接失败或超时连续发生时熔断，熔断期间命令立即失败（调用方按 Redis 不可用处理并降级），
+后台任务定期 PING，Redis 恢复后立即关闭熔断
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.config import settings
+from app.core.metrics import InstrumentedPipeline, InstrumentedRedis
+
+logger = logging.getLogger(__name__)
+
+# 视为 Redis 不可用的错误；其他 RedisError（如脚本错误）说明服务端可以响应
+_UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError)
+
+
+class RedisCircuitOpen(CircuitOpenError, RedisConnectionError):
+    """Redis 熔断中；继承 ConnectionError，调用方现有的 RedisError 处理即可降级"""
+
+
+def _guard(breaker: Optional[CircuitBreaker]) -> None:
+    if breaker is not None and not breaker.allow():
+        raise RedisCircuitOpen("Redis 熔断中")
+
+
+def _record(breaker: Optional[CircuitBreaker], error: Optional[BaseException]) -> None:
+    if breaker is None:
+        return
+    if error is None or not isinstance(error, _UNAVAILABLE_ERRORS):
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+
+class ResilientPipeline(InstrumentedPipeline):
+    """经过熔断器的管道，整个管道作为一次调用"""
+
+    breaker: Optional[CircuitBreaker] = None
+
+    async def execute(self, raise_on_error: bool = True):
+        _guard(self.breaker)
+        try:
+            result = await super().execute(raise_on_error)
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            _record(self.breaker, e)
+            raise
+        _record(self.breaker, None)
+        return result
+
+
+class ResilientRedis(InstrumentedRedis):
+    """经过熔断器的 Redis 客户端"""
+
+    def __init__(self, *args, breaker: Optional[CircuitBreaker] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    async def execute_command(self, *args, **options):
+        _guard(self.breaker)
+        try:
+            result = await super().execute_command(*args, **options)
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            _record(self.breaker, e)
+            raise
+        _record(self.breaker, None)
+        return result
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> ResilientPipeline:
+        pipe = ResilientPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+        pipe.breaker = self.breaker
+        return pipe
+
+    async def probe(self) -> None:
+        """绕过熔断器直接 PING，用于后台重连检测"""
+        await super().execute_command("PING")
+
+
+class RedisManager:
+    """
+    Redis 连接池、客户端与后台重连
+    Redis 暂时不可用时客户端照常绑定到各组件，由熔断器快速拒绝调用，恢复后无需重启进程
+    """
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            "Redis",
+            settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+            settings.REDIS_BREAKER_RECOVERY_TIMEOUT,
+        )
+        self.pool: Optional[BlockingConnectionPool] = None
+        self.client: Optional[ResilientRedis] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    def connect(self) -> ResilientRedis:
+        """创建连接池和客户端（此时不建立连接）"""
+        self.pool = BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_POOL_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,  # 连接全部占用时的等待上限
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True,
+            encoding="utf-8",
+        )
+        self.client = ResilientRedis(connection_pool=self.pool, breaker=self.breaker)
+        return self.client
+
+    async def ping(self) -> bool:
+        """PING 一次，成功关闭熔断，失败进入（或保持）熔断"""
+        try:
+            await self.client.probe()
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self.breaker.trip()
+            logger.debug(f"Redis PING 失败: {e}")
+            return False
+        was_open = self.breaker.is_open
+        self.breaker.record_success()
+        if was_open:
+            self.reconnects += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REDIS_RECONNECT_INTERVAL)
+            if self.breaker.is_open:
+                await self.ping()
+
+    def start(self) -> None:
+        """启动后台重连"""
+        if self.client is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """停止后台重连并关闭连接池"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.client is not None:
+            await self.client.aclose()
+            await self.pool.disconnect()
+            self.client = None
+            self.pool = None
+
+    def stats(self) -> dict:
+        """熔断器与连接池状态"""
+        pool = self.pool
+        in_use = getattr(pool, "_in_use_connections", None)
+        idle = getattr(pool, "_available_connections", None)
+        return {
+            "breaker": self.breaker.stats(),
+            "reconnects": self.reconnects,
+            "pool": {
+                "max_connections": settings.REDIS_POOL_MAX_CONNECTIONS,
+                "in_use": len(in_use) if in_use is not None else None,
+                "idle": len(idle) if idle is not None else None,
+                "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+            },
+        }
+
+
+# 全局 Redis 管理器（在应用启动时创建连接池）
+redis_manager = RedisManager()
@@ -0,0 +1,214 @@
+"""
+安全模块
+密码哈希与校验，bcrypt 计算放在独立线程池中执行，不阻塞事件循环
+以及 JWT 令牌的签发与解码
+"""
+import asyncio
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+def hash_password(password: str) -> str:
+    """哈希密码（同步，耗时约数百毫秒）"""
+    with PASSWORD_HASH_DURATION.labels("hash").time():
+        salt = bcrypt.gensalt()
+        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    return hashed.decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """验证密码（同步）"""
+    with PASSWORD_HASH_DURATION.labels("verify").time():
+        return bcrypt.checkpw(
+            plain_password.encode('utf-8'),
+            hashed_password.encode('utf-8')
+        )
+
+
+def _hash_passwords(passwords: List[str]) -> List[str]:
+    """在同一个工作线程中依次哈希一组密码"""
+    return [hash_password(password) for password in passwords]
+
+
+class PasswordHasherBusy(Exception):
+    """哈希线程池排队已满"""
+
+
+class PasswordHasher:
+    """
+    密码哈希执行器
+    bcrypt 计算时会释放 GIL，使用有界线程池即可并行
+    排队任务数超过上限时立即拒绝，而不是无限堆积；
+    批量哈希使用独立的线程池和排队上限，大批量创建不会阻塞单个注册和登录
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.batch_pending = 0  # 按密码个数计
+        self.rejected = 0
+
+    @property
+    def workers(self) -> int:
+        return max(1, settings.PASSWORD_HASH_WORKERS)
+
+    @property
+    def batch_workers(self) -> int:
+        return max(1, settings.PASSWORD_HASH_BATCH_WORKERS)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="bcrypt",
+            )
+        return self._executor
+
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        if self._batch_executor is None:
+            self._batch_executor = ThreadPoolExecutor(
+                max_workers=self.batch_workers,
+                thread_name_prefix="bcrypt-batch",
+            )
+        return self._batch_executor
+
+    def _acquire(self, jobs: int) -> None:
+        """占用排队名额，队列已满时立即拒绝"""
+        if self.pending + jobs > settings.PASSWORD_HASH_MAX_PENDING:
+            self.rejected += 1
+            raise PasswordHasherBusy("密码哈希队列已满")
+        self.pending += jobs
+
+    def _acquire_batch(self, passwords: int) -> None:
+        """占用批量排队名额（每个密码一个），放不下时立即拒绝"""
+        if self.batch_pending + passwords > settings.PASSWORD_HASH_BATCH_MAX_PENDING:
+            self.rejected += 1
+            raise PasswordHasherBusy("批量密码哈希队列已满")
+        self.batch_pending += passwords
+
+    async def _execute(self, fn, *args, executor: Optional[ThreadPoolExecutor] = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor or self._get_executor(), fn, *args)
+
+    async def hash(self, password: str) -> str:
+        """异步哈希密码"""
+        self._acquire(1)
+        try:
+            return await self._execute(hash_password, password)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """异步验证密码"""
+        self._acquire(1)
+        try:
+            return await self._execute(verify_password, plain_password, hashed_password)
+        finally:
+            self.pending -= 1
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        并行哈希一组密码
+        在批量线程池中按线程数切分，每个线程处理一段；排队名额按密码个数占用
+        """
+        if not passwords:
+            return []
+
+        chunk_count = min(self.batch_workers, len(passwords))
+        chunks = [passwords[i::chunk_count] for i in range(chunk_count)]
+
+        self._acquire_batch(len(passwords))
+        try:
+            executor = self._get_batch_executor()
+            results = await asyncio.gather(
+                *(self._execute(_hash_passwords, chunk, executor=executor) for chunk in chunks)
+            )
+        finally:
+            self.batch_pending -= len(passwords)
+
+        # 还原为原始顺序
+        hashed = [None] * len(passwords)
+        for i, chunk_result in enumerate(results):
+            hashed[i::chunk_count] = chunk_result
+        return hashed
+
+    def stats(self) -> dict:
+        """执行器状态"""
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "batch_workers": self.batch_workers,
+            "batch_pending": self.batch_pending,
+            "batch_max_pending": settings.PASSWORD_HASH_BATCH_MAX_PENDING,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        for executor in (self._executor, self._batch_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._batch_executor = None
+
+
+# 全局密码哈希执行器
+password_hasher = PasswordHasher()
+
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+def _create_token(user, token_type: str, expires_delta: timedelta) -> str:
+    """
+    签发令牌
+    声明中携带用户名和超级用户标记，校验方无需再查询数据库
+    """
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user.id),
+        # 精确到毫秒（NumericDate 允许小数），与用户吊销时间比较时同一秒内签发的令牌也能区分先后
+        "iat": round(now.timestamp(), 3),
+        "exp": int((now + expires_delta).timestamp()),
+        "jti": uuid.uuid4().hex,
+        "type": token_type,
+        "username": user.username,
+        "is_superuser": bool(user.is_superuser),
+    }
+    from jose import jwt  # 延迟导入，jose 及其加密后端较重，只在签发 / 校验令牌时加载
+
+    return jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def create_access_token(user) -> str:
+    """签发访问令牌"""
+    return _create_token(
+        user, ACCESS_TOKEN, timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+def create_refresh_token(user) -> str:
+    """签发刷新令牌"""
+    return _create_token(
+        user, REFRESH_TOKEN, timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+
+def decode_token(token: str) -> dict:
+    """校验签名和过期时间并返回声明，失败时抛出 jose.JWTError"""
+    from jose import jwt
+
+    return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
@@ -0,0 +1,65 @@
+"""
+用户序列化模块
+预编译的只序列化编码器：跳过 UserResponse 的逐对象校验（邮箱、用户名规则等写入时已校验），
+直接把数据库行编码为 JSON 字节，输出与 response_model=UserResponse 逐字节一致
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+
+class UserRow(TypedDict):
+    """与 UserResponse 字段及顺序一致的行结构"""
+    username: str
+    email: str
+    full_name: Optional[str]
+    is_active: Optional[bool]
+    is_superuser: Optional[bool]
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
+class UserPageRow(TypedDict):
+    """与 UserPage 一致的分页结构"""
+    items: List[UserRow]
+    next_cursor: Optional[str]
+
+
+# 响应字段顺序以 UserResponse 为准
+USER_FIELDS = tuple(UserResponse.model_fields)
+# 显式检查而非 assert，python -O 下同样生效
+if USER_FIELDS != tuple(UserRow.__annotations__):
+    raise RuntimeError("UserRow 必须与 UserResponse 字段保持一致")
+
+# 只查询响应需要的列，跳过 ORM 对象构建
+USER_COLUMNS = tuple(getattr(User, field) for field in USER_FIELDS)
+
+_user_adapter = TypeAdapter(UserRow)
+_users_adapter = TypeAdapter(List[UserRow])
+_page_adapter = TypeAdapter(UserPageRow)
+
+
+def user_row(user: User) -> dict:
+    """ORM 对象转换为行字典"""
+    return {field: getattr(user, field) for field in USER_FIELDS}
+
+
+def dump_user(row: dict) -> bytes:
+    """编码单个用户"""
+    return _user_adapter.dump_json(row)
+
+
+def dump_users(rows: Iterable[dict]) -> bytes:
+    """编码用户列表"""
+    return _users_adapter.dump_json(list(rows))
+
+
+def dump_page(rows: Iterable[dict], next_cursor: Optional[str]) -> bytes:
+    """编码分页结果"""
+    return _page_adapter.dump_json({"items": list(rows), "next_cursor": next_cursor})
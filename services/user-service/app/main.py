@@ -3,56 +3,103 @@
 提供用户注册、登录、信息管理等 API
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-import uvicorn
-import redis.asyncio as redis
 import os
 
-from .core.database import engine, Base, get_db
+from .core.auth import token_verifier
+from .core.cache import user_cache
+from .core.database import (
+    ReadAfterWriteMiddleware, dispose_engines, engine, get_db, replica_set
+)
+from .core.events import user_events
+from .core.health import health_prober
+from .core.http_client import http_clients
+from .core.metrics import MetricsMiddleware
+from .core.migrations import check_schema
+from .core.query_stats import QueryStatsMiddleware
+from .core.ratelimit import RateLimitMiddleware, rate_limiter
+from .core.redis_client import redis_manager
+from .core.security import PasswordHasherBusy, password_hasher
 from .core.config import settings
-from .routers import health, users
+from .routers import export, health, metrics, users
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     应用生命周期管理
-    启动时创建数据库表和 Redis 连接
+    启动时检查数据库结构版本并连接 Redis
     关闭时释放资源
     """
     print("🚀 用户服务正在启动...")
 
-    # 创建数据库表（如果不存在）
-    print("📦 初始化数据库...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # 检查数据库结构版本，迁移由 python -m app.migrate 单独执行
+    print("📦 检查数据库结构...")
+    schema_version = await check_schema(engine)
+    print(f"✅ 数据库结构版本: {schema_version}")
 
-    # 连接 Redis
-    print("🔄 连接 Redis...")
-    redis_client = redis.from_url(
-        settings.REDIS_URL,
-        decode_responses=True,
-        encoding="utf-8"
-    )
+    # 只读副本健康检查
+    if replica_set.enabled:
+        await replica_set.check()
+        replica_set.start()
+        print(f"✅ 已配置 {len(replica_set.engines)} 个只读副本")
 
-    try:
-        await redis_client.ping()
-        app.state.redis = redis_client
+    # 连接 Redis：有上限的连接池 + 熔断器，暂时不可用时由后台任务重连，无需重启进程
+    print("🔄 连接 Redis...")
+    app.state.redis = redis_manager.connect()
+    if await redis_manager.ping():
         print("✅ Redis 连接成功")
-    except Exception as e:
-        print(f"⚠️ Redis 连接失败: {e}")
-        app.state.redis = None
+    else:
+        print("⚠️ Redis 暂不可用，已熔断并在后台重连")
+    redis_manager.start()
+
+    # 用户缓存使用同一个 Redis 客户端，不可用时自动回退数据库
+    user_cache.bind(app.state.redis)
+    # 订阅缓存失效广播，各 worker 同步删除进程内缓存
+    user_cache.start()
+    # 令牌吊销记录存放在 Redis 中，所有 worker 共享
+    token_verifier.bind(app.state.redis)
+    # 限流令牌桶存放在 Redis 中，不可用时退化为进程内限流
+    rate_limiter.bind(app.state.redis)
+    # 用户变更事件后台批量写入 Redis Stream，未送达的由发件箱补发
+    user_events.bind(app.state.redis)
+    user_events.start()
+
+    # 上游服务连接池，所有请求共享，连接保活复用
+    http_clients.start()
+    if http_clients.upstreams:
+        print(f"✅ 已配置上游服务: {', '.join(http_clients.upstreams)}")
+
+    # 后台健康探测，健康检查端点只读取探测结果
+    health_prober.bind(app.state.redis)
+    await health_prober.probe()
+    health_prober.start()
 
     print("✅ 用户服务启动完成！")
 
     yield
 
     # 关闭 Redis 连接
-    if app.state.redis:
-        await app.state.redis.close()
-        print("🔄 Redis 连接已关闭")
+    await health_prober.stop()
+    health_prober.bind(None)
+    await user_events.stop()
+    user_events.bind(None)
+    await http_clients.close()
+    await user_cache.stop()
+    user_cache.bind(None)
+    token_verifier.bind(None)
+    rate_limiter.bind(None)
+    await redis_manager.close()
+    print("🔄 Redis 连接已关闭")
+
+    # 停止副本检查并释放所有连接池
+    await dispose_engines()
+
+    # 关闭密码哈希线程池
+    password_hasher.shutdown()
 
     print("👋 用户服务已停止")
 
@@ -69,6 +116,15 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
 
+    # 每个请求的 SQL 语句数量与耗时
+    app.add_middleware(QueryStatsMiddleware)
+
+    # 写操作后下发固定主库的 Cookie
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+    # 限流（先注册，位于 CORS 之内，429 响应同样带 CORS 头）
+    app.add_middleware(RateLimitMiddleware)
+
     # CORS 配置
     if settings.ALLOWED_ORIGINS:
         origins = settings.ALLOWED_ORIGINS.split(",")
@@ -80,8 +136,23 @@ def create_app() -> FastAPI:
             allow_headers=["*"],
         )
 
+    # 请求指标（最外层，耗时包含所有中间件，429 等提前返回的响应同样计入）
+    app.add_middleware(MetricsMiddleware)
+
+    # 密码哈希队列已满时快速失败，避免请求无限排队
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "服务繁忙，请稍后重试"},
+            headers={"Retry-After": "1"},
+        )
+
     # 注册路由
     app.include_router(health.router)
+    app.include_router(metrics.router)
+    # 导出路由需在用户路由之前注册，避免 /export 被 /{user_id} 匹配
+    app.include_router(export.router, prefix="/api/users", tags=["users"])
     app.include_router(users.router, prefix="/api/users", tags=["users"])
 
     return app
@@ -103,6 +174,9 @@ async def root():
 
 
 if __name__ == "__main__":
+    # 仅直接运行时需要，gunicorn / uvicorn 导入应用时不加载
+    import uvicorn
+
     # 从环境变量读取运行配置
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
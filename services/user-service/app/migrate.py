@@ -0,0 +1,27 @@
+"""
+数据库迁移命令
+部署时在启动服务之前执行一次（生产镜像的启动命令已包含）:
+    python -m app.migrate
+"""
+import asyncio
+
+from app.core.database import dispose_engines, engine
+from app.core.migrations import SCHEMA_VERSION, current_version, migrate
+
+
+async def main():
+    try:
+        before = await current_version(engine)
+        print(f"📦 数据库结构版本: {before or 0}，目标版本: {SCHEMA_VERSION}")
+
+        applied = await migrate(engine)
+        for migration in applied:
+            print(f"✅ {migration.version}: {migration.description}")
+        if not applied:
+            print("✅ 数据库结构已是最新")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
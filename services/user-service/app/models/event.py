@@ -0,0 +1,28 @@
+"""
+用户事件发件箱模型
+用户变更与事件记录在同一个事务中写入，事件投递到 Redis Stream 后删除
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.core.database import Base
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class UserEventOutbox(Base):
+    """用户事件发件箱"""
+    __tablename__ = "user_event_outbox"
+
+    id = Column(Integer, primary_key=True)  # 同时作为事件 ID，消费方据此去重
+    event_type = Column(String(50), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False)  # JSON
+    # 由应用端写入，各数据库按同一格式比较（补发时按时间筛选）
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, index=True)
+
+    def __repr__(self):
+        return f"<UserEventOutbox(id={self.id}, event_type='{self.event_type}')>"
@@ -2,13 +2,24 @@
 用户模型
 定义用户表结构和操作方法
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, event, text
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 import json
 
 
+# SQLite 中 CURRENT_TIMESTAMP 精确到秒，Python 端绑定参数使用相同格式，
+# 否则字符串比较会把同一秒的 "... 10:00:00" 与 "... 10:00:00.000000" 视为不同值
+_SqliteTimestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
 class User(Base):
     """用户表模型"""
     __tablename__ = "users"
@@ -20,9 +31,24 @@ class User(Base):
     full_name = Column(String(100), nullable=True)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(_SqliteTimestamp, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # 按创建时间范围筛选 / 排序（含 keyset 分页的 id 次序）
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # 按激活状态筛选，同时支持按创建时间排序
+        Index("ix_users_is_active_created_at_id", "is_active", "created_at", "id"),
+        # 部分索引：只包含超级用户（数量很少），索引体积与普通用户数量无关
+        Index(
+            "ix_users_superuser_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_superuser IS true"),
+            sqlite_where=text("is_superuser IS 1"),
+        ),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}')>"
 
@@ -42,3 +68,78 @@ class User(Base):
     def to_json(self) -> str:
         """转换为 JSON 字符串"""
         return json.dumps(self.to_dict(), ensure_ascii=False, default=str)
+
+
+# ============================================
+# 搜索索引
+# 用户名、邮箱、全名的前缀/子串搜索依赖各数据库的专用索引：
+#   PostgreSQL: pg_trgm GIN 索引（支持 ILIKE '%q%'）
+#   SQLite:     FTS5 trigram 外部内容表 + 触发器同步
+#   MySQL:      ngram 解析器的 FULLTEXT 索引
+# 所有 DDL 均可重复执行
+# ============================================
+
+SEARCH_FTS_TABLE = "users_fts"
+
+_SEARCH_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops)",
+    ],
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5("
+        "username, email, full_name, content='users', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+        f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, username, email, full_name) "
+        "VALUES (new.id, new.username, new.email, new.full_name); END",
+        f"CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+        f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, username, email, full_name) "
+        "VALUES ('delete', old.id, old.username, old.email, old.full_name); END",
+        f"CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username, email, full_name ON users BEGIN "
+        f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, username, email, full_name) "
+        "VALUES ('delete', old.id, old.username, old.email, old.full_name); "
+        f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, username, email, full_name) "
+        "VALUES (new.id, new.username, new.email, new.full_name); END",
+        # 为已有数据建立索引
+        f"INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) VALUES ('rebuild')",
+    ],
+    "mysql": [
+        "CREATE FULLTEXT INDEX ix_users_search ON users (username, email, full_name) WITH PARSER ngram",
+    ],
+}
+
+
+def create_search_index(connection) -> None:
+    """创建当前数据库对应的搜索索引（同步连接）"""
+    dialect = connection.dialect.name
+
+    if dialect == "mysql":
+        # MySQL 的 CREATE INDEX 不支持 IF NOT EXISTS
+        exists = connection.execute(text(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'users' "
+            "AND index_name = 'ix_users_search' LIMIT 1"
+        )).first()
+        if exists:
+            return
+
+    for statement in _SEARCH_DDL.get(dialect, []):
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection) -> None:
+    """删除 SQLite 的 FTS 影子表（其余数据库的索引随表一起删除）"""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_FTS_TABLE}"))
+
+
+@event.listens_for(User.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(User.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
@@ -0,0 +1,95 @@
+"""
+用户导出路由
+以 NDJSON 或 CSV 格式流式导出用户表，内存占用与表大小无关
+"""
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal, read_engine, replica_set
+from ..core.serialization import USER_COLUMNS, USER_FIELDS, dump_user
+from ..models.user import User
+
+router = APIRouter()
+
+
+class ExportFormat(str, Enum):
+    """导出格式"""
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _ndjson_chunk(rows) -> bytes:
+    """将一批用户行编码为 NDJSON"""
+    return b"".join(dump_user(dict(row)) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    """CSV 中时间使用 ISO 格式，与 JSON 输出一致"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_chunk(rows) -> str:
+    """将一批记录编码为 CSV 文本"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def _stream_users(export_format: ExportFormat):
+    """
+    按固定大小分块流式读取用户表
+    使用独立会话：依赖注入的会话在响应开始发送前就会关闭
+    """
+    chunk_size = settings.USER_EXPORT_CHUNK_SIZE
+
+    if export_format == ExportFormat.csv:
+        # 先发送表头，客户端可以立即收到首字节
+        yield _csv_chunk([USER_FIELDS])
+
+    async with AsyncSessionLocal() as session:
+        # 全表导出对时效不敏感，优先使用只读副本
+        session.info["replica"] = replica_set.choose() or read_engine
+        query = (
+            select(*USER_COLUMNS)
+            .order_by(User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await session.stream(query)
+
+        async for rows in result.mappings().partitions(chunk_size):
+            if export_format == ExportFormat.ndjson:
+                yield _ndjson_chunk(rows)
+            else:
+                yield _csv_chunk(
+                    [_csv_value(row[field]) for field in USER_FIELDS]
+                    for row in rows
+                )
+
+
+@router.get(
+    "/export",
+    summary="导出用户",
+    description="以 NDJSON 或 CSV 格式流式导出全部用户，适用于离线分析任务"
+)
+async def export_users(
+    format: ExportFormat = Query(ExportFormat.ndjson, description="导出格式")
+):
+    """流式导出用户"""
+    if format == ExportFormat.csv:
+        media_type = "text/csv; charset=utf-8"
+    else:
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        _stream_users(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format.value}"'}
+    )
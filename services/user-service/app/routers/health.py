@@ -2,43 +2,45 @@
 健康检查路由
 提供服务健康状态检查
 """
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
-from app.core.database import get_db
-import redis.asyncio as redis
-import asyncio
+from fastapi import APIRouter, HTTPException
+from app.core.auth import token_verifier
+from app.core.cache import user_cache
+from app.core.config import settings
+from app.core.database import replica_set
+from app.core.events import user_events
+from app.core.health import health_prober
+from app.core.http_client import http_clients
+from app.core.pool_metrics import pool_stats
+from app.core.query_stats import query_stats
+from app.core.ratelimit import rate_limiter
+from app.core.redis_client import redis_manager
+from app.core.security import password_hasher
 
 router = APIRouter()
 
 
-@router.get("/health", summary="健康检查", description="检查服务、数据库和 Redis 的健康状态")
-async def health_check(db: AsyncSession = Depends(get_db)):
-    """健康检查端点"""
+def _status_text(check: dict) -> str:
+    """探测结果转换为 "ok" / "error: ..." 形式"""
+    if check["status"] == "error":
+        return f"error: {check['error']}"
+    return check["status"]
+
+
+@router.get("/health", summary="健康检查", description="返回后台探测到的服务、数据库和 Redis 健康状态")
+async def health_check():
+    """健康检查端点（读取后台探测结果，不占用数据库连接）"""
+    snapshot = await health_prober.snapshot()
     checks = {
         "service": "ok",
-        "database": "unknown",
-        "redis": "unknown"
+        "database": _status_text(snapshot["database"]),
+        "redis": _status_text(snapshot["redis"]),
+        "checked_at": snapshot["checked_at"],
+        "age_seconds": snapshot["age_seconds"],
+        "stale": snapshot["stale"],
     }
 
-    # 检查数据库连接
-    try:
-        result = await db.execute(text("SELECT 1"))
-        await db.scalar(result)
-        checks["database"] = "ok"
-    except SQLAlchemyError as e:
-        checks["database"] = f"error: {str(e)}"
-
-    # 检查 Redis 连接
-    try:
-        # 这里应该使用 app.state.redis
-        checks["redis"] = "unknown"
-    except Exception as e:
-        checks["redis"] = f"error: {str(e)}"
-
-    # 判断整体健康状态
-    if checks["database"] == "ok":
+    # 判断整体健康状态（Redis 不可用时缓存、限流等自动降级，不影响整体状态）
+    if checks["database"] == "ok" and not checks["stale"]:
         return {"status": "healthy", **checks}
     else:
         raise HTTPException(
@@ -48,17 +50,20 @@ async def health_check(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/health/ready", summary="就绪检查", description="检查服务是否已准备好接收流量")
-async def readiness_check(db: AsyncSession = Depends(get_db)):
+async def readiness_check():
     """就绪检查端点"""
-    try:
-        # 检查数据库
-        await db.execute(text("SELECT 1"))
-        return {"status": "ready"}
-    except SQLAlchemyError:
+    snapshot = await health_prober.snapshot()
+    if snapshot["stale"]:
+        raise HTTPException(
+            status_code=503,
+            detail={"status": "not ready", "reason": "health check stale", "age_seconds": snapshot["age_seconds"]}
+        )
+    if snapshot["database"]["status"] != "ok":
         raise HTTPException(
             status_code=503,
             detail={"status": "not ready", "reason": "database not available"}
         )
+    return {"status": "ready"}
 
 
 @router.get("/health/live", summary="存活检查", description="检查服务是否存活")
@@ -68,12 +73,13 @@ async def liveness_check():
 
 
 @router.get("/health/details", summary="详细健康检查", description="提供详细的系统信息")
-async def detailed_health_check(db: AsyncSession = Depends(get_db)):
+async def detailed_health_check():
     """详细健康检查端点"""
     import platform
     import psutil
     import time
 
+    snapshot = await health_prober.snapshot()
     checks = {
         "service": {
             "status": "ok",
@@ -86,27 +92,24 @@ async def detailed_health_check(db: AsyncSession = Depends(get_db)):
             "cpu_count": psutil.cpu_count(),
             "memory_percent": psutil.virtual_memory().percent,
         },
-        "database": {
-            "status": "unknown"
+        "database": snapshot["database"],
+        "health_probe": {
+            "checked_at": snapshot["checked_at"],
+            "age_seconds": snapshot["age_seconds"],
+            "stale": snapshot["stale"],
+            "interval_seconds": settings.HEALTH_CHECK_INTERVAL,
         },
-        "redis": {
-            "status": "unknown"
-        }
+        "replicas": replica_set.stats(),
+        "database_pool": pool_stats(),
+        "queries": query_stats.stats(),
+        "redis": snapshot["redis"],
+        "redis_client": redis_manager.stats(),
+        "cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "auth": token_verifier.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "events": user_events.stats(),
+        "upstreams": http_clients.stats(),
     }
 
-    # 数据库检查
-    try:
-        start_time = time.time()
-        await db.execute(text("SELECT 1"))
-        db_time = (time.time() - start_time) * 1000
-        checks["database"] = {
-            "status": "ok",
-            "response_time": f"{db_time:.2f}ms"
-        }
-    except SQLAlchemyError as e:
-        checks["database"] = {
-            "status": "error",
-            "error": str(e)
-        }
-
     return checks
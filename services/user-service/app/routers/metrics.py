@@ -0,0 +1,15 @@
+"""
+指标路由
+以 Prometheus 文本格式暴露服务指标（仅供内网抓取，nginx 不代理该路径）
+"""
+from fastapi import APIRouter, Response
+
+from app.core.metrics import CONTENT_TYPE_LATEST, render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus 抓取端点（同步函数，在线程池中读取多进程指标文件）"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
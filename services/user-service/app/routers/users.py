@@ -3,37 +3,401 @@
 提供用户 CRUD 操作的 API
 """
 from http.client import HTTPException
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import (
+    select, insert, update, delete, or_, case, column, func, literal, literal_column, table, tuple_
+)
+from sqlalchemy.dialects.mysql import match as mysql_match
 from sqlalchemy.exc import IntegrityError
 import redis.asyncio as redis
-import bcrypt
 
-from ..core.database import get_db
+from ..core.auth import InvalidToken, current_user, token_verifier
+from ..core.cache import user_cache
+from ..core.coalescing import Coalescer
+from ..core.database import get_db, get_read_db
+from ..core.events import (
+    USER_ACTIVATED, USER_CREATED, USER_DEACTIVATED, USER_UPDATED, user_events
+)
 from ..core.config import settings
-from ..models.user import User
-from ..schemas.user import UserCreate, UserResponse, UserUpdate
+from ..core.pagination import decode_cursor, encode_cursor
+from ..core.security import (
+    REFRESH_TOKEN, create_access_token, create_refresh_token, password_hasher
+)
+from ..core.serialization import USER_COLUMNS, dump_page, dump_user, user_row
+from ..models.user import SEARCH_FTS_TABLE, User
+from ..schemas.user import (
+    Token,
+    TokenPayload,
+    TokenRefresh,
+    UserBatchCreate,
+    UserBatchCreateResponse,
+    UserBatchLookupResponse,
+    UserBulkFilter,
+    UserBulkUpdateResponse,
+    UserCreate,
+    UserIdList,
+    UserLogin,
+    UserPage,
+    UserResponse,
+    UserUpdate,
+)
 
 router = APIRouter()
 
+# 同一 worker 内并发的按 ID 查询共享一次数据库读取
+user_loader = Coalescer()
+
+
+def _json_response(payload, status_code: int = status.HTTP_200_OK) -> Response:
+    """直接返回已序列化的 JSON"""
+    return Response(content=payload, status_code=status_code, media_type="application/json")
+
+
+def _user_response(user, status_code: int = status.HTTP_200_OK) -> Response:
+    """使用快速编码器返回单个用户，输出与 response_model=UserResponse 一致"""
+    row = user if isinstance(user, dict) else user_row(user)
+    return _json_response(dump_user(row), status_code)
+
+
+def _etag(payload: str) -> str:
+    """由响应内容生成强 ETag，内容不变则 ETag 不变"""
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 使用弱比较（忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _conditional_response(request: Request, payload: str) -> Response:
+    """
+    带 ETag 的用户响应
+    客户端缓存的版本仍然有效时直接返回 304，不发送响应体
+    no-cache 允许客户端和代理缓存，但每次使用前需要携带 ETag 重新验证
+    """
+    etag = _etag(payload)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
 
-def hash_password(password: str) -> str:
-    """哈希密码"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+async def _cache_user(row: dict, generation: int) -> str:
+    """序列化用户行并回填缓存，generation 为查询数据库前取得的失效代数"""
+    payload = dump_user(row).decode("utf-8")
+    await user_cache.set(row["id"], row["username"], payload, generation)
+    return payload
+
+
+async def _load_user_payloads(user_ids: List[int], db: AsyncSession) -> dict:
+    """
+    批量加载用户 JSON
+    先查缓存，未命中的 ID 合并为一次 IN 查询，并与其他请求中的同 ID 查询合并
+    """
+    payloads = await user_cache.get_many_by_id(user_ids)
+    missing = [user_id for user_id in user_ids if user_id not in payloads]
+
+    if missing:
+        async def fetch(keys: List[int]) -> dict:
+            generation = user_cache.generation
+            result = await db.execute(select(*USER_COLUMNS).where(User.id.in_(keys)))
+            entries = [
+                (row["id"], row["username"], dump_user(dict(row)).decode("utf-8"))
+                for row in result.mappings()
+            ]
+            await user_cache.set_many(entries, generation)
+            return {user_id: payload for user_id, _, payload in entries}
+
+        loaded = await user_loader.load_many(missing, fetch)
+        payloads.update(
+            (user_id, payload) for user_id, payload in loaded.items() if payload is not None
+        )
+
+    return payloads
+
+
+async def _batch_lookup_response(user_ids: List[int], db: AsyncSession) -> Response:
+    """拼接批量查询响应，缓存中的 JSON 直接复用，不重复序列化"""
+    # 去重并保持顺序
+    user_ids = list(dict.fromkeys(user_ids))
+    if len(user_ids) > settings.USER_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多查询 {settings.USER_BATCH_MAX_SIZE} 个用户"
+        )
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    return bcrypt.checkpw(
-        plain_password.encode('utf-8'),
-        hashed_password.encode('utf-8')
+    payloads = await _load_user_payloads(user_ids, db)
+    items = ",".join(payloads[user_id] for user_id in user_ids if user_id in payloads)
+    missing = ",".join(str(user_id) for user_id in user_ids if user_id not in payloads)
+    return _json_response(f'{{"items":[{items}],"missing":[{missing}]}}')
+
+
+class UserSort(str, Enum):
+    """用户列表排序方式，"-" 前缀表示倒序"""
+    id = "id"
+    created_at = "created_at"
+    created_at_desc = "-created_at"
+    username = "username"
+    username_desc = "-username"
+
+    @property
+    def field(self) -> str:
+        return self.value.lstrip("-")
+
+    @property
+    def descending(self) -> bool:
+        return self.value.startswith("-")
+
+
+def _build_list_query(
+    sort: UserSort = UserSort.id,
+    is_active: Optional[bool] = None,
+    is_superuser: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    after: Optional[tuple] = None,
+):
+    """
+    构建用户列表查询
+    after 为上一页最后一行的排序键 (key, id)，排序键都有对应索引，keyset 定位成本恒定
+    布尔条件使用 IS 字面量，使 SQLite / PostgreSQL 能匹配部分索引的谓词
+    """
+    query = select(*USER_COLUMNS)
+
+    if is_active is not None:
+        query = query.where(User.is_active.is_(is_active))
+    if is_superuser is not None:
+        query = query.where(User.is_superuser.is_(is_superuser))
+    if created_after is not None:
+        query = query.where(User.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(User.created_at < created_before)
+
+    if sort == UserSort.id:
+        if after is not None:
+            query = query.where(User.id > after[-1])
+        return query.order_by(User.id)
+
+    key = getattr(User, sort.field)
+    if after is not None:
+        # 游标值按列类型绑定，SQLite 上 created_at 才会使用与列相同的存储格式
+        after = tuple_(literal(after[0], key.type), after[1])
+    if sort.descending:
+        if after is not None:
+            query = query.where(tuple_(key, User.id) < after)
+        return query.order_by(key.desc(), User.id.desc())
+
+    if after is not None:
+        query = query.where(tuple_(key, User.id) > after)
+    return query.order_by(key, User.id)
+
+
+def _decode_list_cursor(cursor: str, sort: UserSort) -> tuple:
+    """解析列表游标为排序键，游标必须与当前排序方式一致"""
+    position = decode_cursor(cursor)
+    if position.get("sort", UserSort.id.value) != sort.value:
+        raise ValueError("游标与排序方式不匹配")
+
+    last_id = int(position["id"])
+    if sort == UserSort.id:
+        return (last_id,)
+    if sort.field == "created_at":
+        return (datetime.fromisoformat(position["key"]), last_id)
+    return (str(position["key"]), last_id)
+
+
+def _encode_list_cursor(row: dict, sort: UserSort) -> str:
+    """根据当前页最后一行生成游标"""
+    if sort == UserSort.id:
+        return encode_cursor({"id": row["id"]})
+
+    key = row[sort.field]
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    return encode_cursor({"sort": sort.value, "key": key, "id": row["id"]})
+
+
+class SearchMode(str, Enum):
+    """搜索匹配方式"""
+    prefix = "prefix"
+    contains = "contains"
+
+
+# SQLite FTS5 影子表，rowid 即用户 ID
+users_fts = table(SEARCH_FTS_TABLE, column("rowid"))
+# trigram 分词可索引的最短关键字长度，更短的关键字在 SQLite 上走全表扫描
+SQLITE_FTS_MIN_QUERY_LENGTH = 3
+# MySQL ngram 分词的 ngram_token_size（默认 2），更短的关键字无法被 FULLTEXT 匹配，走 LIKE 扫描
+MYSQL_FTS_MIN_QUERY_LENGTH = 2
+
+
+def _like_escape(value: str) -> str:
+    """转义 LIKE 通配符"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _build_search_query(dialect: str, q: str, mode: SearchMode):
+    """
+    构建用户搜索查询
+    各数据库使用自己的专用索引，结果按相关度排序，用户名前缀命中优先
+    """
+    escaped = _like_escape(q)
+    pattern = f"{escaped}%" if mode == SearchMode.prefix else f"%{escaped}%"
+    matches = or_(*(
+        field.ilike(pattern, escape="\\")
+        for field in (User.username, User.email, User.full_name)
+    ))
+    prefix_rank = case((User.username.ilike(f"{escaped}%", escape="\\"), 0), else_=1)
+    query = select(*USER_COLUMNS)
+
+    if dialect == "sqlite":
+        if len(q) < SQLITE_FTS_MIN_QUERY_LENGTH:
+            # trigram 无法索引过短的关键字，退化为三个字段上的 LIKE 扫描，匹配语义与其他数据库一致
+            return query.where(matches).order_by(prefix_rank, User.id)
+
+        # FTS5 trigram 短语查询即子串匹配（不区分大小写）
+        phrase = '"' + q.replace('"', '""') + '"'
+        fts = literal_column(SEARCH_FTS_TABLE)
+        query = (
+            query.join(users_fts, users_fts.c.rowid == User.id)
+            .where(fts.op("MATCH")(phrase))
+        )
+        if mode == SearchMode.prefix:
+            query = query.where(matches)
+        return query.order_by(prefix_rank, func.bm25(fts), User.id)
+
+    if dialect == "postgresql":
+        # pg_trgm GIN 索引同时支持前缀和子串 ILIKE
+        similarity = func.greatest(
+            func.similarity(User.username, q),
+            func.similarity(User.email, q),
+            func.coalesce(func.similarity(User.full_name, q), 0),
+        )
+        return query.where(matches).order_by(prefix_rank, similarity.desc(), User.id)
+
+    if dialect == "mysql":
+        if len(q) < MYSQL_FTS_MIN_QUERY_LENGTH:
+            # 短于 ngram_token_size 的关键字 MATCH 永远不命中，退化为与 SQLite 相同的 LIKE 扫描
+            return query.where(matches).order_by(prefix_rank, User.id)
+
+        # ngram FULLTEXT 索引召回，LIKE 精确过滤
+        phrase = '"' + q.replace('"', '') + '"'
+        score = mysql_match(User.username, User.email, User.full_name, against=phrase).in_boolean_mode()
+        return query.where(score, matches).order_by(prefix_rank, score.desc(), User.id)
+
+    return query.where(matches).order_by(prefix_rank, User.id)
+
+
+async def _update_user_returning(db: AsyncSession, user_id: int, values: dict) -> Optional[User]:
+    """
+    单次往返更新用户并返回更新后的行
+    PostgreSQL / SQLite(>=3.35) 使用 UPDATE ... RETURNING，
+    不支持 RETURNING 的后端（MySQL）退化为 UPDATE + 按主键 SELECT
+    用户不存在时返回 None
+    """
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(**values, updated_at=func.now())
+    )
+
+    if db.get_bind().dialect.update_returning:
+        result = await db.execute(stmt.returning(User))
+        return result.scalar_one_or_none()
+
+    result = await db.execute(stmt)
+    if result.rowcount == 0:
+        return None
+    result = await db.execute(select(User).where(User.id == user_id))
+    return result.scalar_one()
+
+
+def _record_activation(db: AsyncSession, changed, is_active: bool) -> list:
+    """为 (id, username) 列表写入激活 / 禁用事件"""
+    return user_events.record(
+        db,
+        USER_ACTIVATED if is_active else USER_DEACTIVATED,
+        [(id, {"id": id, "username": username, "is_active": is_active}) for id, username in changed],
     )
 
 
+async def _sync_user_tokens(user_ids: List[int], is_active: bool) -> None:
+    """激活状态变化后处理已签发的令牌（在提交后调用）"""
+    if is_active:
+        await token_verifier.restore_users(user_ids)
+    else:
+        # 已签发的令牌随即失效，校验令牌时无需查询用户状态
+        await token_verifier.revoke_users(user_ids)
+
+
+async def _set_user_active(db: AsyncSession, user_id: int, is_active: bool) -> User:
+    """修改激活状态，用户不存在时抛出 404"""
+    user = await _update_user_returning(db, user_id, {"is_active": is_active})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+
+    events = _record_activation(db, [(user.id, user.username)], is_active)
+    await db.commit()
+    await user_cache.invalidate(user.id, user.username)
+    await _sync_user_tokens([user.id], is_active)
+    user_events.emit(events)
+    return user
+
+
+async def _bulk_set_active(db: AsyncSession, criteria: UserBulkFilter, is_active: bool) -> int:
+    """
+    按 ID 列表或创建时间范围批量修改激活状态
+    单条集合 UPDATE 完成，返回实际变化的行数，并一次性失效相关缓存
+    """
+    # 只修改状态确实需要变化的行，受影响数量即为实际变化数量
+    conditions = [User.is_active != is_active]
+    if criteria.ids is not None:
+        conditions.append(User.id.in_(criteria.ids))
+    if criteria.created_after is not None:
+        conditions.append(User.created_at >= criteria.created_after)
+    if criteria.created_before is not None:
+        conditions.append(User.created_at < criteria.created_before)
+
+    stmt = (
+        update(User)
+        .where(*conditions)
+        .values(is_active=is_active, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.get_bind().dialect.update_returning:
+        result = await db.execute(stmt.returning(User.id, User.username))
+        changed = result.all()
+    else:
+        # 不支持 RETURNING 时先取出待修改的键用于缓存失效
+        result = await db.execute(select(User.id, User.username).where(*conditions))
+        changed = result.all()
+        await db.execute(stmt)
+
+    events = _record_activation(db, changed, is_active)
+    await db.commit()
+    await user_cache.invalidate_many(changed)
+    await _sync_user_tokens([id for id, _ in changed], is_active)
+    user_events.emit(events)
+    return len(changed)
+
+
 @router.post(
     "/",
     response_model=UserResponse,
@@ -59,20 +423,25 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
             detail="邮箱已注册"
         )
 
+    # 结束只读事务、归还连接，哈希计算期间不占用连接（SQLite 只有一个写连接）
+    await db.commit()
+
     # 创建用户实例
     db_user = User(
         username=user.username,
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await password_hasher.hash(user.password),
         full_name=user.full_name,
         is_active=user.is_active if user.is_active is not None else True
     )
 
     try:
         db.add(db_user)
-        await db.commit()
+        await db.flush()
         await db.refresh(db_user)
-        return db_user
+        # 事件与用户在同一事务中提交
+        events = user_events.record(db, USER_CREATED, [(db_user.id, user_row(db_user))])
+        await db.commit()
     except IntegrityError:
         await db.rollback()
         raise HTTPException(
@@ -80,18 +449,367 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
             detail="创建用户失败，请检查输入数据"
         )
 
+    user_events.emit(events)
+    return _user_response(db_user, status.HTTP_201_CREATED)
+
+
+def _issue_tokens(user: User) -> Token:
+    """签发访问令牌和刷新令牌"""
+    return Token(
+        access_token=create_access_token(user),
+        refresh_token=create_refresh_token(user),
+        expires_in=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
+
+@router.post(
+    "/login",
+    response_model=Token,
+    summary="用户登录",
+    description="使用用户名或邮箱登录，返回访问令牌和刷新令牌"
+)
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    """用户登录"""
+    result = await db.execute(
+        select(User).where(or_(
+            User.username == credentials.username,
+            User.email == credentials.username,
+        ))
+    )
+    user = result.scalar_one_or_none()
+    await db.commit()
+
+    if not user or not await password_hasher.verify(credentials.password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户名或密码错误",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="用户已被禁用"
+        )
+
+    return _issue_tokens(user)
+
+
+@router.post(
+    "/refresh",
+    response_model=Token,
+    summary="刷新令牌",
+    description="使用刷新令牌换取新的令牌对，旧的刷新令牌随即失效"
+)
+async def refresh_token(body: TokenRefresh, db: AsyncSession = Depends(get_db)):
+    """刷新令牌"""
+    try:
+        payload = await token_verifier.verify(body.refresh_token, REFRESH_TOKEN)
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # 刷新不在热路径上，重新确认用户仍然有效
+    user = await db.get(User, payload.sub)
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户不存在或已被禁用",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    await token_verifier.revoke(payload)
+    return _issue_tokens(user)
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="退出登录",
+    description="吊销当前访问令牌，可同时传入刷新令牌一并吊销"
+)
+async def logout(
+    body: Optional[TokenRefresh] = None,
+    payload: TokenPayload = Depends(current_user)
+):
+    """退出登录"""
+    await token_verifier.revoke(payload)
+
+    if body is not None:
+        try:
+            refresh = await token_verifier.verify(body.refresh_token, REFRESH_TOKEN)
+        except InvalidToken:
+            pass
+        else:
+            if refresh.sub == payload.sub:
+                await token_verifier.revoke(refresh)
+    return None
+
+
+@router.get(
+    "/me",
+    response_model=UserResponse,
+    summary="获取当前用户",
+    description="根据访问令牌返回当前登录用户的信息"
+)
+async def get_current_user(
+    request: Request,
+    payload: TokenPayload = Depends(current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """获取当前用户"""
+    return await get_user(payload.sub, request, db)
+
+
+@router.post(
+    "/batch",
+    response_model=UserBatchCreateResponse,
+    summary="批量创建用户",
+    description="一次创建多个用户，逐条返回创建结果或冲突原因"
+)
+async def create_users_batch(batch: UserBatchCreate, db: AsyncSession = Depends(get_db)):
+    """批量创建用户"""
+    items = batch.users
+
+    # 一次查询检查整批用户名和邮箱冲突
+    result = await db.execute(
+        select(User.username, User.email).where(or_(
+            User.username.in_({item.username for item in items}),
+            User.email.in_({item.email for item in items}),
+        ))
+    )
+    taken_usernames = set()
+    taken_emails = set()
+    for username, email in result.all():
+        taken_usernames.add(username)
+        taken_emails.add(email)
+
+    # 逐条判定冲突（包括批次内部重复）
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        if item.username in taken_usernames:
+            results[index] = {"index": index, "status": "conflict", "detail": "用户名已存在"}
+        elif item.email in taken_emails:
+            results[index] = {"index": index, "status": "conflict", "detail": "邮箱已注册"}
+        else:
+            taken_usernames.add(item.username)
+            taken_emails.add(item.email)
+            pending.append(index)
+
+    if pending:
+        # 哈希计算期间不占用连接
+        await db.commit()
+        hashed_passwords = await password_hasher.hash_many(
+            [items[index].password for index in pending]
+        )
+        rows = [
+            {
+                "username": items[index].username,
+                "email": items[index].email,
+                "hashed_password": hashed_password,
+                "full_name": items[index].full_name,
+                "is_active": items[index].is_active if items[index].is_active is not None else True,
+            }
+            for index, hashed_password in zip(pending, hashed_passwords)
+        ]
+
+        # 单条多行 INSERT ... RETURNING
+        # render_nulls 保证每行列集合一致，避免因 NULL 值被拆成多条语句
+        try:
+            created_users = (await db.scalars(
+                insert(User).returning(User).execution_options(render_nulls=True),
+                rows
+            )).all()
+            events = user_events.record(
+                db, USER_CREATED, [(user.id, user_row(user)) for user in created_users]
+            )
+            await db.commit()
+        except IntegrityError:
+            # 检查之后被并发请求抢先写入，整批回滚由客户端重试
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="批量创建时发生并发冲突，请重试"
+            )
+
+        # RETURNING 的行序不保证与参数一致，按唯一用户名回填
+        created_by_username = {user.username: user for user in created_users}
+        for index in pending:
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "user": created_by_username[items[index].username],
+            }
+        user_events.emit(events)
+
+    return {
+        "created": len(pending),
+        "failed": len(items) - len(pending),
+        "results": results,
+    }
+
 
 @router.get(
     "/",
-    response_model=List[UserResponse],
+    response_model=UserPage,
     summary="获取用户列表",
-    description="获取所有用户列表（分页功能可扩展）"
+    description="按条件筛选、排序并游标分页获取用户列表，使用上一页返回的 next_cursor 获取下一页"
+)
+async def get_users(
+    limit: int = Query(
+        settings.USER_PAGE_SIZE_DEFAULT,
+        ge=1,
+        le=settings.USER_PAGE_SIZE_MAX,
+        description="每页数量"
+    ),
+    cursor: Optional[str] = Query(None, description="分页游标"),
+    sort: UserSort = Query(UserSort.id, description="排序方式"),
+    is_active: Optional[bool] = Query(None, description="按激活状态筛选"),
+    is_superuser: Optional[bool] = Query(None, description="按超级用户筛选"),
+    created_after: Optional[datetime] = Query(None, description="创建时间下限（含）"),
+    created_before: Optional[datetime] = Query(None, description="创建时间上限（不含）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """分页获取用户"""
+    after = None
+    if cursor:
+        try:
+            after = _decode_list_cursor(cursor, sort)
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的分页游标"
+            )
+
+    # keyset 分页：基于索引定位，翻页深度不影响查询成本
+    query = _build_list_query(
+        sort=sort,
+        is_active=is_active,
+        is_superuser=is_superuser,
+        created_after=created_after,
+        created_before=created_before,
+        after=after,
+    )
+
+    # 多取一条用于判断是否还有下一页
+    result = await db.execute(query.limit(limit + 1))
+    rows = [dict(row) for row in result.mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_list_cursor(rows[-1], sort)
+
+    return _json_response(dump_page(rows, next_cursor))
+
+
+@router.get(
+    "/batch",
+    response_model=UserBatchLookupResponse,
+    summary="批量获取用户",
+    description="根据多个用户ID获取用户信息，ids 可重复传参或用逗号分隔"
+)
+async def get_users_batch(
+    ids: List[str] = Query(..., description="用户ID，如 ids=1,2,3"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """批量获取用户"""
+    try:
+        user_ids = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户ID必须为整数"
+        )
+
+    return await _batch_lookup_response(user_ids, db)
+
+
+@router.post(
+    "/batch/lookup",
+    response_model=UserBatchLookupResponse,
+    summary="批量获取用户（POST）",
+    description="ID 较多时使用请求体传递用户ID列表"
+)
+async def lookup_users_batch(body: UserIdList, db: AsyncSession = Depends(get_read_db)):
+    """批量获取用户（请求体传参）"""
+    return await _batch_lookup_response(body.ids, db)
+
+
+@router.post(
+    "/bulk/activate",
+    response_model=UserBulkUpdateResponse,
+    summary="批量激活用户",
+    description="按用户ID列表或创建时间范围批量激活用户"
+)
+async def bulk_activate_users(criteria: UserBulkFilter, db: AsyncSession = Depends(get_db)):
+    """批量激活用户"""
+    return {"affected": await _bulk_set_active(db, criteria, True)}
+
+
+@router.post(
+    "/bulk/deactivate",
+    response_model=UserBulkUpdateResponse,
+    summary="批量禁用用户",
+    description="按用户ID列表或创建时间范围批量禁用用户，例如清理垃圾账号"
+)
+async def bulk_deactivate_users(criteria: UserBulkFilter, db: AsyncSession = Depends(get_db)):
+    """批量禁用用户"""
+    return {"affected": await _bulk_set_active(db, criteria, False)}
+
+
+@router.get(
+    "/search",
+    response_model=UserPage,
+    summary="搜索用户",
+    description=(
+        "按用户名、邮箱、全名进行前缀或子串搜索（不区分大小写），结果按相关度排序并分页；"
+        "少于全文索引最小长度的关键字（SQLite 3 个字符、MySQL 2 个字符）匹配结果相同但需扫描全表"
+    )
 )
-async def get_users(db: AsyncSession = Depends(get_db)):
-    """获取所有用户"""
-    result = await db.execute(select(User))
-    users = result.scalars().all()
-    return users
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索关键字"),
+    mode: SearchMode = Query(SearchMode.contains, description="匹配方式"),
+    limit: int = Query(
+        settings.USER_PAGE_SIZE_DEFAULT,
+        ge=1,
+        le=settings.USER_PAGE_SIZE_MAX,
+        description="每页数量"
+    ),
+    cursor: Optional[str] = Query(None, description="分页游标"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """搜索用户"""
+    offset = 0
+    if cursor:
+        try:
+            offset = int(decode_cursor(cursor)["offset"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的分页游标"
+            )
+
+    # 相关度排序无法使用 keyset 分页，限制可翻页的总条数
+    limit = min(limit, max(settings.USER_SEARCH_MAX_RESULTS - offset, 0))
+    if limit == 0:
+        return _json_response(dump_page([], None))
+
+    query = _build_search_query(db.get_bind().dialect.name, q, mode)
+    result = await db.execute(query.offset(offset).limit(limit + 1))
+    rows = [dict(row) for row in result.mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if offset + limit < settings.USER_SEARCH_MAX_RESULTS:
+            next_cursor = encode_cursor({"offset": offset + limit})
+
+    return _json_response(dump_page(rows, next_cursor))
 
 
 @router.get(
@@ -100,18 +818,23 @@ async def get_users(db: AsyncSession = Depends(get_db)):
     summary="获取用户详情",
     description="根据用户ID获取用户详细信息"
 )
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(user_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """获取单个用户"""
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    cached = await user_cache.get_by_id(user_id)
+    if cached is not None:
+        return _conditional_response(request, cached)
 
-    if not user:
+    generation = user_cache.generation
+    result = await db.execute(select(*USER_COLUMNS).where(User.id == user_id))
+    row = result.mappings().one_or_none()
+
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="用户不存在"
         )
 
-    return user
+    return _conditional_response(request, await _cache_user(dict(row), generation))
 
 
 @router.put(
@@ -125,27 +848,22 @@ async def update_user(
     user_update: UserUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    """更新用户信息"""
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
-        )
-
-    # 更新字段
+    """
+    更新用户信息
+    修改激活状态时与激活 / 禁用接口一样记录激活事件并处理已签发的令牌；
+    修改超级用户标记时吊销已签发的令牌（令牌声明中携带该标记）
+    """
     update_data = user_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(user, field, value)
 
-    user.updated_at = func.now()
+    previous = None
+    if update_data.keys() & {"is_active", "is_superuser"}:
+        result = await db.execute(
+            select(User.is_active, User.is_superuser).where(User.id == user_id).with_for_update()
+        )
+        previous = result.one_or_none()
 
     try:
-        await db.commit()
-        await db.refresh(user)
-        return user
+        user = await _update_user_returning(db, user_id, update_data)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(
@@ -153,6 +871,29 @@ async def update_user(
             detail="更新失败，请检查输入数据"
         )
 
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+
+    activation_changed = previous is not None and previous.is_active != user.is_active
+    superuser_changed = previous is not None and previous.is_superuser != user.is_superuser
+
+    events = []
+    if update_data.keys() - {"is_active"}:
+        events += user_events.record(db, USER_UPDATED, [(user.id, user_row(user))])
+    if activation_changed:
+        events += _record_activation(db, [(user.id, user.username)], user.is_active)
+    await db.commit()
+    await user_cache.invalidate(user.id, user.username)
+    if activation_changed:
+        await _sync_user_tokens([user.id], user.is_active)
+    if superuser_changed and user.is_active:
+        await token_verifier.revoke_users([user.id])
+    user_events.emit(events)
+    return _user_response(user)
+
 
 @router.delete(
     "/{user_id}",
@@ -162,19 +903,7 @@ async def update_user(
 )
 async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """删除用户（软删除）"""
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
-        )
-
-    # 软删除
-    user.is_active = False
-    await db.commit()
-
+    await _set_user_active(db, user_id, False)
     return None
 
 
@@ -184,51 +913,36 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     summary="根据用户名查找用户",
     description="根据用户名精确查找用户"
 )
-async def get_user_by_username(username: str, db: AsyncSession = Depends(get_db)):
+async def get_user_by_username(
+    username: str,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
     """根据用户名查找用户"""
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalar_one_or_none()
+    cached = await user_cache.get_by_username(username)
+    if cached is not None:
+        return _conditional_response(request, cached)
 
-    if not user:
+    generation = user_cache.generation
+    result = await db.execute(select(*USER_COLUMNS).where(User.username == username))
+    row = result.mappings().one_or_none()
+
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"用户 {username} 不存在"
         )
 
-    return user
+    return _conditional_response(request, await _cache_user(dict(row), generation))
 
 
 @router.post("/{user_id}/activate", response_model=UserResponse, summary="激活用户")
 async def activate_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """激活用户账户"""
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
-        )
-
-    user.is_active = True
-    await db.commit()
-    await db.refresh(user)
-    return user
+    return _user_response(await _set_user_active(db, user_id, True))
 
 
 @router.post("/{user_id}/deactivate", response_model=UserResponse, summary="禁用用户")
 async def deactivate_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """禁用用户账户"""
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
-        )
-
-    user.is_active = False
-    await db.commit()
-    await db.refresh(user)
-    return user
+    return _user_response(await _set_user_active(db, user_id, False))
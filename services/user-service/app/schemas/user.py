@@ -2,11 +2,13 @@
 用户数据模式（Schema）
 使用 Pydantic 进行数据验证和序列化
 """
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, model_validator, validator
+from typing import List, Optional
 from datetime import datetime
 import re
 
+from app.core.config import settings
+
 
 class UserBase(BaseModel):
     """用户基础模式"""
@@ -100,6 +102,77 @@ class UserResponse(UserBase):
         }
 
 
+class UserPage(BaseModel):
+    """用户分页响应模式"""
+    items: List[UserResponse] = Field(..., description="当前页用户")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
+
+
+class UserBatchCreate(BaseModel):
+    """批量创建用户请求模式"""
+    # 数量上限放在模式上，超限的请求在逐条校验之前即被拒绝
+    users: List[UserCreate] = Field(
+        ..., min_length=1, max_length=settings.USER_BATCH_MAX_SIZE, description="待创建的用户列表"
+    )
+
+
+class UserBatchItemResult(BaseModel):
+    """批量创建单条结果"""
+    index: int = Field(..., description="在请求列表中的位置")
+    status: str = Field(..., description="created 或 conflict")
+    user: Optional[UserResponse] = Field(None, description="创建成功的用户")
+    detail: Optional[str] = Field(None, description="失败原因")
+
+
+class UserBatchCreateResponse(BaseModel):
+    """批量创建用户响应模式"""
+    created: int = Field(..., description="成功数量")
+    failed: int = Field(..., description="失败数量")
+    results: List[UserBatchItemResult] = Field(..., description="逐条结果，顺序与请求一致")
+
+
+class UserIdList(BaseModel):
+    """批量查询用户请求模式"""
+    ids: List[int] = Field(
+        ..., min_length=1, max_length=settings.USER_BATCH_MAX_SIZE, description="用户ID列表"
+    )
+
+
+class UserBatchLookupResponse(BaseModel):
+    """批量查询用户响应模式"""
+    items: List[UserResponse] = Field(..., description="找到的用户，顺序与请求一致")
+    missing: List[int] = Field(..., description="不存在的用户ID")
+
+
+class UserBulkFilter(BaseModel):
+    """批量修改用户状态的筛选条件，条件之间为 AND 关系"""
+    ids: Optional[List[int]] = Field(
+        None, min_length=1, max_length=settings.USER_BULK_MAX_IDS, description="用户ID列表"
+    )
+    created_after: Optional[datetime] = Field(None, description="创建时间下限（含）")
+    created_before: Optional[datetime] = Field(None, description="创建时间上限（不含）")
+
+    @model_validator(mode='after')
+    def require_criteria(self):
+        """至少指定一个条件，防止误改全表"""
+        if self.ids is None and self.created_after is None and self.created_before is None:
+            raise ValueError('至少需要指定 ids、created_after、created_before 中的一个')
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "created_after": "2024-01-01T00:00:00",
+                "created_before": "2024-01-02T00:00:00"
+            }
+        }
+
+
+class UserBulkUpdateResponse(BaseModel):
+    """批量修改用户状态响应模式"""
+    affected: int = Field(..., description="实际发生变化的用户数量")
+
+
 class UserInDB(UserBase):
     """数据库用户模式（包含密码哈希）"""
     id: int
@@ -114,14 +187,25 @@ class UserInDB(UserBase):
 class Token(BaseModel):
     """Token 响应模式"""
     access_token: str
-    token_type: str
+    refresh_token: Optional[str] = None
+    token_type: str = "bearer"
     expires_in: int
 
 
 class TokenPayload(BaseModel):
-    """Token 载荷模式"""
+    """Token 载荷模式（JWT 中 sub 为字符串，解析时转换为用户ID）"""
     sub: Optional[int] = None
     exp: Optional[int] = None
+    iat: Optional[float] = None
+    jti: Optional[str] = None
+    type: str = "access"
+    username: Optional[str] = None
+    is_superuser: bool = False
+
+
+class TokenRefresh(BaseModel):
+    """刷新令牌请求模式"""
+    refresh_token: str = Field(..., description="登录时签发的刷新令牌")
 
 
 class UserLogin(BaseModel):
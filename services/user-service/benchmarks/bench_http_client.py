@@ -0,0 +1,75 @@
+"""
+服务间 HTTP 客户端基准测试
+对本地 aiohttp 服务并发发起请求，对比每次调用新建 ClientSession 与共享连接池（Upstream）的吞吐量
+
+运行方式（在 services/user-service 目录下）:
+    python -m benchmarks.bench_http_client
+"""
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.core.http_client import HttpClients
+
+REQUESTS = 2000
+CONCURRENCY = 50
+
+
+async def handle(request: web.Request) -> web.Response:
+    return web.json_response({"id": 1, "status": "ok"})
+
+
+async def run(call) -> float:
+    """以 CONCURRENCY 并发发起 REQUESTS 次调用，返回每秒请求数"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    app = web.Application()
+    app.router.add_get("/api/orders/1", handle)
+    server = TestServer(app)
+    await server.start_server()
+    url = str(server.make_url("/api/orders/1"))
+
+    async def per_call_session():
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                await response.read()
+
+    clients = HttpClients()
+    clients.start({"order": str(server.make_url("/"))})
+    upstream = clients.get("order")
+
+    async def shared_pool():
+        await upstream.request("GET", "/api/orders/1")
+
+    try:
+        # 预热：建立保活连接
+        await run(shared_pool)
+        results = [
+            ("每次调用新建 ClientSession", await run(per_call_session)),
+            ("共享连接池 (Upstream)", await run(shared_pool)),
+        ]
+    finally:
+        await clients.close()
+        await server.close()
+
+    print(f"{'场景':<32}{'请求/秒':>12}")
+    print("-" * 44)
+    for name, rate in results:
+        print(f"{name:<32}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
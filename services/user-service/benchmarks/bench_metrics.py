@@ -0,0 +1,62 @@
+"""
+请求指标开销基准测试
+对比同一个最简 ASGI 应用在有无 MetricsMiddleware 时的单请求耗时，差值即每个请求的指标开销
+（请求计数、耗时直方图、处理中请求数各一次）
+
+运行方式（在 services/user-service 目录下）:
+    python -m benchmarks.bench_metrics
+"""
+import asyncio
+import time
+
+from app.core.metrics import MetricsMiddleware
+
+REQUESTS = 50000
+REPEAT = 5
+
+
+class _Route:
+    path = "/api/users/{user_id}"
+
+
+async def endpoint(scope, receive, send):
+    """最简应用：模拟路由匹配后返回 200"""
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def run(app) -> float:
+    """依次处理 REQUESTS 个请求，返回每个请求的平均耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        scope = {"type": "http", "method": "GET", "path": "/api/users/1"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / REQUESTS
+
+
+async def main():
+    instrumented = MetricsMiddleware(endpoint)
+    # 预热：创建标签子项
+    await run(instrumented)
+
+    baseline = min([await run(endpoint) for _ in range(REPEAT)])
+    with_metrics = min([await run(instrumented) for _ in range(REPEAT)])
+
+    print(f"{'场景':<32}{'每请求耗时 (µs)':>18}")
+    print("-" * 50)
+    print(f"{'无指标':<32}{baseline * 1e6:>18.2f}")
+    print(f"{'MetricsMiddleware':<32}{with_metrics * 1e6:>18.2f}")
+    print(f"{'指标开销':<32}{(with_metrics - baseline) * 1e6:>18.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+用户序列化基准测试
+对比每行序列化成本：response_model 路径、快速编码器与 User.to_dict()/to_json()
+
+运行方式（在 services/user-service 目录下）:
+    python -m benchmarks.bench_serialization
+"""
+import json
+import timeit
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.serialization import dump_user, dump_users, user_row
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+ROWS = 1000
+REPEAT = 5
+
+
+def make_users(count: int):
+    """构造内存中的用户对象"""
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        User(
+            id=i,
+            username=f"user_{i}",
+            email=f"user_{i}@example.com",
+            full_name=f"User {i}",
+            is_active=True,
+            is_superuser=False,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def response_model_path(users):
+    """FastAPI response_model 路径：逐对象校验 + jsonable_encoder + json.dumps"""
+    content = jsonable_encoder([UserResponse.model_validate(user) for user in users])
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def model_dump_json_path(users):
+    """逐对象 model_validate + model_dump_json"""
+    return [UserResponse.model_validate(user).model_dump_json() for user in users]
+
+
+def fast_path(users):
+    """快速编码器：行字典直接编码，不做校验"""
+    return dump_users([user_row(user) for user in users])
+
+
+def fast_path_per_row(users):
+    """快速编码器逐行编码（缓存、NDJSON 导出使用）"""
+    return [dump_user(user_row(user)) for user in users]
+
+
+def to_dict_path(users):
+    """User.to_dict()"""
+    return [user.to_dict() for user in users]
+
+
+def to_json_path(users):
+    """User.to_json()"""
+    return [user.to_json() for user in users]
+
+
+CASES = [
+    ("response_model (validate + encode)", response_model_path),
+    ("UserResponse.model_dump_json", model_dump_json_path),
+    ("fast encoder (list)", fast_path),
+    ("fast encoder (per row)", fast_path_per_row),
+    ("User.to_dict()", to_dict_path),
+    ("User.to_json()", to_json_path),
+]
+
+
+def main():
+    users = make_users(ROWS)
+
+    # 快速编码器输出必须与 response_model 路径逐字节一致
+    assert fast_path(users) == response_model_path(users)
+
+    print(f"{'方法':<40}{'每行耗时 (µs)':>16}")
+    print("-" * 56)
+    for name, fn in CASES:
+        best = min(timeit.repeat(lambda: fn(users), number=1, repeat=REPEAT))
+        print(f"{name:<40}{best / ROWS * 1e6:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+SQLite 并发读写基准测试
+对比默认引擎（回滚日志、读写共用连接池）与调优后的引擎
+（WAL + PRAGMA、单写连接 + 只读连接池）在并发读写下的吞吐量
+
+运行方式（在 services/user-service 目录下）:
+    python -m benchmarks.bench_sqlite
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import create_sqlite_engine
+
+READERS = 16
+WRITERS = 4
+DURATION = 3.0
+ROWS = 5000
+
+
+async def prepare(engine):
+    """建表并写入初始数据"""
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, counter INTEGER)"
+        ))
+        await conn.execute(
+            text("INSERT INTO items (name, counter) VALUES (:name, 0)"),
+            [{"name": f"item_{i}"} for i in range(ROWS)],
+        )
+
+
+async def run(write_engine, read_engine) -> dict:
+    """READERS 个读协程与 WRITERS 个写协程并发运行 DURATION 秒"""
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    deadline = time.perf_counter() + DURATION
+
+    async def reader(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            try:
+                async with read_engine.connect() as conn:
+                    await conn.execute(
+                        text("SELECT id, name, counter FROM items WHERE id > :id ORDER BY id LIMIT 20"),
+                        {"id": i % ROWS},
+                    )
+                counts["reads"] += 1
+            except exc.OperationalError:
+                counts["errors"] += 1
+            i += 37
+
+    async def writer(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            try:
+                async with write_engine.begin() as conn:
+                    await conn.execute(
+                        text("UPDATE items SET counter = counter + 1 WHERE id = :id"),
+                        {"id": i % ROWS + 1},
+                    )
+                counts["writes"] += 1
+            except exc.OperationalError:
+                # database is locked
+                counts["errors"] += 1
+            i += 101
+
+    await asyncio.gather(
+        *(reader(n) for n in range(READERS)),
+        *(writer(n) for n in range(WRITERS)),
+    )
+    return counts
+
+
+async def bench(name: str, make_engines) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        write_engine, read_engine = make_engines(url)
+        try:
+            await prepare(write_engine)
+            counts = await run(write_engine, read_engine)
+        finally:
+            await write_engine.dispose()
+            if read_engine is not write_engine:
+                await read_engine.dispose()
+
+    print(
+        f"{name:<28}{counts['reads'] / DURATION:>12.0f}"
+        f"{counts['writes'] / DURATION:>12.0f}{counts['errors']:>10}"
+    )
+
+
+def default_engines(url: str):
+    """调优前：默认参数，读写共用一个引擎"""
+    engine = create_async_engine(url)
+    return engine, engine
+
+
+def tuned_engines(url: str):
+    """调优后：单写连接 + 只读连接池"""
+    return create_sqlite_engine(url), create_sqlite_engine(url, read_only=True)
+
+
+async def main():
+    # 开发环境引擎会输出 SQL 与连接池日志，基准测试中关闭
+    logging.disable(logging.INFO)
+    print(f"{READERS} 读 / {WRITERS} 写，持续 {DURATION:.0f} 秒")
+    print(f"{'引擎':<28}{'读/秒':>12}{'写/秒':>12}{'错误':>10}")
+    print("-" * 62)
+    await bench("default", default_engines)
+    await bench("tuned (WAL, 1 writer)", tuned_engines)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
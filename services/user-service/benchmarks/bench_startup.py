@@ -0,0 +1,62 @@
+"""
+服务启动耗时基准测试
+测量冷启动的两段耗时：导入应用模块，以及执行启动流程（lifespan）后返回第一个请求
+数据库结构已是最新（先执行迁移），与生产环境 worker 启动时的情况一致
+
+运行方式（在 services/user-service 目录下，需在独立进程中运行才能测到冷导入）:
+    python -m benchmarks.bench_startup [--json]
+"""
+import asyncio
+import json
+import sys
+import time
+
+
+def measure() -> dict:
+    start = time.perf_counter()
+    from app.main import app
+    import_ms = (time.perf_counter() - start) * 1000
+
+    from httpx import AsyncClient
+
+    from app.core.database import dispose_engines, engine
+    from app.core.migrations import migrate
+
+    async def first_request() -> tuple:
+        await migrate(engine)
+        # 释放迁移用过的连接，启动流程从空连接池开始
+        await dispose_engines()
+
+        start = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            startup_ms = (time.perf_counter() - start) * 1000
+            async with AsyncClient(app=app, base_url="http://testserver") as client:
+                response = await client.get("/api/users/", params={"limit": 1})
+            response.raise_for_status()
+            first_request_ms = (time.perf_counter() - start) * 1000
+        return startup_ms, first_request_ms
+
+    startup_ms, first_request_ms = asyncio.run(first_request())
+    return {
+        "import_ms": round(import_ms, 1),
+        "startup_ms": round(startup_ms, 1),
+        "first_request_ms": round(first_request_ms, 1),
+    }
+
+
+def main():
+    result = measure()
+    if "--json" in sys.argv:
+        # 启动流程会打印日志，结果放在最后一行
+        print(json.dumps(result))
+        return
+
+    print(f"{'阶段':<36}{'耗时 (ms)':>12}")
+    print("-" * 48)
+    print(f"{'导入 app.main':<36}{result['import_ms']:>12.1f}")
+    print(f"{'lifespan 启动':<36}{result['startup_ms']:>12.1f}")
+    print(f"{'lifespan 启动 + 第一个请求':<36}{result['first_request_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Gunicorn 配置
+启动参数见 Dockerfile.prod，此文件只包含 Prometheus 多进程模式需要的钩子
+（gunicorn 默认读取当前目录下的 gunicorn.conf.py）
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    """主进程启动时清空上次运行留下的指标文件"""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """worker 退出后移除其处理中请求数等实时指标"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
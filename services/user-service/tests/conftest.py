@@ -4,11 +4,20 @@ Pytest 配置和共享固件
 """
 import pytest
 import asyncio
+import time
+from redis.exceptions import ResponseError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import engine, get_db, Base
+from app.core.database import engine, get_db, Base, dispose_engines
 from sqlalchemy.pool import StaticPool
 from httpx import AsyncClient
 from app.main import app
+from app.core.auth import token_verifier
+from app.core.cache import user_cache
+from app.core.config import settings
+
+
+# 测试共用同一个客户端地址，默认关闭限流，限流测试中单独开启
+settings.RATE_LIMIT_ENABLED = False
 
 
 # 测试数据库 URL（使用内存 SQLite 进行测试）
@@ -42,6 +51,7 @@ async def setup_database():
     # 测试结束后清理
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    await dispose_engines()
 
 
 @pytest.fixture
@@ -71,3 +81,205 @@ async def async_client():
     """
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         yield client
+
+
+@pytest.fixture
+def create_user(async_client):
+    """
+    创建用户固件
+    通过 API 创建用户（邮箱为 {username}@example.com，密码为 SecurePass123），返回响应 JSON
+    """
+    async def create(username: str) -> dict:
+        response = await async_client.post("/api/users/", json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": "SecurePass123"
+        })
+        assert response.status_code == 201
+        return response.json()
+
+    return create
+
+
+class FakeRedis:
+    """
+    内存版 Redis 替身
+    只实现测试用到的命令
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.fail = False
+        self.published = []
+        self.subscribers = set()
+        self.streams = {}
+        self.groups = {}
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+
+    async def ping(self):
+        self._check()
+        return True
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self._check()
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, *keys):
+        self._check()
+        return sum(1 for key in keys if key in self.data)
+
+    async def delete(self, *keys):
+        self._check()
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    async def publish(self, channel, message):
+        self._check()
+        self.published.append((channel, message))
+        receivers = [pubsub for pubsub in self.subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(receivers)
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        self._check()
+        stream = self.streams.setdefault(name, [])
+        entry_id = f"{len(stream) + 1}-0"
+        stream.append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        self._check()
+        if (name, groupname) in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        stream = self.streams.setdefault(name, [])
+        # 组内待确认消息: 条目 ID -> (消费者, 投递时间)
+        self.groups[(name, groupname)] = {
+            "delivered": 0 if id == "0" else len(stream),
+            "pending": {},
+        }
+        return True
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        self._check()
+        response = []
+        for name in streams:
+            group = self.groups[(name, groupname)]
+            entries = self.streams[name][group["delivered"]:][:count]
+            group["delivered"] += len(entries)
+            for entry_id, _ in entries:
+                group["pending"][entry_id] = (consumername, time.monotonic())
+            if entries:
+                response.append([name, entries])
+        if not response and block:
+            # 模拟阻塞等待（缩短），让出事件循环
+            await asyncio.sleep(min(block / 1000, 0.01))
+        return response
+
+    async def xack(self, name, groupname, *ids):
+        self._check()
+        pending = self.groups[(name, groupname)]["pending"]
+        return sum(1 for entry_id in ids if pending.pop(entry_id, None) is not None)
+
+    async def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        self._check()
+        pending = self.groups[(name, groupname)]["pending"]
+        now = time.monotonic()
+        claimed = [
+            entry_id for entry_id, (_, delivered_at) in pending.items()
+            if (now - delivered_at) * 1000 >= min_idle_time
+        ][:count]
+        for entry_id in claimed:
+            pending[entry_id] = (consumername, now)
+        entries = [entry for entry in self.streams[name] if entry[0] in claimed]
+        return ["0-0", entries, []]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+    def disconnect_subscribers(self):
+        """模拟订阅连接断开"""
+        for pubsub in list(self.subscribers):
+            pubsub.queue.put_nowait(ConnectionError("connection lost"))
+
+
+class FakePubSub:
+    """FakeRedis 的发布订阅，消息经由队列投递"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.channels = set()
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        self.redis._check()
+        self.channels.update(channels)
+        self.redis.subscribers.add(self)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    async def aclose(self):
+        self.redis.subscribers.discard(self)
+
+
+class FakePipeline:
+    """FakeRedis 的管道，按顺序执行缓冲的命令"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def buffer(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return buffer
+
+    async def execute(self):
+        return [
+            await getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+
+
+@pytest.fixture
+def fake_redis():
+    """
+    绑定内存 Redis 的用户缓存和令牌校验器固件
+    测试结束后解除绑定
+    """
+    redis = FakeRedis()
+    user_cache.bind(redis)
+    token_verifier.bind(redis)
+    yield redis
+    user_cache.bind(None)
+    token_verifier.bind(None)
@@ -0,0 +1,271 @@
+"""
+认证测试
+测试登录、令牌刷新与吊销，以及无状态的当前用户校验
+"""
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+
+from sqlalchemy import select
+
+from app.core.auth import InvalidToken, TokenVerifier, token_verifier
+from app.core.database import engine
+from app.core.security import REFRESH_TOKEN, _create_token, create_access_token
+from app.models.event import UserEventOutbox
+
+
+async def _login(async_client: AsyncClient, username: str, password: str = "SecurePass123"):
+    return await async_client.post("/api/users/login", json={
+        "username": username,
+        "password": password
+    })
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+async def test_login_and_get_current_user(async_client: AsyncClient, create_user):
+    """测试登录并使用访问令牌获取当前用户"""
+    user = await create_user("auth_login")
+
+    response = await _login(async_client, "auth_login")
+    assert response.status_code == status.HTTP_200_OK
+    tokens = response.json()
+    assert tokens["token_type"] == "bearer"
+    assert tokens["refresh_token"]
+
+    # 邮箱同样可以登录
+    response = await _login(async_client, "auth_login@example.com")
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await async_client.get("/api/users/me", headers=_bearer(tokens["access_token"]))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == user["id"]
+
+
+@pytest.mark.asyncio
+async def test_login_failures(async_client: AsyncClient, create_user):
+    """测试密码错误、用户不存在和用户已禁用"""
+    user = await create_user("auth_fail")
+
+    response = await _login(async_client, "auth_fail", "WrongPass123")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = await _login(async_client, "auth_nobody")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    await async_client.post(f"/api/users/{user['id']}/deactivate")
+    response = await _login(async_client, "auth_fail")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_current_user_requires_valid_token(async_client: AsyncClient, create_user):
+    """测试缺少令牌、令牌无效和令牌类型错误"""
+    await create_user("auth_invalid")
+    tokens = (await _login(async_client, "auth_invalid")).json()
+
+    response = await async_client.get("/api/users/me")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.headers["www-authenticate"] == "Bearer"
+
+    response = await async_client.get("/api/users/me", headers=_bearer("not-a-token"))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # 刷新令牌不能当作访问令牌使用
+    response = await async_client.get("/api/users/me", headers=_bearer(tokens["refresh_token"]))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_tokens(async_client: AsyncClient, fake_redis, create_user):
+    """测试退出登录后令牌失效，吊销记录写入 Redis"""
+    await create_user("auth_logout")
+    tokens = (await _login(async_client, "auth_logout")).json()
+    headers = _bearer(tokens["access_token"])
+
+    response = await async_client.post(
+        "/api/users/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert len([key for key in fake_redis.data if key.startswith("auth:revoked:")]) == 2
+
+    response = await async_client.get("/api/users/me", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = await async_client.post(
+        "/api/users/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_deactivate_revokes_tokens(async_client: AsyncClient, fake_redis, create_user):
+    """测试禁用用户后其已签发的令牌立即失效，其他 worker 通过 Redis 同样拒绝"""
+    user = await create_user("auth_deactivated")
+    tokens = (await _login(async_client, "auth_deactivated")).json()
+    headers = _bearer(tokens["access_token"])
+    assert (await async_client.get("/api/users/me", headers=headers)).status_code == status.HTTP_200_OK
+
+    await async_client.post(f"/api/users/{user['id']}/deactivate")
+    assert token_verifier.user_revoked_key(user["id"]) in fake_redis.data
+
+    response = await async_client.get("/api/users/me", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = await async_client.post(
+        "/api/users/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # 另一个 worker 没有本地记录，依靠 Redis 中的用户吊销时间
+    other = TokenVerifier()
+    other.bind(fake_redis)
+    with pytest.raises(InvalidToken):
+        await other.verify(tokens["access_token"])
+
+
+@pytest.mark.asyncio
+async def test_update_deactivate_revokes_tokens(async_client: AsyncClient, fake_redis, create_user):
+    """测试通过更新接口禁用用户或修改超级用户标记同样吊销令牌，并记录禁用事件"""
+    user = await create_user("auth_put_off")
+    headers = _bearer((await _login(async_client, "auth_put_off")).json()["access_token"])
+
+    response = await async_client.put(f"/api/users/{user['id']}", json={"is_active": False})
+    assert response.status_code == status.HTTP_200_OK
+    assert token_verifier.user_revoked_key(user["id"]) in fake_redis.data
+    response = await async_client.get("/api/users/me", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async with engine.connect() as conn:
+        types = (await conn.execute(
+            select(UserEventOutbox.event_type)
+            .where(UserEventOutbox.user_id == user["id"])
+            .order_by(UserEventOutbox.id)
+        )).scalars().all()
+    assert types == ["user.created", "user.deactivated"]
+
+    other = await create_user("auth_put_admin")
+    await async_client.put(f"/api/users/{other['id']}", json={"full_name": "不变"})
+    assert token_verifier.user_revoked_key(other["id"]) not in fake_redis.data
+    await async_client.put(f"/api/users/{other['id']}", json={"is_superuser": True})
+    assert token_verifier.user_revoked_key(other["id"]) in fake_redis.data
+
+
+@pytest.mark.asyncio
+async def test_bulk_deactivate_revokes_tokens(async_client: AsyncClient, fake_redis, create_user):
+    """测试批量禁用同样吊销令牌，之后签发的令牌不受影响"""
+    user = await create_user("auth_bulk_off")
+    tokens = (await _login(async_client, "auth_bulk_off")).json()
+
+    await async_client.post("/api/users/bulk/deactivate", json={"ids": [user["id"]]})
+    response = await async_client.get("/api/users/me", headers=_bearer(tokens["access_token"]))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    other = TokenVerifier()
+    other.bind(fake_redis)
+    revoked_at = float(fake_redis.data[other.user_revoked_key(user["id"])])
+    later = _create_token(
+        SimpleNamespace(id=user["id"], username="auth_bulk_off", is_superuser=False),
+        "access", timedelta(minutes=5),
+    )
+    payload = other.decode(later)
+    payload.iat = revoked_at + 0.001
+    assert not await other.is_revoked(payload)
+
+
+@pytest.mark.asyncio
+async def test_reactivate_and_login_within_same_second(async_client: AsyncClient, fake_redis, create_user):
+    """测试禁用后立即重新激活并登录，新令牌不被拒绝，吊销记录随激活删除"""
+    user = await create_user("auth_reactivate")
+
+    await async_client.post(f"/api/users/{user['id']}/deactivate")
+    await async_client.post(f"/api/users/{user['id']}/activate")
+    assert token_verifier.user_revoked_key(user["id"]) not in fake_redis.data
+
+    tokens = (await _login(async_client, "auth_reactivate")).json()
+    response = await async_client.get("/api/users/me", headers=_bearer(tokens["access_token"]))
+    assert response.status_code == status.HTTP_200_OK
+
+    # 其他 worker 仍保留本地吊销记录时，吊销之后签发的令牌同样有效
+    other = TokenVerifier()
+    payload = other.decode(tokens["access_token"])
+    other._revoked_users[user["id"]] = (payload.iat - 0.001, int(time.time()) + 60)
+    assert not await other.is_revoked(payload)
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_tokens(async_client: AsyncClient, create_user):
+    """测试刷新令牌只能使用一次"""
+    await create_user("auth_refresh")
+    tokens = (await _login(async_client, "auth_refresh")).json()
+
+    response = await async_client.post(
+        "/api/users/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    rotated = response.json()
+
+    response = await async_client.get("/api/users/me", headers=_bearer(rotated["access_token"]))
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await async_client.post(
+        "/api/users/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+USER = SimpleNamespace(id=42, username="claims_user", is_superuser=True)
+
+
+@pytest.mark.asyncio
+async def test_verifier_caches_decoded_claims():
+    """测试重复校验同一令牌命中进程内缓存"""
+    verifier = TokenVerifier()
+    token = create_access_token(USER)
+
+    payload = await verifier.verify(token)
+    assert payload.sub == 42
+    assert payload.username == "claims_user"
+    assert payload.is_superuser is True
+
+    await verifier.verify(token)
+    assert verifier.stats()["hits"] == 1
+    assert verifier.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_verifier_rejects_expired_cached_token():
+    """测试缓存中的令牌过期后被拒绝"""
+    verifier = TokenVerifier()
+    token = create_access_token(USER)
+    payload = await verifier.verify(token)
+
+    payload.exp = int(time.time()) - 1
+    with pytest.raises(InvalidToken):
+        await verifier.verify(token)
+    assert verifier.stats()["cached_tokens"] == 0
+
+
+@pytest.mark.asyncio
+async def test_revocation_shared_through_redis(fake_redis):
+    """测试其他 worker 吊销的令牌通过 Redis 被识别"""
+    token = _create_token(USER, REFRESH_TOKEN, timedelta(minutes=5))
+    payload = await token_verifier.verify(token, REFRESH_TOKEN)
+    await token_verifier.revoke(payload)
+
+    other_worker = TokenVerifier()
+    other_worker.bind(fake_redis)
+    with pytest.raises(InvalidToken):
+        await other_worker.verify(token, REFRESH_TOKEN)
+
+    # Redis 故障时按配置放行，仍然校验签名与过期时间
+    fake_redis.fail = True
+    fresh = _create_token(USER, REFRESH_TOKEN, timedelta(minutes=5))
+    assert (await other_worker.verify(fresh, REFRESH_TOKEN)).sub == 42
+    assert other_worker.stats()["errors"] == 1
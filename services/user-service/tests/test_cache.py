@@ -0,0 +1,226 @@
+"""
+用户缓存测试
+测试读穿透、写后失效、与写操作并发的回填、Redis 故障回退，以及进程内缓存层与 pub/sub 失效广播
+"""
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+
+from app.core import cache as cache_module
+from app.core.cache import TOMBSTONE, LocalCache, UserCache, user_cache
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_get_user_read_through(async_client: AsyncClient, fake_redis, create_user):
+    """测试首次读取回源并写缓存，再次读取命中缓存"""
+    user = await create_user("cache_read")
+
+    hits_before = user_cache.hits
+    first = await async_client.get(f"/api/users/{user['id']}")
+    assert first.status_code == status.HTTP_200_OK
+    assert user_cache.id_key(user["id"]) in fake_redis.data
+    assert user_cache.username_key("cache_read") in fake_redis.data
+
+    second = await async_client.get(f"/api/users/{user['id']}")
+    by_name = await async_client.get("/api/users/search/by-username/cache_read")
+
+    assert user_cache.hits == hits_before + 2
+    assert second.json() == first.json()
+    assert by_name.json() == first.json()
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidated_on_write(async_client: AsyncClient, fake_redis, create_user):
+    """测试写操作后缓存精确失效"""
+    user = await create_user("cache_write")
+    await async_client.get(f"/api/users/{user['id']}")
+
+    response = await async_client.post(f"/api/users/{user['id']}/deactivate")
+    assert response.status_code == status.HTTP_200_OK
+    assert fake_redis.data[user_cache.id_key(user["id"])] == TOMBSTONE
+    assert fake_redis.data[user_cache.username_key("cache_write")] == TOMBSTONE
+
+    # 再次读取得到最新数据
+    response = await async_client.get(f"/api/users/{user['id']}")
+    assert response.json()["is_active"] is False
+
+
+@pytest.mark.asyncio
+async def test_cache_falls_back_when_redis_down(async_client: AsyncClient, fake_redis, create_user):
+    """测试 Redis 故障时回退数据库"""
+    user = await create_user("cache_down")
+    fake_redis.fail = True
+
+    errors_before = user_cache.errors
+    response = await async_client.get(f"/api/users/{user['id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["username"] == "cache_down"
+    assert user_cache.errors > errors_before
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup_uses_cache(async_client: AsyncClient, fake_redis, create_user):
+    """测试批量查询先读缓存，未命中的回源后写回缓存"""
+    first = await create_user("cache_batch1")
+    second = await create_user("cache_batch2")
+    await async_client.get(f"/api/users/{first['id']}")
+
+    hits_before = user_cache.hits
+    response = await async_client.get(f"/api/users/batch?ids={first['id']},{second['id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["items"]) == 2
+    assert user_cache.hits == hits_before + 1
+    assert user_cache.id_key(second["id"]) in fake_redis.data
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_invalidates_cache(async_client: AsyncClient, fake_redis, create_user):
+    """测试批量禁用一次性失效相关缓存"""
+    user = await create_user("cache_bulk")
+    await async_client.get(f"/api/users/{user['id']}")
+    assert user_cache.id_key(user["id"]) in fake_redis.data
+
+    response = await async_client.post("/api/users/bulk/deactivate", json={"ids": [user["id"]]})
+
+    assert response.json()["affected"] == 1
+    assert fake_redis.data[user_cache.id_key(user["id"])] == TOMBSTONE
+    assert fake_redis.data[user_cache.username_key("cache_bulk")] == TOMBSTONE
+
+
+@pytest.mark.asyncio
+async def test_stale_fill_after_invalidation(fake_redis):
+    """测试读数据库期间发生失效时，旧数据不回填到 Redis 和本地"""
+    stale = '{"id": 1, "full_name": "旧数据"}'
+
+    # 本进程内：读数据库前取得的失效代数已过期，放弃回填
+    generation = user_cache.generation
+    await user_cache.invalidate(1, "stale_fill")
+    stale_before = user_cache.stale_fills
+    await user_cache.set(1, "stale_fill", stale, generation)
+    assert user_cache.stale_fills == stale_before + 1
+    assert fake_redis.data[user_cache.id_key(1)] == TOMBSTONE
+    assert await user_cache.get_by_id(1) is None
+
+    # 其他 worker 的失效：占位值使 SET NX 失败，本地也不写入
+    other = UserCache()
+    other.bind(fake_redis)
+    await other.set(1, "stale_fill", stale, other.generation)
+    assert fake_redis.data[user_cache.id_key(1)] == TOMBSTONE
+    assert len(other.local) == 0
+
+    # 占位值过期后正常回填
+    del fake_redis.data[user_cache.id_key(1)]
+    del fake_redis.data[user_cache.username_key("stale_fill")]
+    await other.set(1, "stale_fill", stale, other.generation)
+    assert fake_redis.data[user_cache.id_key(1)] == stale
+    assert len(other.local) == 2
+
+
+async def _wait_for(condition, timeout: float = 1.0):
+    """等待后台订阅任务处理完消息"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "等待超时"
+        await asyncio.sleep(0.005)
+
+
+@pytest.fixture
+async def other_worker(fake_redis):
+    """模拟同一 Redis 上的另一个 worker 的缓存，并启动双方的失效订阅"""
+    other = UserCache()
+    other.bind(fake_redis)
+    other.start()
+    user_cache.start()
+    await _wait_for(lambda: other.subscribed and user_cache.subscribed)
+    yield other
+    await other.stop()
+    await user_cache.stop()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_hot_reads(async_client: AsyncClient, fake_redis, create_user):
+    """测试热点读取命中进程内缓存，不再访问 Redis"""
+    user = await create_user("cache_local")
+    await async_client.get(f"/api/users/{user['id']}")
+
+    local_hits = user_cache.local.hits
+    redis_lookups = user_cache.redis_hits + user_cache.redis_misses
+    fake_redis.fail = True  # 若访问 Redis 会记为错误
+
+    response = await async_client.get(f"/api/users/{user['id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert user_cache.local.hits == local_hits + 1
+    assert user_cache.redis_hits + user_cache.redis_misses == redis_lookups
+
+    stats = user_cache.stats()
+    assert stats["local"]["hits"] >= 1
+    assert 0 < stats["local"]["hit_ratio"] <= 1
+    assert "hit_ratio" in stats["redis"]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_broadcast_to_other_workers(
+    async_client: AsyncClient, fake_redis, other_worker, create_user
+):
+    """测试写操作的失效消息删除其他 worker 的本地缓存"""
+    user = await create_user("cache_broadcast")
+    await async_client.get(f"/api/users/{user['id']}")
+    assert await other_worker.get_by_id(user["id"]) is not None
+    assert other_worker.id_key(user["id"]) in other_worker.local._entries
+
+    response = await async_client.post(f"/api/users/{user['id']}/deactivate")
+    assert response.status_code == status.HTTP_200_OK
+    assert fake_redis.published[-1][0] == settings.USER_CACHE_INVALIDATION_CHANNEL
+
+    await _wait_for(lambda: other_worker.id_key(user["id"]) not in other_worker.local._entries)
+    assert other_worker.username_key("cache_broadcast") not in other_worker.local._entries
+    assert other_worker.invalidations_received >= 1
+
+
+@pytest.mark.asyncio
+async def test_local_tier_degrades_on_pubsub_disconnect(fake_redis, other_worker, monkeypatch):
+    """测试订阅断开时清空本地缓存并改用短 TTL，恢复后重新订阅"""
+    monkeypatch.setattr(cache_module, "_RESUBSCRIBE_MIN_DELAY", 0.01)
+    assert other_worker._local_ttl() == settings.USER_LOCAL_CACHE_TTL
+    await other_worker.set(1, "degraded", '{"id": 1}')
+    assert len(other_worker.local) == 2
+
+    fake_redis.fail = True
+    fake_redis.disconnect_subscribers()
+    await _wait_for(lambda: not other_worker.subscribed)
+
+    assert len(other_worker.local) == 0
+    assert other_worker._local_ttl() == settings.USER_LOCAL_CACHE_DEGRADED_TTL
+    assert other_worker.stats()["invalidation"]["subscription_failures"] >= 1
+
+    fake_redis.fail = False
+    await _wait_for(lambda: other_worker.subscribed, timeout=2.0)
+    assert other_worker._local_ttl() == settings.USER_LOCAL_CACHE_TTL
+
+
+def test_local_cache_lru_and_ttl(monkeypatch):
+    """测试本地缓存的容量上限、过期和读取期间失效的保护"""
+    monkeypatch.setattr(settings, "USER_LOCAL_CACHE_SIZE", 2)
+    local = LocalCache()
+
+    local.set("a", "1", ttl=60)
+    local.set("b", "2", ttl=60)
+    assert local.get("a") == "1"  # a 变为最近使用
+    local.set("c", "3", ttl=60)
+    assert local.get("b") is None
+    assert local.evictions == 1
+
+    local.set("expired", "x", ttl=0)
+    assert local.get("expired") is None
+
+    # 读取开始后发生过失效，结果不写入本地
+    generation = local.generation
+    local.delete(["a"])
+    local.set("a", "stale", ttl=60, generation=generation)
+    assert local.get("a") is None
@@ -0,0 +1,76 @@
+"""
+请求合并测试
+"""
+import asyncio
+
+import pytest
+
+from app.core.coalescing import Coalescer
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_coalesced():
+    """测试并发加载同一键只触发一次查询"""
+    coalescer = Coalescer()
+    calls = []
+
+    async def fetch(keys):
+        calls.append(sorted(keys))
+        await asyncio.sleep(0.01)
+        return {key: f"value-{key}" for key in keys if key != 3}
+
+    results = await asyncio.gather(
+        coalescer.load_many([1, 2], fetch),
+        coalescer.load_many([2, 3], fetch),
+        coalescer.load_many([1, 2, 3], fetch),
+    )
+
+    assert results[0] == {1: "value-1", 2: "value-2"}
+    assert results[1] == {2: "value-2", 3: None}
+    assert results[2] == {1: "value-1", 2: "value-2", 3: None}
+    # 每个键只被实际加载一次
+    assert sorted(key for call in calls for key in call) == [1, 2, 3]
+    assert coalescer.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fetch_error_propagates_to_waiters():
+    """测试加载失败时等待方收到同一个异常"""
+    coalescer = Coalescer()
+
+    async def fetch(keys):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+
+    results = await asyncio.gather(
+        coalescer.load_many([1], fetch),
+        coalescer.load_many([1], fetch),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coalescer.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_owner_cancellation_not_propagated():
+    """测试负责加载的请求被取消时，等待方自行重新加载而不是收到取消"""
+    coalescer = Coalescer()
+    calls = []
+
+    async def fetch(keys):
+        calls.append(sorted(keys))
+        await asyncio.sleep(0.02)
+        return {key: f"value-{key}" for key in keys}
+
+    owner = asyncio.create_task(coalescer.load_many([1, 2], fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(coalescer.load_many([2, 3], fetch))
+    await asyncio.sleep(0.005)
+    owner.cancel()
+
+    assert await waiter == {2: "value-2", 3: "value-3"}
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+    assert [1, 2] in calls and [2] in calls
+    assert coalescer.stats()["inflight"] == 0
@@ -0,0 +1,188 @@
+"""
+用户变更事件测试
+测试事件写入发件箱并批量投递到 Redis Stream、Redis 不可用时由发件箱补发、缓冲区满时的退化，以及消费组读取
+"""
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+
+from app.core import events as events_module
+from app.core.config import settings
+from app.core.database import engine
+from app.core.events import EventConsumer, user_events
+from app.models.event import UserEventOutbox
+
+
+async def _wait_for(condition, timeout: float = 1.0):
+    """等待后台发送任务处理完缓冲区"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "等待超时"
+        await asyncio.sleep(0.005)
+
+
+async def _outbox_count(user_id: int) -> int:
+    async with engine.connect() as conn:
+        return await conn.scalar(
+            select(func.count()).select_from(UserEventOutbox).where(UserEventOutbox.user_id == user_id)
+        )
+
+
+def _stream(fake_redis) -> list:
+    return fake_redis.streams.get(settings.USER_EVENTS_STREAM, [])
+
+
+@pytest.fixture
+async def publisher(fake_redis):
+    """绑定内存 Redis 并启动事件发送任务"""
+    user_events.bind(fake_redis)
+    user_events.start()
+    yield user_events
+    await user_events.stop()
+    user_events.bind(None)
+
+
+@pytest.mark.asyncio
+async def test_user_changes_published(async_client: AsyncClient, fake_redis, publisher, create_user):
+    """测试创建、更新、禁用用户的事件依次写入 Stream，投递后删除发件箱记录"""
+    user = await create_user("eventuser")
+    await async_client.put(f"/api/users/{user['id']}", json={"full_name": "事件用户"})
+    await async_client.post(f"/api/users/{user['id']}/deactivate")
+
+    await _wait_for(lambda: len([
+        fields for _, fields in _stream(fake_redis) if fields["user_id"] == str(user["id"])
+    ]) == 3)
+    events = [fields for _, fields in _stream(fake_redis) if fields["user_id"] == str(user["id"])]
+    assert [e["type"] for e in events] == ["user.created", "user.updated", "user.deactivated"]
+    assert json.loads(events[0]["data"])["username"] == "eventuser"
+    assert json.loads(events[1]["data"])["full_name"] == "事件用户"
+    assert json.loads(events[2]["data"])["is_active"] is False
+
+    await _wait_for(lambda: publisher.stats()["buffered"] == 0)
+    await asyncio.sleep(0.05)
+    assert await _outbox_count(user["id"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_when_redis_down(
+    async_client: AsyncClient, fake_redis, publisher, monkeypatch, create_user
+):
+    """测试 Redis 不可用时请求照常完成，事件留在发件箱并在恢复后补发"""
+    fake_redis.fail = True
+    user = await create_user("outboxuser")
+
+    await _wait_for(lambda: publisher.failed >= 1)
+    assert await _outbox_count(user["id"]) == 1
+    assert not _stream(fake_redis)
+
+    fake_redis.fail = False
+    monkeypatch.setattr(settings, "USER_EVENTS_OUTBOX_RETRY_AFTER", 0)
+
+    # 补发发送到 Redis 时不持有数据库连接
+    checked_out = []
+    xadd = publisher._xadd
+
+    async def tracking_xadd(entries):
+        checked_out.append(engine.pool.checkedout())
+        await xadd(entries)
+
+    monkeypatch.setattr(publisher, "_xadd", tracking_xadd)
+    while await publisher.relay():
+        pass
+    assert checked_out and not any(checked_out)
+
+    assert await _outbox_count(user["id"]) == 0
+    assert [
+        fields["type"] for _, fields in _stream(fake_redis) if fields["user_id"] == str(user["id"])
+    ] == ["user.created"]
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_defers_to_outbox(fake_redis, monkeypatch):
+    """测试缓冲区已满时 emit 不阻塞，超出的事件计为延后发送"""
+    monkeypatch.setattr(settings, "USER_EVENTS_BUFFER_SIZE", 1)
+    user_events.bind(fake_redis)
+    user_events.start()
+    try:
+        now = datetime.now(timezone.utc)
+        records = [
+            UserEventOutbox(id=-i, event_type="user.updated", user_id=-i, data="{}", created_at=now)
+            for i in range(1, 4)
+        ]
+        deferred = user_events.deferred
+        user_events.emit(records)
+        assert user_events.deferred == deferred + 2
+    finally:
+        await user_events.stop()
+        user_events.bind(None)
+
+
+@pytest.mark.asyncio
+async def test_consumer_group(fake_redis):
+    """测试消费组读取、确认，以及接管其他消费者未确认的事件"""
+    now = datetime.now(timezone.utc)
+    user_events.bind(fake_redis)
+    try:
+        await user_events._xadd([
+            {"event_id": str(i), "type": "user.created", "user_id": str(i),
+             "data": json.dumps({"id": i}), "occurred_at": now.isoformat()}
+            for i in range(1, 4)
+        ])
+    finally:
+        user_events.bind(None)
+
+    first = EventConsumer(fake_redis, group="test-group", consumer="a", count=2)
+    await first.ensure_group()
+    await first.ensure_group()  # 已存在时忽略
+
+    events = await first.read()
+    assert [e.event_id for e in events] == [1, 2]
+    assert events[0].data == {"id": 1}
+    assert await first.ack(events[:1]) == 1
+
+    # 消费者 a 未确认事件 2，由消费者 b 接管
+    second = EventConsumer(fake_redis, group="test-group", consumer="b", claim_idle=0)
+    claimed = await second.read()
+    assert [e.event_id for e in claimed] == [2]
+    await second.ack(claimed)
+
+    events = await second.read()
+    assert [e.event_id for e in events] == [3]
+
+
+@pytest.mark.asyncio
+async def test_consumer_survives_redis_errors(fake_redis, monkeypatch):
+    """测试默认阻塞时间小于共享客户端的读写超时，Redis 故障时消费循环重试而不退出"""
+    monkeypatch.setattr(events_module, "_CONSUMER_RETRY_DELAY", 0.001)
+    consumer = EventConsumer(fake_redis, group="retry-group", consumer="a")
+    assert consumer.block_ms < settings.REDIS_SOCKET_TIMEOUT * 1000
+
+    await consumer.ensure_group()
+    fake_redis.fail = True
+    handled = []
+
+    async def handler(events):
+        handled.extend(events)
+
+    task = asyncio.create_task(consumer.run(handler))
+    await asyncio.sleep(0.02)
+    assert not task.done()
+
+    fake_redis.fail = False
+    user_events.bind(fake_redis)
+    try:
+        await user_events._xadd([{
+            "event_id": "1", "type": "user.created", "user_id": "1",
+            "data": json.dumps({"id": 1}), "occurred_at": datetime.now(timezone.utc).isoformat(),
+        }])
+    finally:
+        user_events.bind(None)
+    await _wait_for(lambda: handled)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert [e.event_id for e in handled] == [1]
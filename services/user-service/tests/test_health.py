@@ -1,11 +1,18 @@
 """
 健康检查端点测试
-测试 /health 相关接口
+测试 /health 相关接口，以及后台探测快照、Redis 状态和过旧标记
 """
+import asyncio
+import time
+
 import pytest
 from httpx import AsyncClient
 from fastapi import status
 
+from app.core.config import settings
+from app.core.health import HealthProber, health_prober
+from app.core.pool_metrics import pool_metrics
+
 
 @pytest.mark.asyncio
 async def test_health_check(async_client: AsyncClient):
@@ -68,3 +75,95 @@ async def test_detailed_health_check(async_client: AsyncClient):
     # 检查 system 部分
     assert "platform" in data["system"]
     assert "python_version" in data["system"]
+
+
+@pytest.fixture
+async def prober_redis(fake_redis):
+    """健康探测绑定内存 Redis，测试后恢复并清除快照"""
+    health_prober.bind(fake_redis)
+    await health_prober.probe()
+    yield fake_redis
+    health_prober.bind(None)
+    await health_prober.probe()
+
+
+@pytest.mark.asyncio
+async def test_health_reports_redis_status(async_client: AsyncClient, prober_redis):
+    """测试 /health 返回实际的 Redis 状态"""
+    response = await async_client.get("/health")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["redis"] == "ok"
+
+    # Redis 故障不影响整体健康状态，但如实报告
+    prober_redis.fail = True
+    await health_prober.probe()
+    response = await async_client.get("/health")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["redis"].startswith("error: ")
+
+
+@pytest.mark.asyncio
+async def test_health_serves_snapshot_without_pool(async_client: AsyncClient):
+    """测试后台探测运行时，健康检查端点不占用数据库连接"""
+    await health_prober.probe()
+    health_prober.start()
+    try:
+        checkouts = {name: metrics.checkouts for name, metrics in pool_metrics.items()}
+        probes = health_prober.probes
+
+        for path in ["/health", "/health/ready", "/health/details"] * 5:
+            response = await async_client.get(path)
+            assert response.status_code == status.HTTP_200_OK
+
+        assert {name: metrics.checkouts for name, metrics in pool_metrics.items()} == checkouts
+        assert health_prober.probes == probes
+        assert response.json()["health_probe"]["stale"] is False
+    finally:
+        await health_prober.stop()
+
+
+@pytest.mark.asyncio
+async def test_health_stale_snapshot(async_client: AsyncClient, monkeypatch):
+    """测试后台探测停滞时报告过旧并返回 503"""
+    await health_prober.probe()
+    health_prober.start()
+    try:
+        monkeypatch.setattr(settings, "HEALTH_CHECK_STALE_AFTER", 0)
+        response = await async_client.get("/health")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        detail = response.json()["detail"]
+        assert detail["stale"] is True
+        assert detail["database"] == "ok"
+
+        response = await async_client.get("/health/ready")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    finally:
+        await health_prober.stop()
+
+
+class _HangingEngine:
+    """取连接时挂起的引擎，模拟连接池耗尽"""
+
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        await asyncio.sleep(60)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_database_probe_times_out_on_connect(monkeypatch):
+    """测试取连接挂起时数据库探测按超时失败，不会卡住探测任务"""
+    monkeypatch.setattr(settings, "HEALTH_CHECK_TIMEOUT", 0.05)
+    prober = HealthProber(_HangingEngine())
+
+    start = time.perf_counter()
+    result = await prober._check_database()
+
+    assert result["status"] == "error"
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,157 @@
+"""
+服务间 HTTP 客户端测试
+使用本地 aiohttp 测试服务器，测试连接复用、带退避的重试、非幂等请求不重试、超时以及熔断
+"""
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import status
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.http_client import HttpClients, UpstreamError, UpstreamUnavailable
+
+
+class _Upstream:
+    """记录请求次数与客户端连接的测试上游服务"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0  # 前 N 次请求返回 503
+        self.delay = 0.0
+        self.connections = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            return web.json_response({"detail": "unavailable"}, status=503)
+        return web.json_response({"path": request.path, "calls": self.calls})
+
+
+@pytest.fixture
+async def upstream(monkeypatch):
+    """启动测试上游服务，并创建指向它的客户端（重试退避缩短以加快测试）"""
+    monkeypatch.setattr(settings, "HTTP_CLIENT_RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(settings, "HTTP_CLIENT_TOTAL_TIMEOUT", 0.5)
+    monkeypatch.setattr(settings, "HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD", 3)
+
+    handler = _Upstream()
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler.handle)
+    server = TestServer(app)
+    await server.start_server()
+
+    clients = HttpClients()
+    clients.start({"order": str(server.make_url("/"))})
+    handler.client = clients.get("order")
+    yield handler
+    await clients.close()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_reused(upstream):
+    """测试多次调用复用同一个保活连接"""
+    for _ in range(5):
+        response = await upstream.client.request("GET", "/api/orders")
+        assert response.status == 200
+        assert response.json()["path"] == "/api/orders"
+
+    assert upstream.calls == 5
+    assert len(upstream.connections) == 1
+    stats = upstream.client.stats()
+    assert stats["pool"]["idle"] == 1
+    assert stats["pool"]["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_unavailable_status(upstream):
+    """测试幂等请求在 503 时重试，成功后返回"""
+    upstream.failures = 2
+    retries_before = REGISTRY.get_sample_value("upstream_retries_total", {"upstream": "order"}) or 0
+
+    response = await upstream.client.request("GET", "/api/orders/1")
+
+    assert response.status == 200
+    assert upstream.calls == 3
+    assert upstream.client.retries == 2
+    assert REGISTRY.get_sample_value("upstream_retries_total", {"upstream": "order"}) == retries_before + 2
+    assert upstream.client.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_post_not_retried(upstream):
+    """测试非幂等请求默认不重试，直接返回 503 响应"""
+    upstream.failures = 1
+
+    response = await upstream.client.request("POST", "/api/orders", json={"user_id": 1})
+
+    assert response.status == 503
+    assert not response.ok
+    assert upstream.calls == 1
+
+    # 显式允许重试（如带幂等键）时重试
+    upstream.calls = 0
+    response = await upstream.client.request("POST", "/api/orders", json={"user_id": 1}, retry=True)
+    assert response.status == 200
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout_raises_upstream_error(upstream):
+    """测试超时后按次数重试，最终抛出 UpstreamError"""
+    upstream.delay = 1.0
+
+    start = time.perf_counter()
+    with pytest.raises(UpstreamError):
+        await upstream.client.request("GET", "/slow", retries=1)
+
+    assert upstream.calls == 2
+    assert time.perf_counter() - start < 2.0
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_on_unreachable_upstream(monkeypatch):
+    """测试上游不可达时熔断，熔断期间直接失败"""
+    monkeypatch.setattr(settings, "HTTP_CLIENT_BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "HTTP_CLIENT_RETRIES", 0)
+    clients = HttpClients()
+    clients.start({"product": "http://127.0.0.1:1"})
+    client = clients.get("product")
+
+    try:
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await client.request("GET", "/api/products")
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(UpstreamUnavailable):
+            await client.request("GET", "/api/products")
+        assert client.stats()["errors"] == 3
+        assert REGISTRY.get_sample_value(
+            "upstream_requests_total", {"upstream": "product", "method": "GET", "status": "circuit_open"}
+        ) >= 1
+    finally:
+        await clients.close()
+
+
+def test_unknown_upstream():
+    """测试获取未配置的上游服务"""
+    with pytest.raises(KeyError):
+        HttpClients().get("missing")
+
+
+@pytest.mark.asyncio
+async def test_health_details_include_upstreams(async_client: AsyncClient):
+    """测试详细健康检查包含上游服务连接池状态"""
+    response = await async_client.get("/health/details")
+    assert response.status_code == status.HTTP_200_OK
+    assert "upstreams" in response.json()
@@ -0,0 +1,127 @@
+"""
+Prometheus 指标测试
+测试 /metrics 端点、按路由模板统计的请求指标、SQL / Redis / bcrypt 耗时，以及多进程汇总
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.metrics import InstrumentedRedis
+from app.core.security import hash_password, verify_password
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_request_metrics_use_route_template(async_client: AsyncClient):
+    """测试请求指标按路由模板和状态码类别统计"""
+    labels = {"method": "GET", "route": "/api/users/{user_id}"}
+    before = _sample("http_requests_total", status="4xx", **labels)
+    observed_before = _sample("http_request_duration_seconds_count", **labels)
+
+    response = await async_client.get("/api/users/999999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    assert _sample("http_requests_total", status="4xx", **labels) == before + 1
+    assert _sample("http_request_duration_seconds_count", **labels) == observed_before + 1
+    assert _sample("http_requests_in_progress", method="GET") == 0
+
+
+@pytest.mark.asyncio
+async def test_unmatched_route_label(async_client: AsyncClient):
+    """测试未匹配路由和非标准方法不使用原始值作为标签"""
+    await async_client.get("/no/such/path/12345")
+    assert _sample("http_requests_total", method="GET", route="<unmatched>", status="4xx") >= 1
+    assert REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "route": "/no/such/path/12345", "status": "4xx"}
+    ) is None
+
+    await async_client.request("FOOBAR", "/no/such/path")
+    assert _sample("http_requests_total", method="OTHER", route="<unmatched>", status="4xx") >= 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client: AsyncClient):
+    """测试 /metrics 返回 Prometheus 文本格式，包含请求与 SQL 指标"""
+    await async_client.get("/api/users/", params={"limit": 1})
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/users/",status="2xx"}' in body
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in body
+
+
+def test_password_hash_duration():
+    """测试 bcrypt 哈希和校验耗时"""
+    hash_before = _sample("password_hash_duration_seconds_count", operation="hash")
+    verify_before = _sample("password_hash_duration_seconds_count", operation="verify")
+
+    hashed = hash_password("metrics-password")
+    assert verify_password("metrics-password", hashed)
+
+    assert _sample("password_hash_duration_seconds_count", operation="hash") == hash_before + 1
+    assert _sample("password_hash_duration_seconds_count", operation="verify") == verify_before + 1
+
+
+@pytest.mark.asyncio
+async def test_redis_command_duration():
+    """测试 Redis 命令耗时（连接失败的命令同样计入）"""
+    client = InstrumentedRedis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.1)
+    get_before = _sample("redis_command_duration_seconds_count", command="GET")
+    pipeline_before = _sample("redis_command_duration_seconds_count", command="PIPELINE")
+
+    try:
+        with pytest.raises(RedisConnectionError):
+            await client.get("metrics:key")
+        with pytest.raises(RedisConnectionError):
+            async with client.pipeline() as pipe:
+                await pipe.get("metrics:key").execute()
+    finally:
+        await client.close()
+
+    assert _sample("redis_command_duration_seconds_count", command="GET") == get_before + 1
+    assert _sample("redis_command_duration_seconds_count", command="PIPELINE") == pipeline_before + 1
+
+
+_WORKER_SCRIPT = """
+from app.core.metrics import REQUESTS, REQUESTS_IN_PROGRESS
+REQUESTS.labels("GET", "/api/users/", "2xx").inc()
+REQUESTS_IN_PROGRESS.labels("GET").inc()
+"""
+
+_RENDER_SCRIPT = """
+from app.core.metrics import render_metrics
+print(render_metrics().decode())
+"""
+
+
+def test_multiprocess_aggregation(tmp_path):
+    """测试多进程模式下汇总多个 worker 的指标"""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "prometheus")}
+
+    def run(script: str) -> str:
+        completed = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=SERVICE_DIR, env=env, capture_output=True, text=True, timeout=60,
+        )
+        assert completed.returncode == 0, completed.stderr[-2000:]
+        return completed.stdout
+
+    # 两个"worker"各记录一次请求
+    run(_WORKER_SCRIPT)
+    run(_WORKER_SCRIPT)
+
+    body = run(_RENDER_SCRIPT)
+    assert 'http_requests_total{method="GET",route="/api/users/",status="2xx"} 2.0' in body
@@ -0,0 +1,182 @@
+"""
+数据库迁移测试
+测试空库建表、迁移结果与模型一致、旧库补迁移、结构已是最新时启动不执行 DDL，以及启动耗时基准
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from app.core.config import settings
+from app.core.database import Base, create_sqlite_engine
+from app.core.migrations import (
+    SCHEMA_VERSION, SchemaOutdated, check_schema, current_version, migrate,
+)
+
+# 启动耗时预算（毫秒），留有余量以适应 CI 机器；用于发现导入或启动流程的明显退化
+IMPORT_BUDGET_MS = 5000
+FIRST_REQUEST_BUDGET_MS = 1000
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+async def temp_engine(tmp_path):
+    """独立的临时 SQLite 数据库"""
+    engine = create_sqlite_engine(f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}")
+    engine.echo = False
+    yield engine
+    await engine.dispose()
+
+
+def _record_ddl(engine) -> list:
+    """记录引擎上执行的 DDL 语句"""
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("CREATE", "ALTER", "DROP")):
+            statements.append(statement)
+
+    return statements
+
+
+async def _table_names(engine) -> set:
+    async with engine.connect() as conn:
+        return set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+
+
+@pytest.mark.asyncio
+async def test_migrate_empty_database(temp_engine):
+    """测试空库按顺序执行所有迁移并记录版本"""
+    assert await current_version(temp_engine) is None
+
+    applied = await migrate(temp_engine)
+    assert [m.version for m in applied] == list(range(1, SCHEMA_VERSION + 1))
+    assert await current_version(temp_engine) == SCHEMA_VERSION
+    assert {"users", "schema_version", "user_event_outbox"} <= await _table_names(temp_engine)
+
+    # 再次执行没有待执行的迁移
+    assert await migrate(temp_engine) == []
+
+
+def _schema(sync_conn) -> dict:
+    """表、列与索引结构（用于比较迁移结果与当前模型）"""
+    inspector = inspect(sync_conn)
+    return {
+        table: {
+            "columns": {
+                column["name"]: (str(column["type"]), column["nullable"])
+                for column in inspector.get_columns(table)
+            },
+            "indexes": {
+                index["name"]: (tuple(index["column_names"]), bool(index["unique"]))
+                for index in inspector.get_indexes(table)
+            },
+        }
+        for table in inspector.get_table_names()
+        if table != "schema_version"
+    }
+
+
+@pytest.mark.asyncio
+async def test_migrations_match_models(temp_engine, tmp_path):
+    """测试迁移建立的结构与当前模型 create_all 的结果一致，模型变更须追加迁移"""
+    await migrate(temp_engine)
+    model_engine = create_sqlite_engine(f"sqlite+aiosqlite:///{tmp_path / 'models.db'}")
+    try:
+        async with model_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with model_engine.connect() as conn:
+            expected = await conn.run_sync(_schema)
+    finally:
+        await model_engine.dispose()
+
+    async with temp_engine.connect() as conn:
+        assert await conn.run_sync(_schema) == expected
+
+
+@pytest.mark.asyncio
+async def test_concurrent_migrate_sqlite(tmp_path):
+    """测试多个 worker 同时对同一个 SQLite 文件执行迁移时依次执行，不会启动失败"""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'concurrent.db'}"
+    engines = [create_sqlite_engine(url) for _ in range(4)]
+    try:
+        results = await asyncio.gather(*(migrate(engine) for engine in engines))
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+    assert sorted(len(applied) for applied in results) == [0, 0, 0, SCHEMA_VERSION]
+
+
+@pytest.mark.asyncio
+async def test_migrate_legacy_database(temp_engine):
+    """测试引入版本表之前的旧库：表已存在但缺少索引"""
+    async with temp_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("DROP INDEX ix_users_created_at_id"))
+        await conn.execute(text(
+            "INSERT INTO users (username, email, hashed_password) VALUES ('legacy', 'legacy@example.com', 'x')"
+        ))
+
+    await migrate(temp_engine)
+
+    async with temp_engine.connect() as conn:
+        indexes = await conn.run_sync(
+            lambda sync_conn: {index["name"] for index in inspect(sync_conn).get_indexes("users")}
+        )
+        count = (await conn.execute(text("SELECT COUNT(*) FROM users"))).scalar()
+    assert "ix_users_created_at_id" in indexes
+    assert count == 1
+    assert await current_version(temp_engine) == SCHEMA_VERSION
+
+
+@pytest.mark.asyncio
+async def test_check_schema_current_runs_no_ddl(temp_engine):
+    """测试结构已是最新时启动检查不执行 DDL"""
+    await migrate(temp_engine)
+    ddl = _record_ddl(temp_engine)
+
+    assert await check_schema(temp_engine) == SCHEMA_VERSION
+    assert ddl == []
+
+
+@pytest.mark.asyncio
+async def test_check_schema_outdated(temp_engine, monkeypatch):
+    """测试关闭自动迁移时结构落后拒绝启动，开启时自动迁移"""
+    monkeypatch.setattr(settings, "DATABASE_AUTO_MIGRATE", False)
+    with pytest.raises(SchemaOutdated):
+        await check_schema(temp_engine)
+    assert await current_version(temp_engine) is None
+
+    monkeypatch.setattr(settings, "DATABASE_AUTO_MIGRATE", True)
+    assert await check_schema(temp_engine) == SCHEMA_VERSION
+    assert await current_version(temp_engine) == SCHEMA_VERSION
+
+
+def test_startup_benchmark(tmp_path):
+    """测试冷启动耗时：在独立进程中导入应用并返回第一个请求"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}",
+        "REDIS_URL": "redis://127.0.0.1:1/0",  # 不可用的 Redis，启动时立即回退
+    }
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--json"],
+        cwd=SERVICE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    print(f"启动耗时: {result}")
+    assert result["import_ms"] < IMPORT_BUDGET_MS
+    assert result["first_request_ms"] < FIRST_REQUEST_BUDGET_MS
@@ -0,0 +1,79 @@
+"""
+连接池监控测试
+测试连接池参数按后端配置，以及事件统计的占用、峰值、等待和超时
+"""
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.database import pool_options
+from app.core.pool_metrics import InstrumentedQueuePool, PoolMetrics
+
+
+def test_pool_options_per_backend(monkeypatch):
+    """测试 PostgreSQL 与 MySQL 分别读取各自的连接池配置"""
+    monkeypatch.setattr(settings, "POSTGRES_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "MYSQL_POOL_SIZE", 3)
+    monkeypatch.setattr(settings, "MYSQL_POOL_USE_LIFO", False)
+
+    postgres = pool_options("postgresql")
+    mysql = pool_options("mysql")
+
+    assert postgres["poolclass"] is InstrumentedQueuePool
+    assert postgres["pool_size"] == 7
+    assert postgres["pool_recycle"] == settings.POSTGRES_POOL_RECYCLE
+    assert mysql["pool_size"] == 3
+    assert mysql["pool_use_lifo"] is False
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_track_usage_and_timeouts():
+    """测试占用数、峰值、溢出和获取超时"""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///./test.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    metrics = PoolMetrics("test")
+    metrics.attach(engine)
+
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            stats = metrics.stats()
+            assert stats["in_use"] == 2
+            assert stats["overflow_in_use"] == 1
+
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = metrics.stats()
+        assert stats["in_use"] == 0
+        assert stats["peak_in_use"] == 2
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 50
+
+        # 重建连接池后统计继续生效
+        await engine.dispose()
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        assert metrics.stats()["checkouts"] == 3
+        assert engine.pool.metrics is metrics
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_health_details_reports_pool(async_client: AsyncClient):
+    """测试详细健康检查包含连接池统计"""
+    response = await async_client.get("/health/details")
+    assert response.status_code == status.HTTP_200_OK
+    assert "primary" in response.json()["database_pool"]
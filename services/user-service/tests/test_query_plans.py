@@ -0,0 +1,71 @@
+"""
+查询计划测试
+用户列表支持的每种筛选都必须命中索引，而不是全表扫描
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.dialects import sqlite
+
+from app.core.database import Base
+from app.models.user import User
+from app.routers.users import UserSort, _build_list_query
+
+START = datetime(2024, 1, 1)
+WEEK_START = START + timedelta(days=60)
+WEEK_END = WEEK_START + timedelta(days=7)
+
+
+@pytest.fixture(scope="module")
+def plan_connection():
+    """内存数据库：约 10% 未激活、1% 超级用户，ANALYZE 后统计信息与真实分布接近"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {
+                "username": f"plan_user{i}",
+                "email": f"plan_user{i}@example.com",
+                "hashed_password": "x",
+                "is_active": i % 10 != 0,
+                "is_superuser": i % 100 == 0,
+                "created_at": START + timedelta(hours=i),
+            }
+            for i in range(2000)
+        ])
+        connection.exec_driver_sql("ANALYZE")
+
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+def _query_plan(connection, **filters) -> list:
+    query = _build_list_query(**filters).limit(51)
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"is_active": False, "sort": UserSort.created_at_desc}, "ix_users_is_active_created_at_id"),
+    ({"is_active": True, "sort": UserSort.created_at_desc}, "ix_users_is_active_created_at_id"),
+    ({"is_active": True, "created_after": WEEK_START, "created_before": WEEK_END,
+      "sort": UserSort.created_at_desc}, "ix_users_is_active_created_at_id"),
+    ({"is_superuser": True}, "ix_users_superuser_created_at_id"),
+    ({"is_superuser": True, "sort": UserSort.created_at_desc}, "ix_users_superuser_created_at_id"),
+    ({"created_after": WEEK_START, "sort": UserSort.created_at_desc}, "ix_users_created_at_id"),
+    ({"created_after": WEEK_START, "created_before": WEEK_END}, "ix_users_created_at_id"),
+    ({"created_before": WEEK_END, "sort": UserSort.created_at}, "ix_users_created_at_id"),
+    ({"sort": UserSort.created_at_desc}, "ix_users_created_at_id"),
+    ({"sort": UserSort.username}, "ix_users_username"),
+    ({"sort": UserSort.username_desc, "after": ("plan_user5", 5)}, "ix_users_username"),
+])
+def test_list_filters_use_index(plan_connection, filters, index):
+    """测试筛选与排序命中对应索引"""
+    plan = _query_plan(plan_connection, **filters)
+
+    assert any(f"USING INDEX {index}" in step or f"USING COVERING INDEX {index}" in step
+               for step in plan), plan
+    assert "SCAN users" not in plan, plan
@@ -0,0 +1,63 @@
+"""
+SQL 查询统计测试
+测试每请求语句计数、Server-Timing 响应头、慢查询日志和 N+1 检测
+"""
+import logging
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.query_stats import query_stats
+from app.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_server_timing_reports_request_queries(async_client: AsyncClient):
+    """测试响应头返回本请求的语句数量和数据库耗时"""
+    response = await async_client.get("/api/users/", params={"limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="1 queries"' in timing
+
+
+@pytest.mark.asyncio
+async def test_slow_query_logged_with_route(async_client: AsyncClient, monkeypatch, caplog):
+    """测试慢查询日志包含路由"""
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0)
+    slow_before = query_stats.slow_queries
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        await async_client.get("/api/users/", params={"limit": 1})
+
+    assert query_stats.slow_queries > slow_before
+    assert any("慢查询" in r.message and "GET /api/users/" in r.message for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_nplus1_detected(monkeypatch, caplog):
+    """测试同一请求内重复执行同一语句时提示 N+1"""
+    monkeypatch.setattr(settings, "SQL_NPLUS1_THRESHOLD", 3)
+    flagged_before = query_stats.nplus1_requests
+
+    stats = query_stats.begin("GET /test/nplus1")
+    async with AsyncSessionLocal() as session:
+        for user_id in range(3):
+            await session.execute(select(User.username).where(User.id == user_id))
+        await session.execute(select(User.id).limit(1))
+
+    assert stats.count == 4
+    assert stats.duration > 0
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        query_stats.finish(stats)
+
+    assert query_stats.nplus1_requests == flagged_before + 1
+    messages = [r.message for r in caplog.records if "N+1" in r.message]
+    assert len(messages) == 1
+    assert "执行 3 次" in messages[0]
@@ -0,0 +1,135 @@
+"""
+限流测试
+测试令牌桶判定、RateLimit-* 响应头、按路由限额和本地前置过滤
+"""
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+
+from app.core import ratelimit
+from app.core.config import settings
+from app.core.ratelimit import RateLimiter, TOKEN_BUCKET_SCRIPT
+from app.core.security import create_access_token
+
+
+class ScriptRedis:
+    """
+    支持 register_script 的 Redis 替身
+    用 Python 模拟 Lua 令牌桶（不补充令牌），记录脚本调用次数
+    """
+
+    def __init__(self):
+        self.tokens = {}
+        self.calls = 0
+        self.fail = False
+
+    def register_script(self, script):
+        assert script == TOKEN_BUCKET_SCRIPT
+
+        async def run(keys, args):
+            self.calls += 1
+            if self.fail:
+                raise ConnectionError("redis unavailable")
+            capacity, _, cost = args
+            tokens = self.tokens.get(keys[0], capacity)
+            if tokens >= cost:
+                self.tokens[keys[0]] = tokens - cost
+                return [1, str(tokens - cost)]
+            return [0, str(tokens)]
+
+        return run
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """开启限流并使用独立的限流器"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 3)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ROUTES", {"POST /api/users/login": 2})
+    fresh = RateLimiter()
+    monkeypatch.setattr(ratelimit, "rate_limiter", fresh)
+    return fresh
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_headers_and_rejection(async_client: AsyncClient, limiter):
+    """测试剩余配额递减，耗尽后返回 429"""
+    remaining = []
+    for _ in range(3):
+        response = await async_client.get("/api/users/", params={"limit": 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ratelimit-limit"] == "3"
+        assert response.headers["ratelimit-policy"] == "3;w=60"
+        remaining.append(int(response.headers["ratelimit-remaining"]))
+    assert remaining == [2, 1, 0]
+
+    response = await async_client.get("/api/users/", params={"limit": 1})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.headers["ratelimit-remaining"] == "0"
+
+    # 健康检查不受限流影响
+    response = await async_client.get("/health/live")
+    assert response.status_code == status.HTTP_200_OK
+    assert "ratelimit-limit" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_per_route_and_user(async_client: AsyncClient, limiter):
+    """测试按路由覆盖限额，已认证请求按用户单独计数"""
+    login = {"username": "nobody_here", "password": "pass123456"}
+    for _ in range(2):
+        response = await async_client.post("/api/users/login", json=login)
+        assert response.headers["ratelimit-limit"] == "2"
+    response = await async_client.post("/api/users/login", json=login)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    # 登录限额耗尽不影响其他路由
+    for _ in range(3):
+        response = await async_client.get("/api/users/", params={"limit": 1})
+        assert response.status_code == status.HTTP_200_OK
+    response = await async_client.get("/api/users/", params={"limit": 1})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    # 同一 IP 上的已认证用户有独立配额
+    token = create_access_token(SimpleNamespace(id=9001, username="rl_user", is_superuser=False))
+    response = await async_client.get(
+        "/api/users/", params={"limit": 1}, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ratelimit-remaining"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_prefilters_before_redis():
+    """测试 Redis 拒绝后的请求由本地直接拒绝，不再执行脚本"""
+    redis = ScriptRedis()
+    limiter = RateLimiter()
+    limiter.bind(redis)
+    redis.tokens[limiter.key("client")] = 1  # 其他实例已消耗大部分配额
+
+    assert (await limiter.hit("client", 5)).allowed
+    assert not (await limiter.hit("client", 5)).allowed
+    assert redis.calls == 2
+
+    for _ in range(10):
+        assert not (await limiter.hit("client", 5)).allowed
+    assert redis.calls == 2
+    assert limiter.stats()["prefiltered"] == 10
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_falls_back_to_local_bucket():
+    """测试 Redis 不可用时按进程内令牌桶限流"""
+    redis = ScriptRedis()
+    redis.fail = True
+    limiter = RateLimiter()
+    limiter.bind(redis)
+
+    results = [(await limiter.hit("client", 2)).allowed for _ in range(3)]
+    assert results == [True, True, False]
+    assert limiter.stats()["errors"] == 2
+    # 本地桶耗尽后不再尝试 Redis
+    assert redis.calls == 2
@@ -0,0 +1,114 @@
+"""
+Redis 客户端测试
+测试熔断器状态转换、熔断期间快速失败，以及 Redis 管理器的重连检测与状态输出
+"""
+import time
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from redis.asyncio import ConnectionPool
+from redis.exceptions import RedisError
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.redis_client import RedisCircuitOpen, RedisManager, ResilientRedis
+
+UNREACHABLE_URL = "redis://127.0.0.1:1/0"
+
+
+def test_circuit_breaker_transitions():
+    """测试连续失败后熔断，冷却后半开只放行一次试探，成功后恢复"""
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05)
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 试探调用尚未返回，其他调用继续被拒绝
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.stats()["opens"] == 1
+
+
+def test_circuit_breaker_failed_trial_reopens():
+    """测试半开状态下试探失败立即重新熔断"""
+    breaker = CircuitBreaker("test", failure_threshold=5, recovery_timeout=0.05)
+    breaker.trip()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    """测试熔断后命令不再连接 Redis，抛出的异常可被现有 RedisError 处理捕获"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+    pool = ConnectionPool.from_url(UNREACHABLE_URL, socket_connect_timeout=0.1)
+    client = ResilientRedis(connection_pool=pool, breaker=breaker)
+
+    try:
+        with pytest.raises(RedisError):
+            await client.get("resilient:key")
+        assert breaker.state == CircuitBreaker.OPEN
+
+        start = time.perf_counter()
+        with pytest.raises(RedisCircuitOpen) as excinfo:
+            await client.get("resilient:key")
+        with pytest.raises(RedisCircuitOpen):
+            async with client.pipeline() as pipe:
+                await pipe.get("resilient:key").execute()
+        assert time.perf_counter() - start < 0.05
+        assert isinstance(excinfo.value, RedisError)
+    finally:
+        await client.aclose()
+        await pool.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_manager_ping_trips_breaker(monkeypatch):
+    """测试 PING 失败进入熔断，恢复后关闭熔断并计入重连次数"""
+    monkeypatch.setattr("app.core.config.settings.REDIS_URL", UNREACHABLE_URL)
+    monkeypatch.setattr("app.core.config.settings.REDIS_SOCKET_CONNECT_TIMEOUT", 0.1)
+    manager = RedisManager()
+    manager.connect()
+
+    try:
+        assert not await manager.ping()
+        assert manager.breaker.is_open
+
+        async def probe():
+            return True
+
+        monkeypatch.setattr(manager.client, "probe", probe)
+        assert await manager.ping()
+        assert not manager.breaker.is_open
+        assert manager.reconnects == 1
+
+        stats = manager.stats()
+        assert stats["breaker"]["state"] == CircuitBreaker.CLOSED
+        assert stats["pool"]["max_connections"] > 0
+    finally:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_health_details_include_redis_client(async_client: AsyncClient):
+    """测试详细健康检查包含熔断器与连接池状态"""
+    response = await async_client.get("/health/details")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["redis_client"]
+    assert data["breaker"]["state"] in ("closed", "open", "half_open")
+    assert "pool" in data
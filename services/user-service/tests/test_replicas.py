@@ -0,0 +1,104 @@
+"""
+只读副本路由测试
+测试读请求分流到副本、写后固定主库、轮询与故障摘除
+副本使用指向同一个测试数据库文件的独立引擎
+"""
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import event, select, update
+
+from app.core import database
+from app.core.database import (
+    PRIMARY_PIN_COOKIE, AsyncSessionLocal, ReplicaSet, create_replica_engine
+)
+from app.models.user import User
+
+REPLICA_URL = "sqlite+aiosqlite:///./test.db"
+
+
+def _count_statements(replica) -> list:
+    """记录在副本上执行的语句"""
+    statements = []
+
+    @event.listens_for(replica.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    return statements
+
+
+@pytest.fixture
+async def replica(monkeypatch):
+    """配置单个只读副本"""
+    replica = create_replica_engine(REPLICA_URL)
+    monkeypatch.setattr(database, "replica_set", ReplicaSet([replica]))
+    yield replica
+    await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_client_writes(async_client: AsyncClient, replica):
+    """测试读请求走副本，写请求后客户端固定读主库"""
+    statements = _count_statements(replica)
+
+    response = await async_client.post("/api/users/", json={
+        "username": "replica_user",
+        "email": "replica_user@example.com",
+        "password": "pass123456"
+    })
+    assert response.status_code == status.HTTP_201_CREATED
+    assert PRIMARY_PIN_COOKIE in response.cookies
+    assert statements == []
+    user_id = response.json()["id"]
+
+    # 写后立即读：携带 Cookie，仍然读主库
+    response = await async_client.get(f"/api/users/{user_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert statements == []
+
+    # 不带 Cookie 的客户端从副本读取
+    async_client.cookies.clear()
+    response = await async_client.get(f"/api/users/{user_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(statements) == 1
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.asyncio
+async def test_session_stays_on_primary_after_write(replica):
+    """测试同一会话写过之后的读也走主库"""
+    statements = _count_statements(replica)
+
+    async with AsyncSessionLocal() as session:
+        session.info["replica"] = replica
+        await session.execute(select(User.id).limit(1))
+        assert len(statements) == 1
+
+        await session.execute(update(User).where(User.id == -1).values(full_name="x"))
+        await session.execute(select(User.id).limit(1))
+        assert len(statements) == 1
+        await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_replica_round_robin_and_ejection():
+    """测试轮询选择副本，故障副本被摘除后自动跳过"""
+    healthy = create_replica_engine(REPLICA_URL)
+    broken = create_replica_engine("sqlite+aiosqlite:////nonexistent/dir/replica.db")
+    replicas = ReplicaSet([healthy, broken])
+
+    chosen = {replicas.choose() for _ in range(4)}
+    assert chosen == {healthy, broken}
+
+    await replicas.check()
+    assert {replicas.choose() for _ in range(4)} == {healthy}
+    assert [item["status"] for item in replicas.stats()] == ["ok", "ejected"]
+
+    replicas.eject(healthy, "test")
+    assert replicas.choose() is None
+
+    # 下一轮检查恢复健康副本
+    await replicas.check()
+    assert replicas.choose() is healthy
+    await replicas.stop()
@@ -0,0 +1,99 @@
+"""
+安全模块测试
+测试密码哈希执行器
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.security import PasswordHasher, PasswordHasherBusy, verify_password
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_off_loop():
+    """测试异步哈希与校验结果正确"""
+    hasher = PasswordHasher()
+    try:
+        hashed = await hasher.hash("SecurePass123")
+        assert await hasher.verify("SecurePass123", hashed)
+        assert not await hasher.verify("WrongPass123", hashed)
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_many_keeps_order():
+    """测试批量哈希保持原始顺序"""
+    hasher = PasswordHasher()
+    passwords = [f"password{i}" for i in range(5)]
+    try:
+        hashed = await hasher.hash_many(passwords)
+    finally:
+        hasher.shutdown()
+
+    assert len(hashed) == len(passwords)
+    for password, hashed_password in zip(passwords, hashed):
+        assert verify_password(password, hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_hasher_rejects_when_saturated(monkeypatch):
+    """测试排队已满时快速失败"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 1)
+    hasher = PasswordHasher()
+    try:
+        first = asyncio.ensure_future(hasher.hash("SecurePass123"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("SecurePass123")
+
+        await first
+        assert hasher.rejected == 1
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_batch_counts_each_password(monkeypatch):
+    """测试批量哈希按密码个数占用独立的排队名额，不挤占单个哈希"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_BATCH_MAX_PENDING", 3)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 1)
+    hasher = PasswordHasher()
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash_many([f"password{i}" for i in range(4)])
+        assert hasher.batch_pending == 0
+
+        batch = asyncio.ensure_future(hasher.hash_many([f"password{i}" for i in range(3)]))
+        await asyncio.sleep(0)
+        assert hasher.batch_pending == 3
+
+        # 批量哈希进行中，单个哈希仍可执行
+        hashed = await hasher.hash("SecurePass123")
+        assert verify_password("SecurePass123", hashed)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash_many(["password"])
+
+        assert len(await batch) == 3
+        assert hasher.batch_pending == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_create_user_returns_503_when_saturated(async_client, monkeypatch):
+    """测试哈希队列已满时注册接口返回 503"""
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 0)
+
+    response = await async_client.post("/api/users/", json={
+        "username": "busy_user",
+        "email": "busy@example.com",
+        "password": "SecurePass123"
+    })
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,61 @@
+"""
+快速序列化测试
+快速编码器的输出必须与 response_model=UserResponse 逐字节一致
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import USER_FIELDS, UserRow, dump_page, dump_user, user_row
+from app.models.user import User
+from app.schemas.user import UserPage, UserResponse
+
+
+def _response_model_bytes(model) -> bytes:
+    """模拟 FastAPI response_model 的编码过程"""
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+USERS = [
+    User(
+        id=1,
+        username="plain_user",
+        email="plain@example.com",
+        full_name=None,
+        is_active=True,
+        is_superuser=False,
+        created_at=datetime(2024, 1, 1, 8, 30),
+        updated_at=None,
+    ),
+    User(
+        id=2,
+        username="tricky_user",
+        email="tricky@example.com",
+        full_name='张 "三" \\ \n\t\x01   😀',
+        is_active=False,
+        is_superuser=True,
+        created_at=datetime(2024, 1, 1, 0, 0, 0, 123456, tzinfo=timezone.utc),
+        updated_at=datetime(2024, 5, 1, 3, 4, 5, tzinfo=timezone(timedelta(hours=8))),
+    ),
+]
+
+
+@pytest.mark.parametrize("user", USERS, ids=["plain", "tricky"])
+def test_dump_user_matches_response_model(user):
+    """测试单个用户编码结果一致"""
+    expected = _response_model_bytes(UserResponse.model_validate(user))
+    assert dump_user(user_row(user)) == expected
+
+
+def test_dump_page_matches_response_model():
+    """测试分页编码结果一致"""
+    expected = _response_model_bytes(UserPage(items=USERS, next_cursor="abc"))
+    assert dump_page([user_row(user) for user in USERS], "abc") == expected
+
+
+def test_user_row_matches_response_model():
+    """测试 UserRow 与 UserResponse 的字段及顺序一致"""
+    assert USER_FIELDS == tuple(UserResponse.model_fields)
+    assert tuple(UserRow.__annotations__) == USER_FIELDS
@@ -0,0 +1,42 @@
+"""
+SQLite 性能参数测试
+测试 URL 路径保留、连接参数生效，以及单写多读连接池
+"""
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import create_sqlite_engine, engine, read_engine, sqlite_async_url
+
+
+def test_sqlite_url_keeps_configured_path():
+    """测试使用配置中的数据库路径，只替换驱动"""
+    assert sqlite_async_url("sqlite:///./data/users.db") == "sqlite+aiosqlite:///./data/users.db"
+    assert sqlite_async_url("sqlite:////var/lib/app.db") == "sqlite+aiosqlite:////var/lib/app.db"
+    assert sqlite_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+def test_sqlite_memory_uses_single_connection():
+    """测试内存数据库共用同一个连接"""
+    memory_engine = create_sqlite_engine("sqlite+aiosqlite:///:memory:")
+    assert isinstance(memory_engine.pool, StaticPool)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_applied():
+    """测试写连接与读连接的 PRAGMA"""
+    assert engine.pool.size() == 1
+    assert read_engine is not None
+
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+        assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+        assert (await conn.execute(text("PRAGMA query_only"))).scalar() == 0
+
+    async with read_engine.connect() as conn:
+        assert (await conn.execute(text("PRAGMA query_only"))).scalar() == 1
+        assert (await conn.execute(text("PRAGMA cache_size"))).scalar() == -65536
+        # 读连接池拒绝写入
+        with pytest.raises(exc.OperationalError):
+            await conn.execute(text("UPDATE users SET full_name = full_name WHERE id = -1"))
@@ -2,9 +2,17 @@
 用户管理端点测试
 测试用户 CRUD 操作
 """
+import csv
+import io
+import json
+
 import pytest
 from httpx import AsyncClient
 from fastapi import status
+from sqlalchemy.dialects import mysql
+
+from app.core.config import settings
+from app.routers.users import SearchMode, _build_search_query
 
 
 @pytest.mark.asyncio
@@ -88,8 +96,139 @@ async def test_get_users(async_client: AsyncClient):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
 
-    assert len(data) >= 3
-    assert isinstance(data, list)
+    assert isinstance(data["items"], list)
+    assert len(data["items"]) >= 3
+    assert "next_cursor" in data
+
+
+@pytest.mark.asyncio
+async def test_get_users_cursor_pagination(async_client: AsyncClient):
+    """测试用户列表游标分页"""
+    for i in range(5):
+        await async_client.post("/api/users/", json={
+            "username": f"page_user{i}",
+            "email": f"page_user{i}@example.com",
+            "password": "pass123"
+        })
+
+    # 逐页遍历，直到没有下一页
+    seen_ids = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/api/users/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+
+        data = response.json()
+        assert len(data["items"]) <= 2
+        seen_ids.extend(item["id"] for item in data["items"])
+
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    # 不重复、不遗漏，且按 ID 升序
+    assert len(seen_ids) >= 5
+    assert seen_ids == sorted(set(seen_ids))
+
+
+@pytest.mark.asyncio
+async def test_get_users_invalid_pagination(async_client: AsyncClient):
+    """测试非法分页参数"""
+    response = await async_client.get("/api/users/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await async_client.get("/api/users/", params={"limit": 100000})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_get_users_filter_and_sort(async_client: AsyncClient):
+    """测试用户列表筛选与排序"""
+    ids = []
+    for i in range(4):
+        response = await async_client.post("/api/users/", json={
+            "username": f"sort_user{i}",
+            "email": f"sort_user{i}@example.com",
+            "password": "pass123"
+        })
+        ids.append(response.json()["id"])
+    await async_client.post(f"/api/users/{ids[0]}/deactivate")
+
+    # 按激活状态筛选
+    response = await async_client.get("/api/users/", params={"is_active": False, "limit": 200})
+    items = response.json()["items"]
+    assert ids[0] in [item["id"] for item in items]
+    assert all(item["is_active"] is False for item in items)
+
+    # 按用户名倒序翻页，游标保持排序方式
+    usernames = []
+    cursor = None
+    while True:
+        params = {"sort": "-username", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/api/users/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        usernames.extend(item["username"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert usernames == sorted(set(usernames), reverse=True)
+
+    # 创建时间倒序，游标不能用于其他排序方式
+    response = await async_client.get("/api/users/", params={"sort": "-created_at", "limit": 1})
+    data = response.json()
+    assert data["next_cursor"]
+    response = await async_client.get(
+        "/api/users/", params={"sort": "username", "cursor": data["next_cursor"]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # 创建时间范围
+    response = await async_client.get(
+        "/api/users/", params={"created_after": "2999-01-01T00:00:00"}
+    )
+    assert response.json()["items"] == []
+
+
+async def _follow_cursor(async_client: AsyncClient, sort: str, limit: int) -> list:
+    """沿 next_cursor 翻完所有页，返回 ID 列表"""
+    ids = []
+    cursor = None
+    for _ in range(1000):
+        params = {"sort": sort, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/api/users/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        ids.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return ids
+    raise AssertionError("游标翻页未结束")
+
+
+@pytest.mark.asyncio
+async def test_created_at_cursor_within_same_second(async_client: AsyncClient):
+    """测试创建时间相同（同一秒内批量创建）的多行跨页时，游标翻页不重复、不遗漏"""
+    response = await async_client.post("/api/users/batch", json={"users": [
+        {"username": f"same_second{i}", "email": f"same_second{i}@example.com", "password": "pass123"}
+        for i in range(13)
+    ]})
+    assert response.json()["created"] == 13
+    created = [result["user"]["id"] for result in response.json()["results"]]
+
+    ascending = await _follow_cursor(async_client, "created_at", 4)
+    assert len(ascending) == len(set(ascending))
+    assert [id for id in ascending if id in created] == sorted(created)
+
+    descending = await _follow_cursor(async_client, "-created_at", 4)
+    assert descending == ascending[::-1]
 
 
 @pytest.mark.asyncio
@@ -225,3 +364,294 @@ async def test_activate_deactivate_user(async_client: AsyncClient):
 
     user_data = activate_response.json()
     assert user_data["is_active"] is True
+
+
+@pytest.mark.asyncio
+async def test_export_users_ndjson(async_client: AsyncClient):
+    """测试 NDJSON 流式导出"""
+    await async_client.post("/api/users/", json={
+        "username": "export_user",
+        "email": "export@example.com",
+        "password": "SecurePass123"
+    })
+
+    response = await async_client.get("/api/users/export")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert any(row["username"] == "export_user" for row in rows)
+    assert all("hashed_password" not in row for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_export_users_csv(async_client: AsyncClient):
+    """测试 CSV 流式导出"""
+    await async_client.post("/api/users/", json={
+        "username": "export_csv",
+        "email": "export_csv@example.com",
+        "password": "SecurePass123"
+    })
+
+    response = await async_client.get("/api/users/export", params={"format": "csv"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert any(row["username"] == "export_csv" for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_create_users_batch(async_client: AsyncClient):
+    """测试批量创建用户，逐条返回冲突"""
+    await async_client.post("/api/users/", json={
+        "username": "batch_existing",
+        "email": "batch_existing@example.com",
+        "password": "SecurePass123"
+    })
+
+    batch = {"users": [
+        {"username": "batch_a", "email": "batch_a@example.com", "password": "SecurePass123"},
+        {"username": "batch_existing", "email": "batch_new@example.com", "password": "SecurePass123"},
+        {"username": "batch_b", "email": "batch_a@example.com", "password": "SecurePass123"},
+        {"username": "batch_c", "email": "batch_c@example.com", "password": "SecurePass123"},
+    ]}
+
+    response = await async_client.post("/api/users/batch", json=batch)
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+
+    assert data["created"] == 2
+    assert data["failed"] == 2
+    assert [item["status"] for item in data["results"]] == [
+        "created", "conflict", "conflict", "created"
+    ]
+    assert data["results"][0]["user"]["username"] == "batch_a"
+    assert data["results"][3]["user"]["username"] == "batch_c"
+    assert "用户名已存在" in data["results"][1]["detail"]
+    assert "邮箱已注册" in data["results"][2]["detail"]
+
+    # 创建的用户可以正常查询
+    user_id = data["results"][3]["user"]["id"]
+    response = await async_client.get(f"/api/users/{user_id}")
+    assert response.json()["email"] == "batch_c@example.com"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path, body", [
+    ("/api/users/batch", {"users": [{"username": "x"}] * (settings.USER_BATCH_MAX_SIZE + 1)}),
+    ("/api/users/batch/lookup", {"ids": list(range(settings.USER_BATCH_MAX_SIZE + 1))}),
+    ("/api/users/bulk/deactivate", {"ids": list(range(settings.USER_BULK_MAX_IDS + 1))}),
+])
+async def test_batch_size_limited_by_schema(async_client: AsyncClient, path, body):
+    """测试批量请求的数量上限在模式校验阶段检查，超限时不逐条校验"""
+    response = await async_client.post(path, json=body)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    errors = response.json()["detail"]
+    assert [error["type"] for error in errors] == ["too_long"]
+
+
+@pytest.mark.asyncio
+async def test_get_users_batch(async_client: AsyncClient):
+    """测试批量获取用户"""
+    ids = []
+    for i in range(3):
+        response = await async_client.post("/api/users/", json={
+            "username": f"multi_get{i}",
+            "email": f"multi_get{i}@example.com",
+            "password": "SecurePass123"
+        })
+        ids.append(response.json()["id"])
+
+    query = ",".join(str(user_id) for user_id in [ids[2], 99999, ids[0]])
+    response = await async_client.get(f"/api/users/batch?ids={query}&ids={ids[1]}")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [item["id"] for item in data["items"]] == [ids[2], ids[0], ids[1]]
+    assert data["missing"] == [99999]
+
+    response = await async_client.post("/api/users/batch/lookup", json={"ids": ids})
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["username"] for item in response.json()["items"]] == [
+        "multi_get0", "multi_get1", "multi_get2"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_mutations_on_nonexistent_user(async_client: AsyncClient):
+    """测试修改不存在的用户返回 404"""
+    response = await async_client.put("/api/users/99999", json={"full_name": "Nobody"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.delete("/api/users/99999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.post("/api/users/99999/activate")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_update_user_duplicate_email(async_client: AsyncClient):
+    """测试更新为已被占用的邮箱"""
+    await async_client.post("/api/users/", json={
+        "username": "email_owner",
+        "email": "taken@example.com",
+        "password": "SecurePass123"
+    })
+    create_response = await async_client.post("/api/users/", json={
+        "username": "email_thief",
+        "email": "thief@example.com",
+        "password": "SecurePass123"
+    })
+    user_id = create_response.json()["id"]
+
+    response = await async_client.put(f"/api/users/{user_id}", json={"email": "taken@example.com"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_bulk_deactivate_activate_users(async_client: AsyncClient):
+    """测试按 ID 列表批量禁用和激活用户"""
+    response = await async_client.post("/api/users/batch", json={"users": [
+        {"username": f"bulk_user{i}", "email": f"bulk_user{i}@example.com", "password": "SecurePass123"}
+        for i in range(3)
+    ]})
+    ids = [item["user"]["id"] for item in response.json()["results"]]
+
+    response = await async_client.post("/api/users/bulk/deactivate", json={"ids": ids[:2]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["affected"] == 2
+
+    # 已经禁用的用户不重复计数
+    response = await async_client.post("/api/users/bulk/deactivate", json={"ids": ids})
+    assert response.json()["affected"] == 1
+
+    response = await async_client.get(f"/api/users/batch?ids={','.join(map(str, ids))}")
+    assert all(item["is_active"] is False for item in response.json()["items"])
+
+    response = await async_client.post("/api/users/bulk/activate", json={"ids": ids})
+    assert response.json()["affected"] == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_requires_criteria(async_client: AsyncClient):
+    """测试批量修改必须指定筛选条件"""
+    response = await async_client.post("/api/users/bulk/deactivate", json={})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await async_client.post("/api/users/bulk/deactivate", json={
+        "created_after": "2999-01-01T00:00:00"
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["affected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_user_conditional_etag(async_client: AsyncClient):
+    """测试 ETag 条件请求"""
+    create_response = await async_client.post("/api/users/", json={
+        "username": "etag_user",
+        "email": "etag@example.com",
+        "password": "SecurePass123"
+    })
+    user_id = create_response.json()["id"]
+
+    response = await async_client.get(f"/api/users/{user_id}")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    # 未变化时返回 304 且没有响应体
+    response = await async_client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await async_client.get(
+        "/api/users/search/by-username/etag_user",
+        headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # 修改后 ETag 变化
+    await async_client.put(f"/api/users/{user_id}", json={"full_name": "Changed"})
+    response = await async_client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_search_users(async_client: AsyncClient):
+    """测试用户名、邮箱、全名的前缀和子串搜索"""
+    await async_client.post("/api/users/batch", json={"users": [
+        {"username": "searchable_amy", "email": "amy@corp.example.com",
+         "password": "SecurePass123", "full_name": "Amy Zhang"},
+        {"username": "zhang_bob", "email": "bob@corp.example.com",
+         "password": "SecurePass123", "full_name": "Bob"},
+        {"username": "carol", "email": "carol@zhangs.example.com",
+         "password": "SecurePass123"},
+    ]})
+
+    # 子串匹配覆盖三个字段，不区分大小写；用户名前缀命中排在最前
+    response = await async_client.get("/api/users/search", params={"q": "ZHANG"})
+    assert response.status_code == status.HTTP_200_OK
+    usernames = [item["username"] for item in response.json()["items"]]
+    assert usernames[0] == "zhang_bob"
+    assert set(usernames) >= {"searchable_amy", "zhang_bob", "carol"}
+
+    # 前缀匹配
+    response = await async_client.get("/api/users/search", params={"q": "amy", "mode": "prefix"})
+    usernames = [item["username"] for item in response.json()["items"]]
+    assert usernames == ["searchable_amy"]
+
+    # 短关键字与长关键字的匹配语义相同：三个字段、不区分大小写、遵循匹配方式
+    response = await async_client.get("/api/users/search", params={"q": "ZH"})
+    usernames = [item["username"] for item in response.json()["items"]]
+    assert usernames[0] == "zhang_bob"
+    assert set(usernames) >= {"searchable_amy", "zhang_bob", "carol"}
+
+    response = await async_client.get("/api/users/search", params={"q": "Zh", "mode": "prefix"})
+    usernames = [item["username"] for item in response.json()["items"]]
+    assert "zhang_bob" in usernames
+    assert "searchable_amy" not in usernames
+    assert "carol" not in usernames
+
+    # 分页
+    response = await async_client.get("/api/users/search", params={"q": "zhang", "limit": 2})
+    data = response.json()
+    assert len(data["items"]) == 2
+    response = await async_client.get(
+        "/api/users/search", params={"q": "zhang", "limit": 2, "cursor": data["next_cursor"]}
+    )
+    assert len(response.json()["items"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_search_index_follows_updates(async_client: AsyncClient):
+    """测试更新全名后搜索索引同步"""
+    create_response = await async_client.post("/api/users/", json={
+        "username": "rename_me",
+        "email": "rename@example.com",
+        "password": "SecurePass123",
+        "full_name": "Before Rename"
+    })
+    user_id = create_response.json()["id"]
+
+    await async_client.put(f"/api/users/{user_id}", json={"full_name": "Quixotic Person"})
+
+    response = await async_client.get("/api/users/search", params={"q": "quixotic"})
+    assert [item["id"] for item in response.json()["items"]] == [user_id]
+    response = await async_client.get("/api/users/search", params={"q": "Before Rename"})
+    assert response.json()["items"] == []
+
+
+@pytest.mark.parametrize("q, uses_fulltext", [("z", False), ("zh", True), ("zhang", True)])
+def test_mysql_short_query_uses_like(q, uses_fulltext):
+    """测试 MySQL 上短于 ngram_token_size 的关键字不使用 MATCH（永远不命中），改用 LIKE"""
+    sql = str(_build_search_query("mysql", q, SearchMode.contains).compile(dialect=mysql.dialect()))
+    assert ("MATCH" in sql) is uses_fulltext
+    assert "LIKE" in sql